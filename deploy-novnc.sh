@@ -36,14 +36,11 @@ cd /opt/pxmx
 echo "📥 Pulling latest code..."
 git pull origin main
 
-# Make websockify plugin executable
-chmod +x websockify_ssh_tunnel.py
-
 # Create systemd service for websockify
-echo "⚙️  Creating websockify systemd service..."
+echo "⚙️  Creating VNC console relay systemd service..."
 cat > /etc/systemd/system/pxmx-websockify.service << 'EOF'
 [Unit]
-Description=PXMX Websockify VNC Proxy
+Description=PXMX VNC Console Relay
 After=network.target
 
 [Service]
@@ -51,7 +48,7 @@ Type=simple
 User=root
 WorkingDirectory=/opt/pxmx
 Environment=PYTHONPATH=/opt/pxmx
-ExecStart=/usr/bin/websockify --web=/usr/share/novnc --cert=/etc/letsencrypt/live/manage.koetsier.it/fullchain.pem --key=/etc/letsencrypt/live/manage.koetsier.it/privkey.pem --token-plugin=/opt/pxmx/websockify_ssh_tunnel.py --token-source=WebsockifySSHTunnel 0.0.0.0:6080
+ExecStart=/usr/bin/python3 /opt/pxmx/manage.py start_vnc_proxy --web=/usr/share/novnc --cert=/etc/letsencrypt/live/manage.koetsier.it/fullchain.pem --key=/etc/letsencrypt/live/manage.koetsier.it/privkey.pem --host 0.0.0.0 --port 6080
 Restart=always
 RestartSec=10
 
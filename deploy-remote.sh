@@ -144,7 +144,7 @@ services:
   web:
     build: .
     container_name: pxmx_web
-    command: gunicorn --workers 3 --bind 0.0.0.0:8000 pxmx.wsgi:application
+    command: gunicorn --workers 3 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000 pxmx.asgi:application
     volumes:
       - .:/app
       - static_volume:/app/staticfiles
@@ -160,10 +160,41 @@ services:
         condition: service_healthy
     restart: unless-stopped
 
+  # One worker per queue (see pxmx/celery.py) so VM operations never wait behind syncs
   celery:
     build: .
     container_name: pxmx_celery
-    command: celery -A pxmx worker --loglevel=info
+    command: celery -A pxmx worker -Q sync -c ${CELERY_SYNC_CONCURRENCY:-8} -n sync@%h --loglevel=info
+    volumes:
+      - .:/app
+    env_file:
+      - .env
+    depends_on:
+      db:
+        condition: service_healthy
+      redis:
+        condition: service_healthy
+    restart: unless-stopped
+
+  celery-interactive:
+    build: .
+    container_name: pxmx_celery_interactive
+    command: celery -A pxmx worker -Q interactive -c ${CELERY_INTERACTIVE_CONCURRENCY:-4} -n interactive@%h --loglevel=info
+    volumes:
+      - .:/app
+    env_file:
+      - .env
+    depends_on:
+      db:
+        condition: service_healthy
+      redis:
+        condition: service_healthy
+    restart: unless-stopped
+
+  celery-maintenance:
+    build: .
+    container_name: pxmx_celery_maintenance
+    command: celery -A pxmx worker -Q maintenance -c 1 -n maintenance@%h --loglevel=info
     volumes:
       - .:/app
     env_file:
@@ -1,6 +1,15 @@
 from django.contrib import admin
 
-from .models import AuditLog, CeleryTask, Node, ProxmoxCluster, VirtualMachine
+from .models import (
+    AuditLog,
+    CeleryTask,
+    ClusterSummary,
+    ClusterSyncSchedule,
+    Node,
+    NodeSummary,
+    ProxmoxCluster,
+    VirtualMachine,
+)
 
 
 @admin.register(ProxmoxCluster)
@@ -10,6 +19,33 @@ class ProxmoxClusterAdmin(admin.ModelAdmin):
     search_fields = ["name", "api_url"]
 
 
+@admin.register(ClusterSyncSchedule)
+class ClusterSyncScheduleAdmin(admin.ModelAdmin):
+    list_display = [
+        "cluster",
+        "interval",
+        "next_sync_at",
+        "last_sync_at",
+        "last_duration",
+        "last_churn",
+    ]
+    readonly_fields = ["last_sync_at", "last_duration", "last_churn", "pending_churn"]
+
+
+@admin.register(ClusterSummary)
+class ClusterSummaryAdmin(admin.ModelAdmin):
+    list_display = [
+        "cluster",
+        "node_count",
+        "online_nodes",
+        "vm_count",
+        "running_vms",
+        "stopped_vms",
+        "updated_at",
+    ]
+    readonly_fields = [f.name for f in ClusterSummary._meta.fields]
+
+
 @admin.register(Node)
 class NodeAdmin(admin.ModelAdmin):
     list_display = [
@@ -19,10 +55,18 @@ class NodeAdmin(admin.ModelAdmin):
         "cpu_usage",
         "ram_usage",
         "disk_usage",
+        "ip_address",
         "last_synced",
     ]
     list_filter = ["cluster", "status"]
-    search_fields = ["name", "cluster__name"]
+    search_fields = ["name", "cluster__name", "ip_address"]
+
+
+@admin.register(NodeSummary)
+class NodeSummaryAdmin(admin.ModelAdmin):
+    list_display = ["node", "vm_count", "running_vms", "stopped_vms", "updated_at"]
+    list_filter = ["node__cluster"]
+    readonly_fields = [f.name for f in NodeSummary._meta.fields]
 
 
 @admin.register(VirtualMachine)
@@ -45,8 +89,8 @@ class VirtualMachineAdmin(admin.ModelAdmin):
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = ["action", "user", "vm", "cluster", "status", "created_at"]
     list_filter = ["action", "status", "created_at"]
-    search_fields = ["user__username", "vm__name", "details"]
-    readonly_fields = ["created_at", "completed_at"]
+    search_fields = ["user__username", "vm__name", "details", "task_id"]
+    readonly_fields = ["created_at", "completed_at", "exit_status", "duration"]
 
 
 @admin.register(CeleryTask)
@@ -62,9 +106,10 @@ class CeleryTaskAdmin(admin.ModelAdmin):
         "execution_time",
     ]
     list_filter = ["state", "task_name", "created_at"]
-    search_fields = ["task_id", "task_name", "user__username", "vm__name"]
+    search_fields = ["task_id", "upid", "task_name", "user__username", "vm__name"]
     readonly_fields = [
         "task_id",
+        "upid",
         "created_at",
         "started_at",
         "completed_at",
@@ -5,3 +5,6 @@ class ProxmoxManagerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "proxmox_manager"
     verbose_name = "Proxmox Manager"
+
+    def ready(self):
+        from . import queue_metrics, ratelimit, signals  # noqa: F401
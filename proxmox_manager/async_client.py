@@ -0,0 +1,134 @@
+"""
+Minimal asyncio Proxmox API client built on aiohttp.
+
+Authenticates with the headers of the pooled synchronous connection (see
+``connections.get_auth_headers``) and bounds the number of requests in flight
+with a per-client semaphore. Uses the same timeouts, circuit breaker and
+rate limiter as the synchronous connections; their Redis calls run in worker
+threads so they do not block the event loop.
+"""
+
+import asyncio
+
+import aiohttp
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .breaker import UNAVAILABLE_STATUSES, CircuitBreaker
+from .connections import api_base_url, get_auth_headers, get_endpoints
+from .ratelimit import acquire_async
+
+
+class AsyncProxmoxClient:
+    """
+    Usage::
+
+        headers = get_auth_headers(cluster)  # outside the event loop
+        async with AsyncProxmoxClient(cluster, headers, concurrency=16) as client:
+            nodes = await client.get("/nodes")
+    """
+
+    def __init__(self, cluster, headers=None, concurrency=16, host=None):
+        # ``host`` is picked outside the event loop, see EndpointSet.best()
+        self.host = host
+        self.base_url = api_base_url(cluster, host)
+        self.endpoints = get_endpoints(cluster)
+        self.headers = headers if headers is not None else get_auth_headers(cluster)
+        self.verify_ssl = cluster.verify_ssl
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session = None
+        self.breaker = CircuitBreaker(cluster.pk)
+        self.failed = False
+
+    async def __aenter__(self):
+        # Checked once per client rather than per request, so a sync does not
+        # hit Redis for every call
+        await sync_to_async(self.breaker.before_call, thread_sensitive=False)()
+        self.session = aiohttp.ClientSession(
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(
+                sock_connect=settings.PROXMOX_CONNECT_TIMEOUT,
+                sock_read=settings.PROXMOX_READ_TIMEOUT,
+            ),
+            connector=aiohttp.TCPConnector(
+                ssl=self.verify_ssl,
+                limit=self.concurrency,
+            ),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+        if not self.failed:
+            await sync_to_async(self.breaker.record_success, thread_sensitive=False)()
+
+    async def record_failure(self, error):
+        if not self.failed:
+            self.endpoints.mark_down(self.host or self.endpoints.primary, error)
+        self.failed = True
+        await sync_to_async(self.breaker.record_failure, thread_sensitive=False)(
+            error
+        )
+
+    async def request(self, method, path, **params):
+        # Like requests (and so proxmoxer), leave out parameters set to None
+        params = {key: value for key, value in params.items() if value is not None}
+        async with self.semaphore:
+            await acquire_async(self.breaker.cluster_id)
+            try:
+                async with self.session.request(
+                    method,
+                    f"{self.base_url}{path}",
+                    params=params if method == "GET" else None,
+                    data=params if method != "GET" else None,
+                ) as response:
+                    if response.status in UNAVAILABLE_STATUSES:
+                        await self.record_failure(
+                            f"HTTP {response.status} {response.reason}"
+                        )
+                    response.raise_for_status()
+                    payload = await response.json()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                await self.record_failure(str(e) or type(e).__name__)
+                raise
+        return payload["data"]
+
+    async def get(self, path, **params):
+        return await self.request("GET", path, **params)
+
+    async def post(self, path, **data):
+        return await self.request("POST", path, **data)
+
+    async def websocket(self, path, params, **options):
+        """
+        Connect to a WebSocket endpoint such as ``vncwebsocket``; ``options``
+        go to ``aiohttp.ClientSession.ws_connect``. Close the returned
+        WebSocket before the client.
+        """
+        await acquire_async(self.breaker.cluster_id)
+        try:
+            return await self.session.ws_connect(
+                f"{self.base_url}{path}", params=params, **options
+            )
+        except aiohttp.WSServerHandshakeError as e:
+            if e.status in UNAVAILABLE_STATUSES:
+                await self.record_failure(f"HTTP {e.status} {e.message}")
+            raise
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            await self.record_failure(str(e) or type(e).__name__)
+            raise
+
+
+async def client_for(cluster, concurrency=1):
+    """
+    :class:`AsyncProxmoxClient` for ``cluster``, created from async code such as
+    a view: the blocking setup (a login when the pooled ticket is missing or
+    stale, node addresses read from the database) runs in a worker thread.
+    """
+
+    def setup():
+        return get_auth_headers(cluster), get_endpoints(cluster).best()
+
+    headers, host = await sync_to_async(setup)()
+    return AsyncProxmoxClient(cluster, headers, concurrency, host)
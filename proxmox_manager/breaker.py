@@ -0,0 +1,214 @@
+"""
+Per-cluster circuit breakers for the Proxmox API.
+
+Every process shares one breaker per cluster, kept in a Redis hash. After
+PROXMOX_BREAKER_FAILURE_THRESHOLD consecutive connection errors, timeouts or
+gateway errors the breaker opens and API calls to the cluster fail at once with
+:class:`CircuitOpenError` instead of waiting out the timeouts. Once
+PROXMOX_BREAKER_RESET_TIMEOUT seconds have passed a single caller is let
+through as a half-open probe: its success closes the breaker, its failure opens
+it again.
+
+Breakers fail open: when Redis is unreachable every call is let through.
+"""
+
+import logging
+import time
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+import redis
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Responses meaning the API is unreachable rather than that the call was wrong;
+# 595/596 are what pveproxy returns when it cannot reach the target node
+UNAVAILABLE_STATUSES = {502, 503, 504, 595, 596}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API of a cluster whose breaker is open"""
+
+
+def breaker_key(cluster_id):
+    return f"pxmx:breaker:cluster:{cluster_id}"
+
+
+def probe_key(cluster_id):
+    return f"pxmx:breaker-probe:cluster:{cluster_id}"
+
+
+def describe_status(cluster_id, data):
+    """Turn the raw breaker hash of ``cluster_id`` into a status dict"""
+    state = data.get("state") or CLOSED
+    opened_at = float(data["opened_at"]) if data.get("opened_at") else None
+    last_error_at = float(data["last_error_at"]) if data.get("last_error_at") else None
+    retry_at = None
+    if state != CLOSED and opened_at is not None:
+        retry_at = opened_at + settings.PROXMOX_BREAKER_RESET_TIMEOUT
+    return {
+        "cluster_id": cluster_id,
+        "state": state,
+        "failures": int(data.get("failures") or 0),
+        "last_error": data.get("last_error") or "",
+        "last_error_at": (
+            datetime.fromtimestamp(last_error_at, tz=dt_timezone.utc)
+            if last_error_at
+            else None
+        ),
+        "retry_at": (
+            datetime.fromtimestamp(retry_at, tz=dt_timezone.utc) if retry_at else None
+        ),
+        "probe_due": retry_at is not None and time.time() >= retry_at,
+    }
+
+
+class CircuitBreaker:
+    """
+    Usage::
+
+        breaker = CircuitBreaker(cluster.id)
+        breaker.before_call()  # raises CircuitOpenError while open
+        try:
+            response = call_the_api()
+        except ConnectionError as e:
+            breaker.record_failure(e)
+            raise
+        breaker.record_success()
+    """
+
+    def __init__(self, cluster_id):
+        self.cluster_id = cluster_id
+        self.key = breaker_key(cluster_id)
+        # Whether the breaker was closed without failures at before_call(), so
+        # the common successful call does not need a write
+        self.clean = False
+
+    def status(self):
+        try:
+            data = get_redis().hgetall(self.key)
+        except redis.RedisError:
+            data = {}
+        return describe_status(self.cluster_id, data)
+
+    def before_call(self):
+        """Raise :class:`CircuitOpenError` unless the call may go ahead"""
+        client = get_redis()
+        try:
+            data = client.hgetall(self.key)
+        except redis.RedisError as e:
+            logger.warning(f"Could not read circuit breaker {self.key}: {str(e)}")
+            return
+
+        state = data.get("state") or CLOSED
+        self.clean = state == CLOSED and not int(data.get("failures") or 0)
+        if state == CLOSED:
+            return
+
+        reset_timeout = settings.PROXMOX_BREAKER_RESET_TIMEOUT
+        retry_in = float(data.get("opened_at") or 0) + reset_timeout - time.time()
+        if retry_in <= 0:
+            try:
+                # Only one caller at a time probes a cluster that may be back
+                if client.set(probe_key(self.cluster_id), "1", nx=True, ex=reset_timeout):
+                    client.hset(self.key, "state", HALF_OPEN)
+                    logger.info(f"Probing cluster {self.cluster_id} (circuit half-open)")
+                    return
+            except redis.RedisError:
+                return
+            retry_in = 0
+
+        raise CircuitOpenError(
+            f"Cluster {self.cluster_id} is unreachable, not retrying for "
+            f"{max(int(retry_in), 1)}s (last error: {data.get('last_error') or 'unknown'})"
+        )
+
+    def record_success(self):
+        if self.clean:
+            return
+        try:
+            pipe = get_redis().pipeline()
+            pipe.hset(self.key, mapping={"state": CLOSED, "failures": 0})
+            pipe.hdel(self.key, "opened_at")
+            pipe.delete(probe_key(self.cluster_id))
+            previous = pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Could not close circuit breaker {self.key}: {str(e)}")
+            return
+        self.clean = True
+        if previous[1]:
+            logger.info(f"Cluster {self.cluster_id} reachable again, circuit closed")
+
+    def record_failure(self, error):
+        client = get_redis()
+        now = time.time()
+        try:
+            pipe = client.pipeline()
+            pipe.hget(self.key, "state")
+            pipe.hincrby(self.key, "failures", 1)
+            pipe.hset(
+                self.key, mapping={"last_error": str(error)[:500], "last_error_at": now}
+            )
+            state, failures, _ = pipe.execute()
+
+            if state == HALF_OPEN or (
+                state != OPEN and failures >= settings.PROXMOX_BREAKER_FAILURE_THRESHOLD
+            ):
+                pipe = client.pipeline()
+                pipe.hset(self.key, mapping={"state": OPEN, "opened_at": now})
+                pipe.delete(probe_key(self.cluster_id))
+                pipe.execute()
+                logger.warning(
+                    f"Circuit opened for cluster {self.cluster_id} after {failures} "
+                    f"failures: {str(error)}"
+                )
+        except redis.RedisError as e:
+            logger.warning(f"Could not record failure on {self.key}: {str(e)}")
+        self.clean = False
+
+    def reset(self):
+        try:
+            get_redis().delete(self.key, probe_key(self.cluster_id))
+        except redis.RedisError as e:
+            logger.warning(f"Could not reset circuit breaker {self.key}: {str(e)}")
+
+
+def breaker_statuses(cluster_ids):
+    """Return ``{cluster_id: status}`` with one Redis round trip"""
+    cluster_ids = list(cluster_ids)
+    try:
+        pipe = get_redis().pipeline()
+        for cluster_id in cluster_ids:
+            pipe.hgetall(breaker_key(cluster_id))
+        results = pipe.execute()
+    except redis.RedisError:
+        results = [{}] * len(cluster_ids)
+    return {
+        cluster_id: describe_status(cluster_id, data)
+        for cluster_id, data in zip(cluster_ids, results)
+    }
+
+
+def is_open(cluster_id):
+    """
+    True while calls to ``cluster_id`` would fail fast: the breaker is open and
+    not due for a probe, or a probe is already in flight.
+    """
+    try:
+        pipe = get_redis().pipeline()
+        pipe.hgetall(breaker_key(cluster_id))
+        pipe.exists(probe_key(cluster_id))
+        data, probing = pipe.execute()
+    except redis.RedisError:
+        return False
+    status = describe_status(cluster_id, data)
+    if status["state"] == HALF_OPEN:
+        return bool(probing)
+    return status["state"] == OPEN and not status["probe_due"]
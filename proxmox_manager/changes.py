@@ -0,0 +1,175 @@
+"""
+Change sequence behind the delta APIs (``?since=<seq>``).
+
+Every write that changes nodes, guests or tasks takes the next number of a
+single ``ChangeCounter`` row and stamps the rows it changed with it
+(``change_seq``); deleted rows leave a ``Tombstone`` with the number. A client
+that keeps the ``seq`` of its last response can then ask for only the rows
+changed and deleted after it, however large the inventory.
+
+The counter row is incremented inside the writing transaction, so it stays
+locked until that transaction commits and numbers become visible in the order
+they were taken. A reader reads the counter before the rows: every row stamped
+with a number up to the one it returns is already visible, and rows stamped
+later are returned again next time, so no change is ever skipped.
+
+The price is that all writers are serialized on the counter row. Tasks take a
+number when they are created, change state or are deleted (``stamp_task`` and
+``bury_task`` in ``signals.py``), so such a write waits for any sync
+transaction that already took a number, and the other way round; progress
+writes do not take one. Syncs take their number at the end of their
+transaction to keep that wait short.
+
+Tombstones older than ``CHANGE_TOMBSTONE_RETENTION`` seconds are pruned; a
+client asking for changes since before the pruned range gets a full listing
+instead (``"full": true``), as does ``since=0``.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import CeleryTask, ChangeCounter, Node, Tombstone, VirtualMachine
+from .progress import read_progress
+
+# Fields of the rows returned by the delta APIs; a write stamps a row when one
+# of its ``*_CHANGE_FIELDS`` changes (see ``sync.py``)
+NODE_CHANGE_FIELDS = ["status", "cpu_usage", "ram_usage", "disk_usage"]
+NODE_FIELDS = ["id", "cluster_id", "name", *NODE_CHANGE_FIELDS]
+VM_CHANGE_FIELDS = [
+    "name",
+    "vm_type",
+    "status",
+    "cpu_cores",
+    "ram_mb",
+    "disk_gb",
+    "cpu_usage",
+    "ram_usage",
+    "tags",
+    "ip_addresses",
+]
+VM_FIELDS = ["id", "vmid", "node_id", *VM_CHANGE_FIELDS]
+TASK_FIELDS = [
+    "id",
+    "task_id",
+    "task_name",
+    "state",
+    "progress",
+    "progress_message",
+    "result",
+    "vm_id",
+    "cluster_id",
+    "created_at",
+    "completed_at",
+]
+RUNNING_STATES = ["PENDING", "STARTED", "RETRY"]
+
+
+def next_change_seq():
+    """
+    Take the next sequence number. Must be called inside the transaction that
+    stamps the rows, as late as possible: the counter stays locked until it
+    commits.
+    """
+    with transaction.atomic():
+        if not ChangeCounter.objects.filter(pk=1).update(value=F("value") + 1):
+            ChangeCounter.objects.get_or_create(pk=1)
+            ChangeCounter.objects.filter(pk=1).update(value=F("value") + 1)
+        return ChangeCounter.objects.values_list("value", flat=True).get(pk=1)
+
+
+def change_window():
+    """Return ``(current sequence number, highest pruned sequence number)``"""
+    row = ChangeCounter.objects.values_list("value", "pruned_through").first()
+    return row or (0, 0)
+
+
+def stamp(queryset, seq):
+    """Mark the rows of ``queryset`` as changed at ``seq``"""
+    return queryset.update(change_seq=seq)
+
+
+def record_deletions(seq, kind, ids, cluster_id=None):
+    Tombstone.objects.bulk_create(
+        [
+            Tombstone(
+                kind=kind, object_id=object_id, cluster_id=cluster_id, change_seq=seq
+            )
+            for object_id in ids
+        ],
+        batch_size=500,
+    )
+
+
+def task_rows(queryset):
+    rows = list(queryset.values(*TASK_FIELDS))
+    live = read_progress(
+        row["task_id"] for row in rows if row["state"] in RUNNING_STATES
+    )
+    for row in rows:
+        if row["task_id"] in live:
+            row["progress"] = live[row["task_id"]]["progress"]
+            row["progress_message"] = live[row["task_id"]]["message"]
+    return rows
+
+
+def changes_since(since, cluster=None):
+    """
+    Nodes, guests and tasks (of ``cluster``, or of every cluster) changed after
+    ``since``, and the ids of those deleted since.
+
+    When ``since`` is 0, predates the pruned tombstones or is ahead of the
+    counter (e.g. after a database restore), every node and guest and the
+    running tasks are listed instead, with ``full`` set: the client must
+    replace its model rather than apply the changes to it.
+    """
+    seq, pruned_through = change_window()
+    full = since <= 0 or since < pruned_through or since > seq
+
+    nodes = Node.objects.all()
+    vms = VirtualMachine.objects.all()
+    tasks = CeleryTask.objects.all()
+    tombstones = Tombstone.objects.filter(change_seq__gt=since)
+    if cluster is not None:
+        nodes = nodes.filter(cluster=cluster)
+        vms = vms.filter(node__cluster=cluster)
+        tasks = tasks.filter(cluster=cluster)
+        tombstones = tombstones.filter(cluster_id=cluster.pk)
+
+    if full:
+        tasks = tasks.filter(state__in=RUNNING_STATES)
+    else:
+        nodes = nodes.filter(change_seq__gt=since)
+        vms = vms.filter(change_seq__gt=since)
+        tasks = tasks.filter(change_seq__gt=since)
+
+    deleted = {"nodes": [], "vms": [], "tasks": []}
+    if not full:
+        for kind, object_id in tombstones.values_list("kind", "object_id"):
+            deleted[f"{kind}s"].append(object_id)
+
+    return {
+        "seq": seq,
+        "full": full,
+        "nodes": list(nodes.order_by("id").values(*NODE_FIELDS)),
+        "vms": list(vms.order_by("id").values(*VM_FIELDS)),
+        "tasks": task_rows(tasks.order_by("id")),
+        "deleted": deleted,
+    }
+
+
+def prune_tombstones(retention):
+    """Delete tombstones older than ``retention`` seconds; returns how many"""
+    cutoff = timezone.now() - timedelta(seconds=retention)
+    with transaction.atomic():
+        old = Tombstone.objects.filter(deleted_at__lt=cutoff)
+        highest = old.aggregate(highest=Max("change_seq"))["highest"]
+        if highest is None:
+            return 0
+        pruned, _ = Tombstone.objects.filter(change_seq__lte=highest).delete()
+        ChangeCounter.objects.filter(pk=1, pruned_through__lt=highest).update(
+            pruned_through=highest
+        )
+    return pruned
@@ -0,0 +1,352 @@
+"""
+Process-local pool of authenticated Proxmox API connections.
+
+Every Celery worker and web process keeps one ``ProxmoxAPI`` per cluster, so
+tasks and views reuse the same login ticket and the same keep-alive HTTP
+session instead of authenticating on every call. A pooled connection is
+replaced when the cluster row changes (see ``signals.py``) or when Proxmox
+rejects its credentials.
+
+Every request goes through the cluster's circuit breaker (see ``breaker.py``)
+with strict connect and read timeouts, so an unreachable cluster costs a few
+seconds per caller until the breaker opens and then none at all. Requests are
+sent to the best API endpoint of the cluster and fail over to the next one
+(see ``endpoints.py``), after taking a token from the cluster's shared rate
+limiter (see ``ratelimit.py``).
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from proxmoxer import ProxmoxAPI
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from .breaker import UNAVAILABLE_STATUSES, CircuitBreaker
+from .endpoints import registry
+from .ratelimit import acquire, current_priority
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_PORT = 8006
+
+
+def parse_api_url(api_url):
+    """Return ``(host, port)`` for a cluster ``api_url`` such as ``https://pve:8006``"""
+    parts = urlsplit(api_url if "://" in api_url else f"https://{api_url}")
+    return parts.hostname, parts.port or DEFAULT_API_PORT
+
+
+def endpoint_netloc(host, port):
+    if ":" in host:
+        host = f"[{host}]"
+    return f"{host}:{port}"
+
+
+def api_base_url(cluster, host=None):
+    """Return the ``/api2/json`` base URL of ``cluster``, or of one of its endpoints"""
+    api_host, port = parse_api_url(cluster.api_url)
+    return f"https://{endpoint_netloc(host or api_host, port)}/api2/json"
+
+
+def get_endpoints(cluster):
+    """Return the process-wide :class:`~.endpoints.EndpointSet` of ``cluster``"""
+    return registry.get(
+        cluster.pk, *parse_api_url(cluster.api_url), verify_ssl=cluster.verify_ssl
+    )
+
+
+def connection_signature(cluster):
+    """Values that, when changed, require a new connection for ``cluster``"""
+    return (
+        cluster.api_url,
+        cluster.username,
+        cluster.password,
+        cluster.token_name,
+        cluster.token_value,
+        cluster.verify_ssl,
+        cluster.updated_at,
+    )
+
+
+def api_timeout():
+    """``(connect, read)`` timeout for requests to the Proxmox API"""
+    return (settings.PROXMOX_CONNECT_TIMEOUT, settings.PROXMOX_READ_TIMEOUT)
+
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def hedge_executor():
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(
+                max_workers=settings.PROXMOX_HTTP_POOL_SIZE,
+                thread_name_prefix="proxmox-hedge",
+            )
+    return _hedge_executor
+
+
+def never_sent(request, error):
+    """True if ``error`` shows ``request`` cannot have reached the server"""
+    if request.method == "GET" or isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def usable(future):
+    return (
+        future.exception() is None
+        and future.result().status_code not in UNAVAILABLE_STATUSES
+    )
+
+
+def close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class ProxmoxAdapter(HTTPAdapter):
+    """
+    HTTP adapter for pooled sessions.
+
+    Sends each request to the best endpoint of the cluster, failing over to the
+    next one on connection errors and gateway errors (the latter for reads
+    only), and hedging slow reads when PROXMOX_HEDGE_READS_AFTER is set. Fails
+    fast while the cluster's circuit breaker is open, records the outcome of
+    every request on it, and drops the pooled connection on HTTP 401.
+    """
+
+    def __init__(self, cluster_id, endpoints, **kwargs):
+        self.cluster_id = cluster_id
+        self.endpoints = endpoints
+        # Password auth, whose ticket renewals follow the endpoint in use
+        self.auth = None
+        super().__init__(**kwargs)
+
+    def send_to(self, host, request, priority, **kwargs):
+        """Send ``request`` to ``host`` and record its latency or failure"""
+        acquire(self.cluster_id, priority)
+        parts = urlsplit(request.url)
+        request = request.copy()
+        request.url = parts._replace(
+            netloc=endpoint_netloc(host, self.endpoints.port)
+        ).geturl()
+
+        started = time.monotonic()
+        try:
+            response = super().send(request, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            self.endpoints.mark_down(host, e)
+            raise
+        if response.status_code in UNAVAILABLE_STATUSES:
+            self.endpoints.mark_down(host, f"HTTP {response.status_code}")
+        else:
+            self.endpoints.record_latency(host, time.monotonic() - started)
+            base_url = f"https://{endpoint_netloc(host, self.endpoints.port)}/api2/json"
+            if self.auth is not None and self.auth.base_url != base_url:
+                self.auth.base_url = base_url
+        return response
+
+    def send_hedged(self, hosts, request, priority, **kwargs):
+        """
+        Send a read to ``hosts[0]`` and, if it has not answered within
+        PROXMOX_HEDGE_READS_AFTER seconds or failed, to ``hosts[1]`` too;
+        return the first usable response.
+        """
+        executor = hedge_executor()
+        futures = [
+            executor.submit(self.send_to, hosts[0], request, priority, **kwargs)
+        ]
+        done, pending = wait(futures, timeout=settings.PROXMOX_HEDGE_READS_AFTER)
+        if not done or not usable(futures[0]):
+            futures.append(
+                executor.submit(self.send_to, hosts[1], request, priority, **kwargs)
+            )
+
+        error = response = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+                    continue
+                if response.status_code not in UNAVAILABLE_STATUSES:
+                    for other in pending:
+                        other.add_done_callback(close_response)
+                    return response
+        if response is not None:
+            return response
+        raise error
+
+    def dispatch(self, request, **kwargs):
+        # Read here, context variables do not reach the hedging threads
+        priority = current_priority()
+        hosts = self.endpoints.candidates()
+        hedge = (
+            settings.PROXMOX_HEDGE_READS_AFTER
+            and request.method == "GET"
+            and len(hosts) > 1
+        )
+        if hedge:
+            return self.send_hedged(hosts, request, priority, **kwargs)
+
+        for attempt, host in enumerate(hosts):
+            last = attempt == len(hosts) - 1
+            try:
+                response = self.send_to(host, request, priority, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last or not never_sent(request, e):
+                    raise
+                continue
+            if (
+                last
+                or request.method != "GET"
+                or response.status_code not in UNAVAILABLE_STATUSES
+            ):
+                return response
+            response.close()
+
+    def send(self, request, **kwargs):
+        breaker = CircuitBreaker(self.cluster_id)
+        breaker.before_call()
+        try:
+            response = self.dispatch(request, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            breaker.record_failure(e)
+            raise
+
+        if response.status_code in UNAVAILABLE_STATUSES:
+            breaker.record_failure(f"HTTP {response.status_code} {response.reason}")
+        else:
+            breaker.record_success()
+
+        if response.status_code == 401:
+            logger.warning(
+                f"Proxmox rejected credentials for cluster {self.cluster_id}, "
+                "dropping pooled connection"
+            )
+            pool.invalidate(self.cluster_id)
+        return response
+
+
+def create_connection(cluster):
+    """
+    Log in to ``cluster`` and return a new ``ProxmoxAPI``.
+
+    Logs in at the best endpoint that accepts a connection.
+    """
+    endpoints = get_endpoints(cluster)
+    kwargs = {
+        "user": cluster.username,
+        "verify_ssl": cluster.verify_ssl,
+        "timeout": api_timeout(),
+    }
+    if cluster.token_name:
+        kwargs["token_name"] = cluster.token_name
+        kwargs["token_value"] = cluster.token_value
+    else:
+        kwargs["password"] = cluster.password
+
+    hosts = endpoints.candidates()
+    for attempt, host in enumerate(hosts):
+        try:
+            api = ProxmoxAPI(host, port=endpoints.port, **kwargs)
+            break
+        except (requests.ConnectionError, requests.Timeout) as e:
+            endpoints.mark_down(host, e)
+            if attempt == len(hosts) - 1:
+                raise
+
+    # Renew password tickets well before Proxmox expires them (2 hours)
+    api._backend.auth.renew_age = settings.PROXMOX_TICKET_RENEW_AGE
+
+    adapter = ProxmoxAdapter(
+        cluster.pk,
+        endpoints,
+        pool_connections=1,
+        pool_maxsize=settings.PROXMOX_HTTP_POOL_SIZE,
+    )
+    if not cluster.token_name:
+        adapter.auth = api._backend.auth
+    api._store["session"].mount("https://", adapter)
+    return api
+
+
+class ConnectionPool:
+    """Cluster id -> (signature, ProxmoxAPI) map shared by all threads of a process"""
+
+    def __init__(self):
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def get(self, cluster):
+        signature = connection_signature(cluster)
+        with self._lock:
+            entry = self._connections.get(cluster.pk)
+        if entry and entry[0] == signature:
+            return entry[1]
+
+        # The login request does not go through ProxmoxAdapter yet
+        breaker = CircuitBreaker(cluster.pk)
+        breaker.before_call()
+        acquire(cluster.pk)
+        try:
+            api = create_connection(cluster)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            breaker.record_failure(e)
+            raise
+        breaker.record_success()
+        with self._lock:
+            self._connections[cluster.pk] = (signature, api)
+        logger.info(f"Opened Proxmox connection for cluster {cluster.name}")
+        return api
+
+    def invalidate(self, cluster_id):
+        with self._lock:
+            self._connections.pop(cluster_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._connections.clear()
+
+
+pool = ConnectionPool()
+
+
+def get_proxmox_connection(cluster):
+    """Return the pooled, authenticated ``ProxmoxAPI`` for ``cluster``"""
+    return pool.get(cluster)
+
+
+def get_auth_headers(cluster):
+    """
+    Return HTTP headers authenticating as ``cluster``'s pooled connection.
+
+    Lets other HTTP clients (e.g. the async sync engine) reuse the pooled
+    ticket or API token instead of logging in themselves.
+    """
+    if cluster.token_name:
+        return {
+            "Authorization": (
+                f"PVEAPIToken={cluster.username}!{cluster.token_name}"
+                f"={cluster.token_value}"
+            )
+        }
+
+    auth = get_proxmox_connection(cluster)._backend.auth
+    if time.monotonic() - auth.birth_time >= auth.renew_age:
+        auth._get_new_tokens()
+    ticket, csrf_token = auth.get_tokens()
+    return {"Cookie": f"PVEAuthCookie={ticket}", "CSRFPreventionToken": csrf_token}
@@ -0,0 +1,8 @@
+from .stats import inventory_stats
+
+
+def sidebar_stats(request):
+    """Inventory totals for the right sidebar of ``base.html``"""
+    if not request.user.is_authenticated:
+        return {}
+    return inventory_stats()
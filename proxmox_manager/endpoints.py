@@ -0,0 +1,201 @@
+"""
+API endpoint selection for clusters with several nodes.
+
+Every node of a Proxmox cluster serves the full API, so besides the host of a
+cluster's ``api_url`` requests can go to any online node whose address
+``discover_endpoints`` learned from ``/cluster/status``. Each process keeps an
+:class:`EndpointSet` per cluster that ranks the endpoints by their measured
+latency (an exponentially weighted moving average), skips endpoints that
+recently failed and, when PROXMOX_HEDGE_READS_AFTER is set, lets a slow read be
+raced against the next endpoint.
+
+Latencies are measured from the process making the requests, so they are kept
+per process rather than shared through Redis.
+
+Node endpoints are IP addresses, and requests to them are still verified
+against the host they are sent to. A certificate issued for the ``api_url``
+hostname does not match them, so clusters with ``verify_ssl`` set only use the
+``api_url`` host; failover and hedged reads need ``verify_ssl`` off.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Node
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the latency moving average
+LATENCY_SMOOTHING = 0.3
+# Node addresses are reloaded from the database this often (seconds)
+ENDPOINT_REFRESH = 300
+# Upper bound of the quarantine of an endpoint that keeps failing (seconds)
+MAX_QUARANTINE = 600
+
+
+class EndpointSet:
+    """Ranked API hosts of one cluster; the ``api_url`` host always comes first on ties"""
+
+    def __init__(self, cluster_id, primary, port, verify_ssl=False):
+        self.cluster_id = cluster_id
+        self.primary = primary
+        self.port = port
+        self.verify_ssl = verify_ssl
+        self.node_hosts = {}
+        self.latency = {}
+        self.failures = {}
+        self.down_until = {}
+        self.loaded_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """Reload node addresses from the database when they are stale"""
+        # Node addresses would fail certificate verification (see module docstring)
+        if not settings.PROXMOX_ENDPOINT_FAILOVER or self.verify_ssl:
+            return
+        now = time.monotonic()
+        if not force and self.loaded_at and now - self.loaded_at < ENDPOINT_REFRESH:
+            return
+        self.loaded_at = now
+        node_hosts = dict(
+            Node.objects.filter(cluster_id=self.cluster_id, status="online")
+            .exclude(ip_address=None)
+            .values_list("name", "ip_address")
+        )
+        with self._lock:
+            self.node_hosts = node_hosts
+
+    def hosts(self):
+        hosts = [self.primary]
+        for host in self.node_hosts.values():
+            if host not in hosts:
+                hosts.append(host)
+        return hosts
+
+    def candidates(self):
+        """
+        Hosts in the order they should be tried: healthy ones by latency, then
+        quarantined ones by how soon their quarantine ends.
+
+        Hosts that were never measured rank as fastest, so each is tried once.
+        """
+        self.refresh()
+        now = time.monotonic()
+        with self._lock:
+            hosts = self.hosts()
+            healthy = [h for h in hosts if self.down_until.get(h, 0) <= now]
+            down = [h for h in hosts if self.down_until.get(h, 0) > now]
+            healthy.sort(key=lambda h: self.latency.get(h, 0))
+            down.sort(key=lambda h: self.down_until[h])
+        return healthy + down
+
+    def best(self):
+        return self.candidates()[0]
+
+    def host_for_node(self, node_name):
+        """The node's own address when it is healthy, otherwise the best host"""
+        self.refresh()
+        host = self.node_hosts.get(node_name)
+        if host and self.down_until.get(host, 0) <= time.monotonic():
+            return host
+        return self.best()
+
+    def record_latency(self, host, seconds):
+        with self._lock:
+            previous = self.latency.get(host)
+            if previous is None:
+                self.latency[host] = seconds
+            else:
+                self.latency[host] = (
+                    LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * previous
+                )
+            self.failures.pop(host, None)
+            self.down_until.pop(host, None)
+
+    def mark_down(self, host, error):
+        """Skip ``host`` for a quarantine that doubles with every consecutive failure"""
+        with self._lock:
+            failures = self.failures.get(host, 0) + 1
+            self.failures[host] = failures
+            quarantine = min(
+                settings.PROXMOX_ENDPOINT_QUARANTINE * 2 ** (failures - 1), MAX_QUARANTINE
+            )
+            self.down_until[host] = time.monotonic() + quarantine
+        logger.warning(
+            f"API endpoint {host} of cluster {self.cluster_id} failed, "
+            f"skipping it for {quarantine}s: {str(error)}"
+        )
+
+    def snapshot(self):
+        """Per-host state for display, in candidate order"""
+        now = time.monotonic()
+        return [
+            {
+                "host": host,
+                "latency_ms": (
+                    round(self.latency[host] * 1000, 1) if host in self.latency else None
+                ),
+                "down_for": max(int(self.down_until.get(host, 0) - now), 0),
+            }
+            for host in self.candidates()
+        ]
+
+
+class EndpointRegistry:
+    """Cluster id -> EndpointSet map shared by all threads of a process"""
+
+    def __init__(self):
+        self._sets = {}
+        self._lock = threading.Lock()
+
+    def get(self, cluster_id, primary, port, verify_ssl=False):
+        with self._lock:
+            endpoints = self._sets.get(cluster_id)
+            if endpoints is None or (
+                endpoints.primary,
+                endpoints.port,
+                endpoints.verify_ssl,
+            ) != (primary, port, verify_ssl):
+                endpoints = EndpointSet(cluster_id, primary, port, verify_ssl)
+                self._sets[cluster_id] = endpoints
+        return endpoints
+
+    def refresh(self, cluster_id):
+        with self._lock:
+            endpoints = self._sets.get(cluster_id)
+        if endpoints is not None:
+            endpoints.refresh(force=True)
+
+    def forget(self, cluster_id):
+        with self._lock:
+            self._sets.pop(cluster_id, None)
+
+
+registry = EndpointRegistry()
+
+
+def discover_endpoints(cluster, prox):
+    """
+    Store the address of every node listed in ``/cluster/status`` on its
+    ``Node`` row. Returns the number of nodes whose address changed.
+    """
+    addresses = {
+        entry["name"]: entry["ip"]
+        for entry in prox.cluster.status.get()
+        if entry.get("type") == "node" and entry.get("ip")
+    }
+    changed = []
+    for node in Node.objects.filter(cluster=cluster, name__in=addresses):
+        if node.ip_address != addresses[node.name]:
+            node.ip_address = addresses[node.name]
+            changed.append(node)
+    if changed:
+        Node.objects.bulk_update(changed, ["ip_address"])
+        registry.refresh(cluster.pk)
+        logger.info(
+            f"Cluster {cluster.name}: learned API endpoints of {len(changed)} nodes"
+        )
+    return len(changed)
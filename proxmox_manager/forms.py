@@ -6,9 +6,19 @@ from .models import Node, ProxmoxCluster, VirtualMachine
 class ProxmoxClusterForm(forms.ModelForm):
     class Meta:
         model = ProxmoxCluster
-        fields = ["name", "api_url", "username", "password", "verify_ssl", "is_active"]
+        fields = [
+            "name",
+            "api_url",
+            "username",
+            "password",
+            "token_name",
+            "token_value",
+            "verify_ssl",
+            "is_active",
+        ]
         widgets = {
             "password": forms.PasswordInput(),
+            "token_value": forms.PasswordInput(),
             "api_url": forms.URLInput(
                 attrs={"placeholder": "https://192.168.1.100:8006"}
             ),
@@ -0,0 +1,165 @@
+"""
+Live updates pushed to browsers over Server-Sent Events.
+
+Sync writes, task state changes and progress updates publish small JSON events
+to the Redis channel ``LIVE_CHANNEL``. Each ASGI web process holds a single
+subscription to it (:class:`LiveHub`) and fans the events out to its open
+``/api/events/`` streams, so a browser keeps one idle connection instead of
+polling, and Redis sees one subscriber per process rather than one per tab.
+
+Events:
+
+``stats``
+    inventory totals, as returned by ``stats.inventory_stats``
+``cluster``
+    summary counts of one cluster after a sync write, and the rows of its nodes
+    that changed or whose guest counts changed
+``task``
+    state of a ``CeleryTask``, or only its progress while it runs
+
+Publishing fails open like the other Redis side channels: without Redis the
+pages fall back to polling.
+"""
+
+import asyncio
+import json
+import logging
+
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.db import transaction
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+LIVE_CHANNEL = "pxmx:live"
+# Events buffered per stream; a browser that falls further behind is
+# disconnected and reconnects
+STREAM_BUFFER = 256
+# Seconds between keepalive comments, so proxies do not close idle streams
+KEEPALIVE_INTERVAL = 15
+# Milliseconds browsers wait before reconnecting a dropped stream
+RECONNECT_DELAY = 5000
+
+
+def encode(event, data):
+    return json.dumps({"event": event, "data": data}, default=str)
+
+
+def publish(event, data):
+    try:
+        get_redis().publish(LIVE_CHANNEL, encode(event, data))
+    except redis.RedisError as e:
+        logger.debug(f"Could not publish {event} event: {str(e)}")
+
+
+def publish_on_commit(event, build):
+    """Publish ``build()`` once the current transaction commits"""
+    transaction.on_commit(lambda: publish(event, build()))
+
+
+def task_event(task):
+    """``task`` event payload of a ``CeleryTask``"""
+    return {
+        "task_id": task.task_id,
+        "task_name": task.task_name,
+        "state": task.state,
+        "progress": task.progress,
+        "progress_message": task.progress_message,
+        "result": task.result,
+        "is_running": task.is_running,
+        "is_completed": task.is_completed,
+        "vm_id": task.vm_id,
+        "cluster_id": task.cluster_id,
+    }
+
+
+def sse_message(raw):
+    """Format a published event as an SSE message"""
+    message = json.loads(raw)
+    return f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+
+
+class Subscription:
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=STREAM_BUFFER)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+        # Wake the stream up; it sees ``closed`` whatever it receives
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+
+class LiveHub:
+    """Shares one Redis subscription between the event streams of a process"""
+
+    def __init__(self):
+        self.subscriptions = set()
+        self.reader = None
+
+    def subscribe(self):
+        subscription = Subscription()
+        self.subscriptions.add(subscription)
+        if self.reader is None:
+            self.reader = asyncio.get_running_loop().create_task(self.read())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+
+    async def read(self):
+        client = redis.asyncio.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(LIVE_CHANNEL)
+            while self.subscriptions:
+                raw = await pubsub.get_message(timeout=KEEPALIVE_INTERVAL)
+                if raw is None:
+                    continue
+                message = sse_message(raw["data"])
+                for subscription in list(self.subscriptions):
+                    try:
+                        subscription.queue.put_nowait(message)
+                    except asyncio.QueueFull:
+                        logger.info("Dropping a live event stream that fell behind")
+                        self.unsubscribe(subscription)
+                        subscription.closed = True
+        except (redis.RedisError, OSError) as e:
+            logger.warning(f"Live event subscription failed: {str(e)}")
+            for subscription in list(self.subscriptions):
+                self.unsubscribe(subscription)
+                subscription.close()
+        finally:
+            # Cleared before the first await so a new subscriber starts a new reader
+            self.reader = None
+            await pubsub.aclose()
+            await client.aclose()
+
+
+hub = LiveHub()
+
+
+async def event_stream():
+    """Async iterator of SSE messages for one browser"""
+    subscription = hub.subscribe()
+    try:
+        yield f"retry: {RECONNECT_DELAY}\n\n"
+        while not subscription.closed:
+            try:
+                message = await asyncio.wait_for(
+                    subscription.queue.get(), KEEPALIVE_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if message is None or subscription.closed:
+                break
+            yield message
+    finally:
+        hub.unsubscribe(subscription)
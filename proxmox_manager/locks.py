@@ -0,0 +1,200 @@
+"""
+Distributed single-flight locks for sync tasks.
+
+A lock is a Redis key holding the id of the task that owns it, with a lease
+that the running task keeps extending from a heartbeat thread. Enqueuers
+reserve the lock for the task id they are about to send, so a second request
+for the same cluster or node attaches to the in-flight task instead of
+starting a duplicate.
+
+Locks fail open: when Redis is unreachable tasks run unguarded rather than not
+at all.
+"""
+
+import functools
+import logging
+import threading
+import uuid
+from contextlib import contextmanager
+
+import redis
+from celery import current_task
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# Lease of a running task, renewed every LEASE_TTL / 3 seconds
+LEASE_TTL = 120
+# How long an enqueued task may wait in the queue before its reservation lapses
+RESERVE_TTL = 900
+
+EXTEND_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlightLock:
+    def __init__(self, key, ttl=LEASE_TTL):
+        self.key = key
+        self.ttl = ttl
+
+    def owner(self):
+        try:
+            return get_redis().get(self.key)
+        except redis.RedisError:
+            return None
+
+    def reserve(self, owner, ttl=RESERVE_TTL):
+        """
+        Claim the lock for a task about to be enqueued.
+
+        Returns ``owner`` if the lock was free, otherwise the id of the task
+        already holding it.
+        """
+        client = get_redis()
+        try:
+            if client.set(self.key, owner, nx=True, px=int(ttl * 1000)):
+                return owner
+            return client.get(self.key) or self.reserve(owner, ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Could not reserve lock {self.key}: {str(e)}")
+            return owner
+
+    def acquire(self, owner):
+        """Take the lock for a starting task; True if ``owner`` now holds it"""
+        client = get_redis()
+        try:
+            if client.set(self.key, owner, nx=True, px=self.ttl * 1000):
+                return True
+            return self.extend(owner)
+        except redis.RedisError as e:
+            logger.warning(f"Could not acquire lock {self.key}: {str(e)}")
+            return True
+
+    def extend(self, owner, ttl=None):
+        try:
+            return bool(
+                get_redis().eval(
+                    EXTEND_SCRIPT, 1, self.key, owner, int((ttl or self.ttl) * 1000)
+                )
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Could not extend lock {self.key}: {str(e)}")
+            return True
+
+    def release(self, owner):
+        try:
+            get_redis().eval(RELEASE_SCRIPT, 1, self.key, owner)
+        except redis.RedisError as e:
+            logger.warning(f"Could not release lock {self.key}: {str(e)}")
+
+    @contextmanager
+    def held(self, owner):
+        """
+        Keep the lease alive from a heartbeat thread, then release it.
+
+        If the body called :func:`hand_off_lock` the lock is kept for the
+        requested time instead, for whoever finishes the work to release.
+        """
+        _local.hand_off_ttl = None
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(self.ttl / 3):
+                if not self.extend(owner):
+                    logger.warning(f"Lost lock {self.key} held by {owner}")
+                    return
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+            hand_off_ttl, _local.hand_off_ttl = _local.hand_off_ttl, None
+            if hand_off_ttl:
+                self.extend(owner, hand_off_ttl)
+            else:
+                self.release(owner)
+
+
+def hand_off_lock(ttl=RESERVE_TTL):
+    """
+    Keep the lock of the running single-flight task for ``ttl`` seconds after
+    it returns, e.g. until the callback of a chord it started releases it.
+    """
+    _local.hand_off_ttl = ttl
+
+
+def cluster_sync_lock(cluster_id, *args, **kwargs):
+    return SingleFlightLock(f"pxmx:sync-lock:cluster:{cluster_id}")
+
+
+def node_sync_lock(node_id, *args, **kwargs):
+    return SingleFlightLock(f"pxmx:sync-lock:node:{node_id}")
+
+
+def task_tracker_lock(cluster_id, *args, **kwargs):
+    return SingleFlightLock(f"pxmx:task-tracker-lock:cluster:{cluster_id}")
+
+
+def event_watcher_lock(cluster_id, *args, **kwargs):
+    return SingleFlightLock(f"pxmx:event-watcher-lock:cluster:{cluster_id}")
+
+
+def lock_owner():
+    """Id of the running Celery task, or a random id outside of a worker"""
+    return (current_task and current_task.request.id) or uuid.uuid4().hex
+
+
+def single_flight(lock_for):
+    """
+    Decorate a task body so it only runs while holding ``lock_for(*args)``.
+
+    A task started while another task holds the lock returns immediately.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            lock = lock_for(*args, **kwargs)
+            owner = lock_owner()
+            if not lock.acquire(owner):
+                holder = lock.owner()
+                logger.info(f"Skipping {func.__name__}{args}: running as task {holder}")
+                return f"Skipped: already running as task {holder}"
+            with lock.held(owner):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def enqueue_single_flight(task, lock, args=(), **options):
+    """
+    Send ``task`` unless ``lock`` is already held or reserved.
+
+    Returns ``(task_id, started)``; when not started, ``task_id`` is the id of
+    the in-flight task.
+    """
+    task_id = uuid.uuid4().hex
+    owner = lock.reserve(task_id)
+    if owner != task_id:
+        return owner, False
+    task.apply_async(args, task_id=task_id, **options)
+    return task_id, True
@@ -0,0 +1,153 @@
+"""
+Django management command measuring concurrent console opens against a running
+server, to compare deployments (gunicorn sync workers on ``pxmx.wsgi`` against
+uvicorn workers on ``pxmx.asgi``).
+
+While the console requests run, a probe requests a cheap page in a loop; its
+latency shows whether slow Proxmox calls hold up the rest of the UI.
+"""
+
+import asyncio
+import re
+import statistics
+import time
+
+import aiohttp
+from django.core.management.base import BaseCommand, CommandError
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = "Open many guest consoles concurrently and report latencies"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            default="http://localhost:8000",
+            help="Base URL of the server under test (default: http://localhost:8000)",
+        )
+        parser.add_argument("--username", required=True, help="Dashboard user")
+        parser.add_argument("--password", required=True, help="Dashboard password")
+        parser.add_argument(
+            "--vm", type=int, required=True, help="Id of the guest whose console to open"
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=60,
+            help="Console opens in total (default: 60)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=20,
+            help="Console opens in flight at once (default: 20)",
+        )
+        parser.add_argument(
+            "--proxy",
+            action="store_true",
+            help="Request the console proxy JSON API instead of the console page",
+        )
+        parser.add_argument(
+            "--probe",
+            default="/api/dashboard/stats/",
+            help="Page requested in a loop meanwhile (default: /api/dashboard/stats/)",
+        )
+
+    def handle(self, *args, **options):
+        results = asyncio.run(self.run(options))
+        console, probe, elapsed, failures = results
+
+        self.stdout.write(
+            f"{len(console)} console opens in {elapsed:.2f}s "
+            f"({len(console) / elapsed:.1f}/s), {failures} failed"
+        )
+        for label, latencies in (("console", console), ("probe", probe)):
+            self.stdout.write(
+                f"{label:>8}: n={len(latencies)} "
+                f"p50={percentile(latencies, 0.5) * 1000:.0f}ms "
+                f"p95={percentile(latencies, 0.95) * 1000:.0f}ms "
+                f"max={max(latencies, default=0) * 1000:.0f}ms "
+                f"mean={statistics.fmean(latencies) * 1000 if latencies else 0:.0f}ms"
+            )
+
+    async def login(self, session, base_url, username, password):
+        login_url = f"{base_url}/admin/login/"
+        async with session.get(login_url) as response:
+            match = CSRF_INPUT.search(await response.text())
+        if not match:
+            raise CommandError(f"No login form at {login_url}")
+        async with session.post(
+            login_url,
+            data={
+                "csrfmiddlewaretoken": match.group(1),
+                "username": username,
+                "password": password,
+                "next": "/",
+            },
+            headers={"Referer": login_url},
+            allow_redirects=False,
+        ) as response:
+            if response.status != 302:
+                raise CommandError("Login failed")
+
+    async def run(self, options):
+        base_url = options["url"].rstrip("/")
+        path = f"/vms/{options['vm']}/console/"
+        if options["proxy"]:
+            path += "proxy/"
+
+        async with aiohttp.ClientSession(
+            # unsafe: keep the session cookie of servers addressed by IP
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+            connector=aiohttp.TCPConnector(limit=options["concurrency"] + 1),
+            timeout=aiohttp.ClientTimeout(total=300),
+        ) as session:
+            await self.login(
+                session, base_url, options["username"], options["password"]
+            )
+
+            semaphore = asyncio.Semaphore(options["concurrency"])
+            console = []
+            failures = 0
+
+            async def open_console():
+                nonlocal failures
+                async with semaphore:
+                    started = time.monotonic()
+                    async with session.get(
+                        f"{base_url}{path}", allow_redirects=False
+                    ) as response:
+                        await response.read()
+                        # A failed console open redirects to the guest page
+                        if response.status != 200:
+                            failures += 1
+                    console.append(time.monotonic() - started)
+
+            probe = []
+            done = asyncio.Event()
+
+            async def run_probe():
+                while not done.is_set():
+                    started = time.monotonic()
+                    async with session.get(f"{base_url}{options['probe']}") as response:
+                        await response.read()
+                    probe.append(time.monotonic() - started)
+                    await asyncio.sleep(0.1)
+
+            prober = asyncio.create_task(run_probe())
+            started = time.monotonic()
+            await asyncio.gather(*(open_console() for _ in range(options["requests"])))
+            elapsed = time.monotonic() - started
+            done.set()
+            await prober
+
+        return console, probe, elapsed, failures
@@ -1,56 +1,69 @@
 """
-Django management command to start the VNC websockify proxy server.
-This server tunnels VNC connections from the web browser to Proxmox VMs via SSH.
+Django management command to start the VNC console relay.
+The relay bridges noVNC WebSockets from the browser to the VNC ports of
+Proxmox guests over one multiplexed SSH connection per host (see vnc_relay.py).
 """
 
-import subprocess
-import sys
+import os
+import ssl
 
-from django.core.management.base import BaseCommand
+from aiohttp import web
+from django.core.management.base import BaseCommand, CommandError
+
+from proxmox_manager.vnc_relay import relay_app
 
 
 class Command(BaseCommand):
-    help = "Start websockify VNC proxy server for console access"
+    help = "Start the VNC console relay for browser console access"
 
     def add_arguments(self, parser):
         parser.add_argument(
             "--host",
             type=str,
             default="0.0.0.0",
-            help="Host to bind websockify server (default: 0.0.0.0)",
+            help="Host to bind the relay to (default: 0.0.0.0)",
         )
         parser.add_argument(
             "--port",
             type=int,
             default=6080,
-            help="Port for websockify server (default: 6080)",
+            help="Port for the relay (default: 6080)",
         )
+        parser.add_argument(
+            "--web",
+            type=str,
+            default="/usr/share/novnc",
+            help="noVNC directory to serve, if it exists (default: /usr/share/novnc)",
+        )
+        parser.add_argument("--cert", type=str, help="TLS certificate chain (PEM)")
+        parser.add_argument("--key", type=str, help="TLS private key (PEM)")
 
     def handle(self, *args, **options):
         host = options["host"]
         port = options["port"]
 
-        self.stdout.write(
-            self.style.SUCCESS(f"Starting websockify VNC proxy server on {host}:{port}")
-        )
+        ssl_context = None
+        if options["cert"]:
+            ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            try:
+                ssl_context.load_cert_chain(options["cert"], options["key"])
+            except (OSError, ssl.SSLError) as e:
+                raise CommandError(f"Could not load TLS certificate: {e}")
 
-        # Start websockify server
-        # It will handle connections on port 6080 and forward them via SSH tunnels
-        try:
-            subprocess.run(
-                [
-                    "websockify",
-                    f"{host}:{port}",
-                    "--web=/usr/share/novnc",
-                    "--ssl-only",
-                    "--cert=/etc/letsencrypt/live/manage.koetsier.it/fullchain.pem",
-                    "--key=/etc/letsencrypt/live/manage.koetsier.it/privkey.pem",
-                ],
-                check=True,
+        web_dir = options["web"] if os.path.isdir(options["web"]) else None
+        if web_dir is None:
+            self.stdout.write(
+                self.style.WARNING(f"{options['web']} not found, not serving noVNC")
             )
-        except KeyboardInterrupt:
-            self.stdout.write(self.style.WARNING("\nShutting down VNC proxy server"))
-            sys.exit(0)
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Error starting VNC proxy: {e}"))
-            sys.exit(1)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Starting VNC console relay on {host}:{port}")
+        )
+        web.run_app(
+            relay_app(web_dir),
+            host=host,
+            port=port,
+            ssl_context=ssl_context,
+            print=None,
+        )
+        self.stdout.write(self.style.WARNING("\nShutting down VNC console relay"))
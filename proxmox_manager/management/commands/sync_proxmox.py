@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from proxmox_manager.models import ProxmoxCluster
-from proxmox_manager.tasks import sync_cluster_data
+from proxmox_manager.tasks import SYNC_MODES, enqueue_cluster_sync
 
 
 class Command(BaseCommand):
@@ -17,16 +17,26 @@ class Command(BaseCommand):
             action="store_true",
             help="Sync all active clusters",
         )
+        parser.add_argument(
+            "--mode",
+            choices=SYNC_MODES,
+            help="Inventory sync mode (default: PROXMOX_SYNC_MODE setting)",
+        )
 
     def handle(self, *args, **options):
         if options["cluster"]:
             try:
                 cluster = ProxmoxCluster.objects.get(id=options["cluster"])
                 self.stdout.write(f"Syncing cluster: {cluster.name}")
-                result = sync_cluster_data.delay(cluster.id)
-                self.stdout.write(
-                    self.style.SUCCESS(f"Sync task initiated: {result.id}")
-                )
+                task_id, started = enqueue_cluster_sync(cluster.id, options["mode"])
+                if started:
+                    self.stdout.write(
+                        self.style.SUCCESS(f"Sync task initiated: {task_id}")
+                    )
+                else:
+                    self.stdout.write(
+                        self.style.WARNING(f"Sync already running: {task_id}")
+                    )
             except ProxmoxCluster.DoesNotExist:
                 self.stdout.write(
                     self.style.ERROR(f'Cluster with ID {options["cluster"]} not found')
@@ -37,8 +47,9 @@ class Command(BaseCommand):
             self.stdout.write(f"Syncing {clusters.count()} active clusters")
 
             for cluster in clusters:
-                self.stdout.write(f"  - {cluster.name}")
-                sync_cluster_data.delay(cluster.id)
+                task_id, started = enqueue_cluster_sync(cluster.id, options["mode"])
+                status = "started" if started else "already running"
+                self.stdout.write(f"  - {cluster.name} ({status}: {task_id})")
 
             self.stdout.write(self.style.SUCCESS("All sync tasks initiated"))
 
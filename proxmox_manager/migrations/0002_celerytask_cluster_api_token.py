@@ -0,0 +1,56 @@
+# Generated by Django 5.0.2 on 2026-10-16 22:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proxmox_manager', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proxmoxcluster',
+            name='token_name',
+            field=models.CharField(blank=True, help_text='API token ID (e.g., pxmx); used instead of the password when set', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='proxmoxcluster',
+            name='token_value',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='proxmoxcluster',
+            name='password',
+            field=models.CharField(blank=True, help_text='Leave empty when using an API token', max_length=255),
+        ),
+        migrations.CreateModel(
+            name='CeleryTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.CharField(db_index=True, max_length=255, unique=True)),
+                ('task_name', models.CharField(db_index=True, max_length=255)),
+                ('state', models.CharField(choices=[('PENDING', 'Pending'), ('STARTED', 'Started'), ('SUCCESS', 'Success'), ('FAILURE', 'Failure'), ('RETRY', 'Retry'), ('REVOKED', 'Revoked')], db_index=True, default='PENDING', max_length=50)),
+                ('result', models.TextField(blank=True, null=True)),
+                ('traceback', models.TextField(blank=True, null=True)),
+                ('progress', models.IntegerField(default=0, help_text='Progress percentage (0-100)')),
+                ('progress_message', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('cluster', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='proxmox_manager.proxmoxcluster')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('vm', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='proxmox_manager.virtualmachine')),
+            ],
+            options={
+                'verbose_name': 'Celery Task',
+                'verbose_name_plural': 'Celery Tasks',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['-created_at', 'state'], name='proxmox_man_created_6a421e_idx'), models.Index(fields=['task_name', '-created_at'], name='proxmox_man_task_na_0d8416_idx')],
+            },
+        ),
+    ]
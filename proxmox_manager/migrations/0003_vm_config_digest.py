@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-16 22:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proxmox_manager', '0002_celerytask_cluster_api_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='virtualmachine',
+            name='config_digest',
+            field=models.CharField(blank=True, help_text='Digest of the last fetched Proxmox config', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='virtualmachine',
+            name='config_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='virtualmachine',
+            name='listing_digest',
+            field=models.CharField(blank=True, help_text='Fingerprint of the config-related fields of the guest listing', max_length=40),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-16 22:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proxmox_manager', '0003_vm_config_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClusterSyncSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval', models.PositiveIntegerField(help_text='Current sync interval in seconds')),
+                ('next_sync_at', models.DateTimeField(db_index=True)),
+                ('last_sync_at', models.DateTimeField(blank=True, null=True)),
+                ('last_duration', models.FloatField(blank=True, help_text='Duration of the last sync in seconds', null=True)),
+                ('last_churn', models.IntegerField(default=0, help_text='Guests created, moved, deleted or changed by the last sync')),
+                ('pending_churn', models.IntegerField(default=0, help_text='Churn recorded since the last sync completed')),
+                ('cluster', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sync_schedule', to='proxmox_manager.proxmoxcluster')),
+            ],
+            options={
+                'verbose_name': 'Cluster Sync Schedule',
+                'verbose_name_plural': 'Cluster Sync Schedules',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-16 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proxmox_manager', '0004_cluster_sync_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='duration',
+            field=models.FloatField(blank=True, help_text='Duration of the Proxmox task in seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='exit_status',
+            field=models.CharField(blank=True, help_text='Exit status of the Proxmox task', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='celerytask',
+            name='upid',
+            field=models.CharField(blank=True, db_index=True, help_text='Proxmox task (UPID) this task is waiting for', max_length=255),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-16 22:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proxmox_manager', '0005_operation_task_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clustersyncschedule',
+            name='event_cursor',
+            field=models.BigIntegerField(blank=True, help_text='End time (epoch) of the newest cluster task log entry handled', null=True),
+        ),
+        migrations.AddField(
+            model_name='clustersyncschedule',
+            name='event_cursor_upids',
+            field=models.JSONField(blank=True, default=list, help_text='UPIDs already handled that ended at event_cursor'),
+        ),
+    ]
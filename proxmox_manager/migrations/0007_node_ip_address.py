@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-16 23:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proxmox_manager', '0006_event_cursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='node',
+            name='ip_address',
+            field=models.GenericIPAddressField(blank=True, help_text='Address the node serves the Proxmox API on, from /cluster/status', null=True),
+        ),
+    ]
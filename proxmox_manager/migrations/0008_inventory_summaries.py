@@ -0,0 +1,100 @@
+# Generated by Django 5.0.2 on 2026-10-16 23:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_summaries(apps, schema_editor):
+    """Fill the summaries of existing clusters; syncs keep them current afterwards"""
+    ProxmoxCluster = apps.get_model("proxmox_manager", "ProxmoxCluster")
+    Node = apps.get_model("proxmox_manager", "Node")
+    VirtualMachine = apps.get_model("proxmox_manager", "VirtualMachine")
+    ClusterSummary = apps.get_model("proxmox_manager", "ClusterSummary")
+    NodeSummary = apps.get_model("proxmox_manager", "NodeSummary")
+
+    guest_totals = {
+        "vm_count": models.Count("id"),
+        "running_vms": models.Count("id", filter=models.Q(status="running")),
+        "stopped_vms": models.Count("id", filter=models.Q(status="stopped")),
+    }
+    for node in Node.objects.all():
+        NodeSummary.objects.create(
+            node=node,
+            **VirtualMachine.objects.filter(node=node).aggregate(
+                **guest_totals,
+                cpu_cores=models.Sum("cpu_cores", default=0),
+                ram_mb=models.Sum("ram_mb", default=0),
+                disk_gb=models.Sum("disk_gb", default=0.0),
+            ),
+        )
+    for cluster in ProxmoxCluster.objects.all():
+        ClusterSummary.objects.create(
+            cluster=cluster,
+            **Node.objects.filter(cluster=cluster).aggregate(
+                node_count=models.Count("id"),
+                online_nodes=models.Count("id", filter=models.Q(status="online")),
+                cpu_usage_sum=models.Sum("cpu_usage", default=0.0),
+                ram_usage_sum=models.Sum("ram_usage", default=0.0),
+                disk_usage_sum=models.Sum("disk_usage", default=0.0),
+                ram_total=models.Sum("ram_total", default=0),
+                ram_used=models.Sum("ram_used", default=0),
+                disk_total=models.Sum("disk_total", default=0),
+                disk_used=models.Sum("disk_used", default=0),
+            ),
+            **VirtualMachine.objects.filter(node__cluster=cluster).aggregate(
+                **guest_totals
+            ),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proxmox_manager', '0007_node_ip_address'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClusterSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node_count', models.IntegerField(default=0)),
+                ('online_nodes', models.IntegerField(default=0)),
+                ('vm_count', models.IntegerField(default=0)),
+                ('running_vms', models.IntegerField(default=0)),
+                ('stopped_vms', models.IntegerField(default=0)),
+                ('cpu_usage_sum', models.FloatField(default=0.0, help_text='Sum of the node CPU usage percentages')),
+                ('ram_usage_sum', models.FloatField(default=0.0, help_text='Sum of the node RAM usage percentages')),
+                ('disk_usage_sum', models.FloatField(default=0.0, help_text='Sum of the node disk usage percentages')),
+                ('ram_total', models.BigIntegerField(default=0, help_text='Total node RAM in bytes')),
+                ('ram_used', models.BigIntegerField(default=0, help_text='Used node RAM in bytes')),
+                ('disk_total', models.BigIntegerField(default=0, help_text='Total node disk in bytes')),
+                ('disk_used', models.BigIntegerField(default=0, help_text='Used node disk in bytes')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('cluster', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='proxmox_manager.proxmoxcluster')),
+            ],
+            options={
+                'verbose_name': 'Cluster Summary',
+                'verbose_name_plural': 'Cluster Summaries',
+            },
+        ),
+        migrations.CreateModel(
+            name='NodeSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vm_count', models.IntegerField(default=0)),
+                ('running_vms', models.IntegerField(default=0)),
+                ('stopped_vms', models.IntegerField(default=0)),
+                ('cpu_cores', models.IntegerField(default=0, help_text='Cores allocated to guests')),
+                ('ram_mb', models.BigIntegerField(default=0, help_text='RAM allocated to guests in MB')),
+                ('disk_gb', models.FloatField(default=0.0, help_text='Disk allocated to guests in GB')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('node', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='proxmox_manager.node')),
+            ],
+            options={
+                'verbose_name': 'Node Summary',
+                'verbose_name_plural': 'Node Summaries',
+            },
+        ),
+        migrations.RunPython(create_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.2 on 2026-10-16 23:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proxmox_manager', '0008_inventory_summaries'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='virtualmachine',
+            index=models.Index(fields=['vmid'], name='proxmox_man_vmid_17f8a1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='virtualmachine',
+            index=models.Index(fields=['status', 'node', 'vmid'], name='proxmox_man_status_7d0b34_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='virtualmachine',
+            index=models.Index(fields=['vm_type', 'node', 'vmid'], name='proxmox_man_vm_type_f52055_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.2 on 2026-10-16 23:18
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+from django.db.models.functions import Upper
+
+# Quick search filters with icontains, which PostgreSQL runs as
+# UPPER(column::text) LIKE UPPER(...); these indexes serve exactly that.
+TRIGRAM_INDEXES = [
+    GinIndex(OpClass(Upper(field), name="gin_trgm_ops"), name=f"vm_{field}_trgm_idx")
+    for field in ("name", "tags", "ip_addresses")
+]
+
+
+def add_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    VirtualMachine = apps.get_model("proxmox_manager", "VirtualMachine")
+    for index in TRIGRAM_INDEXES:
+        schema_editor.add_index(VirtualMachine, index)
+
+
+def remove_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    VirtualMachine = apps.get_model("proxmox_manager", "VirtualMachine")
+    for index in TRIGRAM_INDEXES:
+        schema_editor.remove_index(VirtualMachine, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proxmox_manager', '0009_vm_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='virtualmachine',
+            name='ip_addresses',
+            field=models.CharField(blank=True, default='', help_text="Static IPs from the guest's network config, space-separated", max_length=255),
+        ),
+        migrations.AddField(
+            model_name='virtualmachine',
+            name='tags',
+            field=models.CharField(blank=True, default='', help_text='Proxmox tags, space-separated', max_length=255),
+        ),
+        TrigramExtension(),
+        migrations.RunPython(add_trigram_indexes, remove_trigram_indexes),
+    ]
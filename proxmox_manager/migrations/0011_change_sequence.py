@@ -0,0 +1,63 @@
+# Generated by Django 5.0.2 on 2026-10-16 23:31
+
+from django.db import migrations, models
+
+
+def create_counter(apps, schema_editor):
+    # The single row writers lock to take sequence numbers (see changes.py)
+    ChangeCounter = apps.get_model("proxmox_manager", "ChangeCounter")
+    ChangeCounter.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proxmox_manager', '0010_quick_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+                ('pruned_through', models.BigIntegerField(default=0, help_text='Highest sequence number of the pruned tombstones')),
+            ],
+            options={
+                'verbose_name': 'Change Counter',
+                'verbose_name_plural': 'Change Counters',
+            },
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('node', 'Node'), ('vm', 'Virtual Machine'), ('task', 'Task')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('cluster_id', models.IntegerField(blank=True, null=True)),
+                ('change_seq', models.BigIntegerField(db_index=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Tombstone',
+                'verbose_name_plural': 'Tombstones',
+                'ordering': ['change_seq'],
+            },
+        ),
+        migrations.AddField(
+            model_name='celerytask',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, help_text='Change sequence number of the last write that changed this row'),
+        ),
+        migrations.AddField(
+            model_name='node',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, help_text='Change sequence number of the last write that changed this row'),
+        ),
+        migrations.AddField(
+            model_name='virtualmachine',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, help_text='Change sequence number of the last write that changed this row'),
+        ),
+        migrations.RunPython(create_counter, migrations.RunPython.noop),
+    ]
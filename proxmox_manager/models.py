@@ -1,5 +1,6 @@
 from cryptography.fernet import Fernet
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
 
@@ -12,7 +13,15 @@ class ProxmoxCluster(models.Model):
     username = models.CharField(
         max_length=100, help_text="API username (e.g., root@pam)"
     )
-    password = models.CharField(max_length=255)
+    password = models.CharField(
+        max_length=255, blank=True, help_text="Leave empty when using an API token"
+    )
+    token_name = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="API token ID (e.g., pxmx); used instead of the password when set",
+    )
+    token_value = models.CharField(max_length=255, blank=True)
     verify_ssl = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -26,6 +35,55 @@ class ProxmoxCluster(models.Model):
     def __str__(self):
         return self.name
 
+    def clean(self):
+        if self.token_name and not self.token_value:
+            raise ValidationError({"token_value": "Required when a token ID is set."})
+        if not self.token_name and not self.password:
+            raise ValidationError(
+                {"password": "Either a password or an API token is required."}
+            )
+
+
+class ClusterSyncSchedule(models.Model):
+    """Adaptive sync interval of a cluster, maintained by ``scheduling.py``"""
+
+    cluster = models.OneToOneField(
+        ProxmoxCluster, on_delete=models.CASCADE, related_name="sync_schedule"
+    )
+    interval = models.PositiveIntegerField(help_text="Current sync interval in seconds")
+    next_sync_at = models.DateTimeField(db_index=True)
+    last_sync_at = models.DateTimeField(null=True, blank=True)
+    last_duration = models.FloatField(
+        null=True, blank=True, help_text="Duration of the last sync in seconds"
+    )
+    last_churn = models.IntegerField(
+        default=0, help_text="Guests created, moved, deleted or changed by the last sync"
+    )
+    pending_churn = models.IntegerField(
+        default=0, help_text="Churn recorded since the last sync completed"
+    )
+    event_cursor = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="End time (epoch) of the newest cluster task log entry handled",
+    )
+    event_cursor_upids = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="UPIDs already handled that ended at event_cursor",
+    )
+
+    class Meta:
+        verbose_name = "Cluster Sync Schedule"
+        verbose_name_plural = "Cluster Sync Schedules"
+
+    def __str__(self):
+        return f"{self.cluster.name} every {self.interval}s"
+
+    @property
+    def interval_minutes(self):
+        return round(self.interval / 60, 1)
+
 
 class Node(models.Model):
     STATUS_CHOICES = [
@@ -49,7 +107,17 @@ class Node(models.Model):
     disk_total = models.BigIntegerField(default=0, help_text="Total disk in bytes")
     disk_used = models.BigIntegerField(default=0, help_text="Used disk in bytes")
     uptime = models.BigIntegerField(default=0, help_text="Uptime in seconds")
+    ip_address = models.GenericIPAddressField(
+        null=True,
+        blank=True,
+        help_text="Address the node serves the Proxmox API on, from /cluster/status",
+    )
     last_synced = models.DateTimeField(default=timezone.now)
+    change_seq = models.BigIntegerField(
+        default=0,
+        db_index=True,
+        help_text="Change sequence number of the last write that changed this row",
+    )
 
     class Meta:
         verbose_name = "Node"
@@ -77,6 +145,75 @@ class Node(models.Model):
         return round(self.disk_total / (1024**3), 2)
 
 
+class ClusterSummary(models.Model):
+    """Node and guest totals of a cluster, kept current by ``sync.refresh_summaries``"""
+
+    cluster = models.OneToOneField(
+        ProxmoxCluster, on_delete=models.CASCADE, related_name="summary"
+    )
+    node_count = models.IntegerField(default=0)
+    online_nodes = models.IntegerField(default=0)
+    vm_count = models.IntegerField(default=0)
+    running_vms = models.IntegerField(default=0)
+    stopped_vms = models.IntegerField(default=0)
+    cpu_usage_sum = models.FloatField(
+        default=0.0, help_text="Sum of the node CPU usage percentages"
+    )
+    ram_usage_sum = models.FloatField(
+        default=0.0, help_text="Sum of the node RAM usage percentages"
+    )
+    disk_usage_sum = models.FloatField(
+        default=0.0, help_text="Sum of the node disk usage percentages"
+    )
+    ram_total = models.BigIntegerField(default=0, help_text="Total node RAM in bytes")
+    ram_used = models.BigIntegerField(default=0, help_text="Used node RAM in bytes")
+    disk_total = models.BigIntegerField(default=0, help_text="Total node disk in bytes")
+    disk_used = models.BigIntegerField(default=0, help_text="Used node disk in bytes")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Cluster Summary"
+        verbose_name_plural = "Cluster Summaries"
+
+    def __str__(self):
+        return f"{self.cluster.name}: {self.node_count} nodes, {self.vm_count} guests"
+
+    def average(self, total):
+        return round(total / self.node_count, 2) if self.node_count else 0
+
+    @property
+    def avg_cpu(self):
+        return self.average(self.cpu_usage_sum)
+
+    @property
+    def avg_ram(self):
+        return self.average(self.ram_usage_sum)
+
+    @property
+    def avg_disk(self):
+        return self.average(self.disk_usage_sum)
+
+
+class NodeSummary(models.Model):
+    """Guest totals of a node, kept current by ``sync.refresh_summaries``"""
+
+    node = models.OneToOneField(Node, on_delete=models.CASCADE, related_name="summary")
+    vm_count = models.IntegerField(default=0)
+    running_vms = models.IntegerField(default=0)
+    stopped_vms = models.IntegerField(default=0)
+    cpu_cores = models.IntegerField(default=0, help_text="Cores allocated to guests")
+    ram_mb = models.BigIntegerField(default=0, help_text="RAM allocated to guests in MB")
+    disk_gb = models.FloatField(default=0.0, help_text="Disk allocated to guests in GB")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Node Summary"
+        verbose_name_plural = "Node Summaries"
+
+    def __str__(self):
+        return f"{self.node.name}: {self.vm_count} guests"
+
+
 class VirtualMachine(models.Model):
     TYPE_CHOICES = [
         ("qemu", "VM"),
@@ -103,13 +240,42 @@ class VirtualMachine(models.Model):
     cpu_usage = models.FloatField(default=0.0, help_text="CPU usage percentage")
     ram_usage = models.FloatField(default=0.0, help_text="RAM usage percentage")
     uptime = models.BigIntegerField(default=0, help_text="Uptime in seconds")
+    tags = models.CharField(
+        max_length=255, blank=True, default="", help_text="Proxmox tags, space-separated"
+    )
+    ip_addresses = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        help_text="Static IPs from the guest's network config, space-separated",
+    )
+    config_digest = models.CharField(
+        max_length=64, blank=True, help_text="Digest of the last fetched Proxmox config"
+    )
+    listing_digest = models.CharField(
+        max_length=40,
+        blank=True,
+        help_text="Fingerprint of the config-related fields of the guest listing",
+    )
+    config_synced_at = models.DateTimeField(null=True, blank=True)
     last_synced = models.DateTimeField(default=timezone.now)
+    change_seq = models.BigIntegerField(
+        default=0,
+        db_index=True,
+        help_text="Change sequence number of the last write that changed this row",
+    )
 
     class Meta:
         verbose_name = "Virtual Machine"
         verbose_name_plural = "Virtual Machines"
         unique_together = ["node", "vmid"]
         ordering = ["node", "vmid"]
+        indexes = [
+            # vm_list: numeric searches and keyset pages filtered by status/type
+            models.Index(fields=["vmid"]),
+            models.Index(fields=["status", "node", "vmid"]),
+            models.Index(fields=["vm_type", "node", "vmid"]),
+        ]
 
     def __str__(self):
         return f"{self.name} (ID: {self.vmid})"
@@ -150,6 +316,12 @@ class AuditLog(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     details = models.TextField(blank=True)
     task_id = models.CharField(max_length=255, blank=True)
+    exit_status = models.CharField(
+        max_length=255, blank=True, help_text="Exit status of the Proxmox task"
+    )
+    duration = models.FloatField(
+        null=True, blank=True, help_text="Duration of the Proxmox task in seconds"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
@@ -174,6 +346,12 @@ class CeleryTask(models.Model):
 
     task_id = models.CharField(max_length=255, unique=True, db_index=True)
     task_name = models.CharField(max_length=255, db_index=True)
+    upid = models.CharField(
+        max_length=255,
+        blank=True,
+        db_index=True,
+        help_text="Proxmox task (UPID) this task is waiting for",
+    )
     state = models.CharField(
         max_length=50, choices=TASK_STATE_CHOICES, default="PENDING", db_index=True
     )
@@ -195,6 +373,11 @@ class CeleryTask(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    change_seq = models.BigIntegerField(
+        default=0,
+        db_index=True,
+        help_text="Change sequence number of the last write that changed this row",
+    )
 
     class Meta:
         verbose_name = "Celery Task"
@@ -208,6 +391,14 @@ class CeleryTask(models.Model):
     def __str__(self):
         return f"{self.task_name} - {self.state} ({self.created_at})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        task = super().from_db(db, field_names, values)
+        # State as last read or saved, so ``signals.stamp_task`` can tell state
+        # transitions from progress and bookkeeping writes
+        task.saved_state = dict(zip(field_names, values)).get("state")
+        return task
+
     @property
     def execution_time(self):
         if self.started_at and self.completed_at:
@@ -222,3 +413,47 @@ class CeleryTask(models.Model):
     @property
     def is_completed(self):
         return self.state in ["SUCCESS", "FAILURE", "REVOKED"]
+
+
+class ChangeCounter(models.Model):
+    """
+    The change sequence of the delta APIs (see ``changes.py``): a single row
+    whose ``value`` every write that stamps rows increments
+    """
+
+    value = models.BigIntegerField(default=0)
+    pruned_through = models.BigIntegerField(
+        default=0, help_text="Highest sequence number of the pruned tombstones"
+    )
+
+    class Meta:
+        verbose_name = "Change Counter"
+        verbose_name_plural = "Change Counters"
+
+    def __str__(self):
+        return f"Change sequence {self.value}"
+
+
+class Tombstone(models.Model):
+    """A deleted node, guest or task, reported by the delta APIs"""
+
+    KIND_CHOICES = [
+        ("node", "Node"),
+        ("vm", "Virtual Machine"),
+        ("task", "Task"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    # Not a foreign key: tombstones outlive the rows of a deleted cluster
+    cluster_id = models.IntegerField(null=True, blank=True)
+    change_seq = models.BigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Tombstone"
+        verbose_name_plural = "Tombstones"
+        ordering = ["change_seq"]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted at {self.change_seq}"
@@ -0,0 +1,66 @@
+"""
+Keyset (cursor) pagination for large listings.
+
+A page is read with ``WHERE (node, vmid) > (<last node>, <last vmid>) ORDER BY
+node, vmid LIMIT n``, which an index on the ordering columns answers directly,
+so the cost of a page does not grow with how deep into the listing it is the
+way it does with OFFSET. The cursor is the ordering values of the last row of
+the previous page.
+"""
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was not produced by :func:`keyset_page`"""
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(values):
+    return ".".join(str(value) for value in values)
+
+
+def decode_cursor(cursor, length):
+    """Return the integer ordering values stored in ``cursor``"""
+    parts = cursor.split(".")
+    if len(parts) != length:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    try:
+        return [int(part) for part in parts]
+    except ValueError:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+
+
+def after_filter(fields, values):
+    """``(f1, f2, ...) > (v1, v2, ...)`` expressed as ``Q`` objects"""
+    condition = Q()
+    for i, field in enumerate(fields):
+        condition |= Q(**dict(zip(fields[:i], values[:i])), **{f"{field}__gt": values[i]})
+    return condition
+
+
+def keyset_page(queryset, fields, after=None, size=50):
+    """
+    Return the :class:`KeysetPage` of at most ``size`` rows of ``queryset``
+    ordered by ``fields`` that follows the cursor ``after``.
+
+    ``fields`` must be integer attributes (e.g. ``["node_id", "vmid"]``) that
+    together identify a row, so no row is skipped or repeated between pages.
+    """
+    if after:
+        queryset = queryset.filter(after_filter(fields, decode_cursor(after, len(fields))))
+    items = list(queryset.order_by(*fields)[: size + 1])
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        next_cursor = encode_cursor(getattr(items[-1], field) for field in fields)
+    return KeysetPage(items, next_cursor)
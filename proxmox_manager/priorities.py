@@ -0,0 +1,13 @@
+"""
+Celery task priorities, shared by the task routes in ``pxmx/celery.py`` and
+the views that send tasks.
+
+They follow the Redis transport, where 0 is the highest priority and 9 the
+lowest (RabbitMQ uses the reverse order). On Redis a priority only selects
+one of the ``priority_steps`` sub-queues of its queue; queue arguments such
+as ``x-max-priority`` are RabbitMQ-only.
+"""
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
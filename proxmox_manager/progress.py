@@ -0,0 +1,171 @@
+"""
+Side channel for task progress.
+
+Running tasks publish their progress to a short-lived Redis hash per task
+instead of saving the ``CeleryTask`` row on every step; only the final state is
+written to the database by ``complete_task``. The task APIs overlay these
+hashes on the ``CeleryTask`` rows of running tasks.
+
+Every published update and every ``CeleryTask`` save bumps a tasks version,
+the ETag of ``/api/tasks/running/``, and is pushed to live event streams
+(see ``live.py``).
+"""
+
+import logging
+import time
+
+import redis
+
+from .live import LIVE_CHANNEL, encode
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_KEY = "pxmx:task-progress:{}"
+CHILDREN_KEY = "pxmx:task-children:{}"
+TASKS_VERSION_KEY = "pxmx:tasks-version"
+PROGRESS_TTL = 3600
+
+# A progress update is published when at least this many seconds passed or
+# this many percentage points were gained since the last published one.
+MIN_INTERVAL = 1.0
+MIN_DELTA = 5
+
+
+class ProgressThrottle:
+    """
+    Tracks the last published progress per task id within this process.
+
+    Tasks often finish in another process than the one that last published
+    their progress, so entries are not only dropped by :meth:`forget`: a task
+    at 100% is forgotten, and entries older than MIN_INTERVAL, which no longer
+    hold anything back, are swept at most once per MIN_INTERVAL.
+    """
+
+    def __init__(self):
+        self._last = {}
+        self._swept_at = time.monotonic()
+
+    def should_publish(self, task_id, progress):
+        now = time.monotonic()
+        if now - self._swept_at >= MIN_INTERVAL:
+            self._sweep(now)
+        if progress >= 100:
+            self.forget(task_id)
+            return True
+        last = self._last.get(task_id)
+        if (
+            last is not None
+            and progress - last[0] < MIN_DELTA
+            and now - last[1] < MIN_INTERVAL
+        ):
+            return False
+        self._last[task_id] = (progress, now)
+        return True
+
+    def _sweep(self, now):
+        self._swept_at = now
+        self._last = {
+            task_id: last
+            for task_id, last in list(self._last.items())
+            if now - last[1] < MIN_INTERVAL
+        }
+
+    def forget(self, task_id):
+        self._last.pop(task_id, None)
+
+
+throttle = ProgressThrottle()
+
+
+def publish_progress(task_id, progress, message=""):
+    """Store progress for ``task_id``; returns False if Redis is unavailable"""
+    key = PROGRESS_KEY.format(task_id)
+    try:
+        pipe = get_redis().pipeline()
+        pipe.hset(key, mapping={"progress": progress, "message": message})
+        pipe.expire(key, PROGRESS_TTL)
+        pipe.incr(TASKS_VERSION_KEY)
+        pipe.publish(
+            LIVE_CHANNEL,
+            encode(
+                "task",
+                {"task_id": task_id, "progress": progress, "progress_message": message},
+            ),
+        )
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.debug(f"Could not publish progress of task {task_id}: {str(e)}")
+        return False
+    return True
+
+
+def read_progress(task_ids):
+    """Return task id -> ``{"progress": int, "message": str}`` for published tasks"""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return {}
+    try:
+        pipe = get_redis().pipeline()
+        for task_id in task_ids:
+            pipe.hgetall(PROGRESS_KEY.format(task_id))
+        results = pipe.execute()
+    except redis.RedisError as e:
+        logger.debug(f"Could not read task progress: {str(e)}")
+        return {}
+
+    return {
+        task_id: {"progress": int(data["progress"]), "message": data["message"]}
+        for task_id, data in zip(task_ids, results)
+        if data
+    }
+
+
+def tasks_version():
+    """Number bumped by every task change, ``None`` when Redis is unreachable"""
+    try:
+        return int(get_redis().get(TASKS_VERSION_KEY) or 0)
+    except redis.RedisError as e:
+        logger.debug(f"Could not read tasks version: {str(e)}")
+        return None
+
+
+def bump_tasks_version():
+    try:
+        get_redis().incr(TASKS_VERSION_KEY)
+    except redis.RedisError as e:
+        logger.debug(f"Could not bump tasks version: {str(e)}")
+
+
+def start_children(task_id, total):
+    """Record that ``task_id`` waits for ``total`` child tasks"""
+    key = CHILDREN_KEY.format(task_id)
+    try:
+        pipe = get_redis().pipeline()
+        pipe.hset(key, mapping={"total": total, "done": 0})
+        pipe.expire(key, PROGRESS_TTL)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.debug(f"Could not record children of task {task_id}: {str(e)}")
+
+
+def child_done(task_id):
+    """Count one finished child of ``task_id``; returns ``(done, total)``"""
+    key = CHILDREN_KEY.format(task_id)
+    try:
+        pipe = get_redis().pipeline()
+        pipe.hincrby(key, "done", 1)
+        pipe.hget(key, "total")
+        done, total = pipe.execute()
+    except redis.RedisError as e:
+        logger.debug(f"Could not count child of task {task_id}: {str(e)}")
+        return None, None
+    return done, int(total or 0)
+
+
+def clear_progress(task_id):
+    throttle.forget(task_id)
+    try:
+        get_redis().delete(PROGRESS_KEY.format(task_id), CHILDREN_KEY.format(task_id))
+    except redis.RedisError as e:
+        logger.debug(f"Could not clear progress of task {task_id}: {str(e)}")
@@ -0,0 +1,87 @@
+"""
+Queue latency metrics.
+
+Every published task is stamped with its enqueue time; when a worker starts
+it, the time spent waiting in the queue is recorded in a capped Redis list per
+queue. ``queue_latency_stats`` summarises the recent samples for the queue
+metrics API, and starts slower than SLOW_START on the interactive queue are
+logged as warnings.
+"""
+
+import logging
+import time
+
+import redis
+from celery.signals import before_task_publish, task_prerun
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+ENQUEUED_AT_HEADER = "pxmx_enqueued_at"
+LATENCY_KEY = "pxmx:queue-latency:{}"
+# Samples kept per queue
+MAX_SAMPLES = 1000
+QUEUES = ("interactive", "sync", "maintenance")
+# Interactive tasks are expected to start within this many seconds
+SLOW_START = 1.0
+
+
+@before_task_publish.connect
+def stamp_enqueue_time(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault(ENQUEUED_AT_HEADER, time.time())
+
+
+@task_prerun.connect
+def record_queue_latency(task=None, **kwargs):
+    enqueued_at = getattr(task.request, ENQUEUED_AT_HEADER, None)
+    if enqueued_at is None or task.request.eta:
+        return
+
+    queue = (task.request.delivery_info or {}).get("routing_key") or "unknown"
+    latency = max(time.time() - float(enqueued_at), 0.0)
+    if queue == "interactive" and latency > SLOW_START:
+        logger.warning(f"{task.name} waited {latency:.2f}s in the interactive queue")
+
+    key = LATENCY_KEY.format(queue)
+    try:
+        pipe = get_redis().pipeline()
+        pipe.lpush(key, round(latency, 4))
+        pipe.ltrim(key, 0, MAX_SAMPLES - 1)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not record queue latency: {str(e)}")
+
+
+def percentile(samples, fraction):
+    """``samples`` must be sorted"""
+    index = min(int(round(fraction * (len(samples) - 1))), len(samples) - 1)
+    return samples[index]
+
+
+def queue_latency_stats(queues=QUEUES):
+    """Return ``{queue: {count, p50, p95, max, last}}`` over the recent samples"""
+    try:
+        pipe = get_redis().pipeline()
+        for queue in queues:
+            pipe.lrange(LATENCY_KEY.format(queue), 0, -1)
+        results = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not read queue latency: {str(e)}")
+        return {}
+
+    stats = {}
+    for queue, values in zip(queues, results):
+        samples = sorted(float(value) for value in values)
+        if not samples:
+            stats[queue] = {"count": 0}
+            continue
+        stats[queue] = {
+            "count": len(samples),
+            "p50": percentile(samples, 0.5),
+            "p95": percentile(samples, 0.95),
+            "max": samples[-1],
+            "last": float(values[0]),
+        }
+    return stats
@@ -0,0 +1,158 @@
+"""
+Per-cluster Proxmox API rate limiting shared by all processes.
+
+Each cluster has a token bucket in Redis refilled at PROXMOX_RATE_LIMIT
+requests per second up to PROXMOX_RATE_LIMIT_BURST tokens. Every HTTP request
+to the cluster takes a token, waiting for one if the bucket is empty.
+
+Calls made for users (web requests and tasks on the interactive queue) may
+take every token. Background calls (sync and maintenance tasks) leave
+PROXMOX_RATE_LIMIT_INTERACTIVE_RESERVE tokens in the bucket, so a full resync
+running at the sustained rate never makes an interactive call wait. The reserve
+is capped at one token less than the burst.
+
+The limiter fails open: when Redis is unreachable calls are not limited.
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+import redis
+from asgiref.sync import sync_to_async
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+_priority = contextvars.ContextVar("proxmox_api_priority", default=INTERACTIVE)
+
+# Returns the seconds to wait before retrying, "0" when a token was taken.
+# Uses the Redis clock so callers on different hosts share one timeline.
+TAKE_TOKEN_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local keep = tonumber(ARGV[3])
+local clock = redis.call("time")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local state = redis.call("hmget", KEYS[1], "tokens", "updated_at")
+local tokens = tonumber(state[1]) or burst
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(now - updated_at, 0) * rate)
+
+local wait = 0
+if tokens >= keep + 1 then
+    tokens = tokens - 1
+else
+    wait = (keep + 1 - tokens) / rate
+end
+redis.call("hset", KEYS[1], "tokens", tokens, "updated_at", now)
+redis.call("pexpire", KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+def bucket_key(cluster_id):
+    return f"pxmx:rate-limit:cluster:{cluster_id}"
+
+
+def current_priority():
+    return _priority.get()
+
+
+@contextmanager
+def api_priority(priority):
+    """Make the Proxmox API calls in the block count as ``priority``"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def take_token(cluster_id, priority=None):
+    """
+    Take a token from the bucket of ``cluster_id``.
+
+    Returns 0 on success, otherwise the seconds to wait before trying again.
+    """
+    rate = settings.PROXMOX_RATE_LIMIT
+    if not rate:
+        return 0
+    priority = priority or current_priority()
+    burst = settings.PROXMOX_RATE_LIMIT_BURST
+    keep = 0
+    if priority != INTERACTIVE:
+        # A reserve of the whole bucket would never leave background calls a
+        # token; they always get at least one
+        keep = max(min(settings.PROXMOX_RATE_LIMIT_INTERACTIVE_RESERVE, burst - 1), 0)
+    try:
+        wait = get_redis().eval(
+            TAKE_TOKEN_SCRIPT,
+            1,
+            bucket_key(cluster_id),
+            rate,
+            burst,
+            keep,
+        )
+    except redis.RedisError as e:
+        logger.warning(f"Could not rate limit cluster {cluster_id}: {str(e)}")
+        return 0
+    return float(wait)
+
+
+def acquire(cluster_id, priority=None):
+    """Block until a token for ``cluster_id`` is taken; returns the seconds waited"""
+    priority = priority or current_priority()
+    waited = 0
+    while True:
+        wait = take_token(cluster_id, priority)
+        if not wait:
+            return waited
+        time.sleep(wait)
+        waited += wait
+
+
+async def acquire_async(cluster_id, priority=None):
+    """
+    :func:`acquire` for the event loop; the Redis call runs in a worker
+    thread
+    """
+    priority = priority or current_priority()
+    waited = 0
+    while True:
+        wait = await sync_to_async(take_token, thread_sensitive=False)(
+            cluster_id, priority
+        )
+        if not wait:
+            return waited
+        await asyncio.sleep(wait)
+        waited += wait
+
+
+def task_priority(task):
+    """API priority of a Celery task, from the queue it was consumed from"""
+    queue = (task.request.delivery_info or {}).get("routing_key")
+    if queue is None:
+        queue = (task.app.conf.task_routes or {}).get(task.name, {}).get("queue")
+    return INTERACTIVE if queue == INTERACTIVE else BACKGROUND
+
+
+@task_prerun.connect
+def set_task_priority(task=None, **kwargs):
+    task.request.api_priority_token = _priority.set(task_priority(task))
+
+
+@task_postrun.connect
+def reset_task_priority(task=None, **kwargs):
+    token = getattr(task.request, "api_priority_token", None)
+    if token is not None:
+        _priority.reset(token)
@@ -0,0 +1,71 @@
+"""
+Targeted resyncs of individual guests and nodes.
+
+Used when something is known to have changed (a tracked Proxmox task finished,
+or the event watcher saw new entries in the cluster task log): the affected
+rows are re-read from one ``/cluster/resources`` call instead of running a full
+``sync_cluster_data``.
+"""
+
+from .models import VirtualMachine
+from .sync import (
+    load_known_configs,
+    node_defaults_from_resource,
+    persist_guests,
+    persist_nodes,
+    resource_needs_config,
+    vm_defaults_from_resource,
+)
+
+
+def refresh_guests(cluster, prox, vmids):
+    """
+    Re-read ``vmids`` of ``cluster`` from one ``/cluster/resources`` call.
+
+    Updates their node, status and runtime fields without touching other guests;
+    those of ``vmids`` that Proxmox no longer lists are deleted.
+    """
+    if not vmids:
+        return None
+
+    nodes = {node.name: node for node in cluster.nodes.all()}
+    known_configs = load_known_configs(cluster)
+    resources = prox.cluster.resources.get(type="vm")
+    guests = []
+    for resource in resources:
+        vmid = resource.get("vmid")
+        node = nodes.get(resource.get("node"))
+        if vmid not in vmids or node is None:
+            continue
+
+        known = known_configs.get(vmid)
+        config = None
+        if resource_needs_config(resource, known):
+            guest = getattr(prox.nodes(node.name), resource["type"])(vmid)
+            config = guest.config.get()
+        guests.append(
+            VirtualMachine(
+                node=node, vmid=vmid, **vm_defaults_from_resource(resource, config, known)
+            )
+        )
+    return persist_guests(
+        cluster,
+        guests,
+        scope=VirtualMachine.objects.filter(node__cluster=cluster, vmid__in=vmids),
+        listed_vmids={r.get("vmid") for r in resources},
+    )
+
+
+def refresh_nodes(cluster, prox, node_names):
+    """Re-read the status of ``node_names`` from one ``/cluster/resources`` call"""
+    if not node_names:
+        return None
+
+    return persist_nodes(
+        cluster,
+        {
+            r["node"]: node_defaults_from_resource(r)
+            for r in prox.cluster.resources.get(type="node")
+            if r.get("node") in node_names
+        },
+    )
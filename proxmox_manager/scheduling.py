@@ -0,0 +1,130 @@
+"""
+Adaptive per-cluster sync scheduling.
+
+Instead of syncing every cluster on the same fixed tick, each cluster has a
+``ClusterSyncSchedule`` whose interval shrinks while its inventory keeps
+changing and grows while it stays static, within PROXMOX_SYNC_MIN_INTERVAL and
+PROXMOX_SYNC_MAX_INTERVAL. An interval is never shorter than a few times the
+cluster's last sync duration, and every next run time is jittered so clusters
+do not all start on the same beat.
+"""
+
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ClusterSyncSchedule, ProxmoxCluster
+
+logger = logging.getLogger(__name__)
+
+# Interval multiplier after a sync without / with churn
+GROW_FACTOR = 1.5
+SHRINK_FACTOR = 0.5
+# An interval is at least this many times the last sync duration
+DURATION_FACTOR = 4
+
+
+def guest_churn(counts):
+    """Number of guests a ``persist_guests`` call actually changed"""
+    return (
+        counts["created"] + counts["moved"] + counts["changed"] + counts["deleted"]
+    )
+
+
+def jittered(interval):
+    jitter = settings.PROXMOX_SYNC_JITTER
+    return interval * random.uniform(1 - jitter, 1 + jitter)
+
+
+def next_interval(interval, duration, churn):
+    """Return the interval to use after a sync that took ``duration`` seconds"""
+    interval = interval * (SHRINK_FACTOR if churn else GROW_FACTOR)
+    floor = max(settings.PROXMOX_SYNC_MIN_INTERVAL, duration * DURATION_FACTOR)
+    floor = min(floor, settings.PROXMOX_SYNC_MAX_INTERVAL)
+    return int(min(max(interval, floor), settings.PROXMOX_SYNC_MAX_INTERVAL))
+
+
+def create_missing_schedules():
+    """
+    Give every active cluster without a schedule the default interval.
+
+    First runs are spread uniformly over one interval.
+    """
+    now = timezone.now()
+    interval = settings.PROXMOX_SYNC_DEFAULT_INTERVAL
+    ClusterSyncSchedule.objects.bulk_create(
+        [
+            ClusterSyncSchedule(
+                cluster=cluster,
+                interval=interval,
+                next_sync_at=now + timedelta(seconds=random.uniform(0, interval)),
+            )
+            for cluster in ProxmoxCluster.objects.filter(
+                is_active=True, sync_schedule__isnull=True
+            )
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def due_schedules(now=None):
+    """Schedules of active clusters whose next sync time has passed"""
+    create_missing_schedules()
+    return ClusterSyncSchedule.objects.filter(
+        cluster__is_active=True, next_sync_at__lte=now or timezone.now()
+    ).select_related("cluster")
+
+
+def postpone(schedule):
+    """Push back the next run of an enqueued cluster by one jittered interval"""
+    schedule.next_sync_at = timezone.now() + timedelta(
+        seconds=jittered(schedule.interval)
+    )
+    schedule.save(update_fields=["next_sync_at"])
+
+
+def add_churn(cluster_id, churn):
+    """Count guest changes towards the next ``record_sync`` of the cluster"""
+    if churn:
+        ClusterSyncSchedule.objects.filter(cluster_id=cluster_id).update(
+            pending_churn=F("pending_churn") + churn
+        )
+
+
+def record_sync(cluster_id, duration):
+    """
+    Adapt the interval of a cluster after a successful sync and reschedule it.
+
+    Churn is whatever was recorded with :func:`add_churn` since the previous
+    sync. In ``nodes`` mode this runs from the chord callback, after every
+    node sync added its churn, so it counts towards the same sync.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        schedule = (
+            ClusterSyncSchedule.objects.select_for_update()
+            .filter(cluster_id=cluster_id)
+            .first()
+        )
+        if schedule is None:
+            return None
+
+        churn = schedule.pending_churn
+        schedule.interval = next_interval(schedule.interval, duration, churn)
+        schedule.next_sync_at = now + timedelta(seconds=jittered(schedule.interval))
+        schedule.last_sync_at = now
+        schedule.last_duration = round(duration, 2)
+        schedule.last_churn = churn
+        schedule.pending_churn = 0
+        schedule.save()
+
+    logger.info(
+        f"Cluster {cluster_id} synced in {duration:.1f}s with {churn} changes, "
+        f"next sync in about {schedule.interval}s"
+    )
+    return schedule
@@ -0,0 +1,286 @@
+"""
+Global quick search over guests, nodes and clusters.
+
+Guests match on name, vmid, tags and IP addresses, nodes on name and IP
+address, clusters on name and API host. A numeric query matching a vmid
+exactly always ranks first.
+
+Guest addresses are the static ones declared in guest configs (see
+``sync.config_ip_addresses``); addresses assigned by DHCP are not known. Every
+sync mode fetches the config of new guests, guests whose listing changed and
+configs older than PROXMOX_CONFIG_MAX_AGE, so an address changed without
+touching the listing is found after at most that long.
+
+On PostgreSQL guests are found with ``icontains`` filters that the trigram GIN
+indexes of migration 0010 serve, and ranked by trigram similarity; nodes and
+clusters are few enough to filter directly. Other databases (SQLite in
+development) use a :class:`PrefixIndex` held in memory by each process and
+rebuilt when a sync changes the inventory.
+"""
+
+import bisect
+import re
+import threading
+import time
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.urls import reverse
+
+from .models import Node, ProxmoxCluster, VirtualMachine
+from .stats import STATS_TTL, inventory_generation
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# Shorter non-numeric queries cannot use the trigram indexes
+MIN_QUERY_LENGTH = 2
+
+# Score of an exact vmid match, above any similarity (which is at most 1)
+EXACT_VMID_SCORE = 2.0
+
+TERM_SEPARATORS = re.compile(r"[\s;,._-]+")
+
+DETAIL_VIEWS = {"vm": "vm_detail", "node": "node_detail", "cluster": "cluster_detail"}
+
+
+def vm_hit(vm_id, vmid, name, node_name, cluster_name, score):
+    return {
+        "type": "vm",
+        "id": vm_id,
+        "label": f"{name} ({vmid})",
+        "detail": f"{node_name} / {cluster_name}",
+        "score": round(score, 3),
+    }
+
+
+def node_hit(node_id, name, cluster_name, score):
+    return {
+        "type": "node",
+        "id": node_id,
+        "label": name,
+        "detail": cluster_name,
+        "score": round(score, 3),
+    }
+
+
+def cluster_hit(cluster_id, name, api_url, score):
+    return {
+        "type": "cluster",
+        "id": cluster_id,
+        "label": name,
+        "detail": api_url,
+        "score": round(score, 3),
+    }
+
+
+def prefix_score(query, value):
+    """1 for an exact match, otherwise the fraction of ``value`` matched"""
+    return len(query) / len(value) if value else 0
+
+
+def substring_score(query, *values):
+    """Ranking of node and cluster matches, on the same scale as trigram similarity"""
+    scores = [0.0]
+    for value in values:
+        value = (value or "").lower()
+        if value.startswith(query):
+            scores.append(prefix_score(query, value))
+        elif query in value:
+            scores.append(prefix_score(query, value) / 2)
+    return max(scores)
+
+
+def search_guests_postgres(query, limit):
+    matches = (
+        Q(name__icontains=query)
+        | Q(tags__icontains=query)
+        | Q(ip_addresses__icontains=query)
+    )
+    score = Greatest(
+        TrigramSimilarity("name", query),
+        TrigramSimilarity("tags", query),
+        TrigramSimilarity("ip_addresses", query),
+    )
+    if query.isdigit():
+        matches |= Q(vmid=int(query))
+        score = Case(
+            When(vmid=int(query), then=Value(EXACT_VMID_SCORE)),
+            default=score,
+            output_field=FloatField(),
+        )
+    rows = (
+        VirtualMachine.objects.filter(matches)
+        .annotate(score=score)
+        .order_by("-score", "name")
+        .values_list(
+            "id", "vmid", "name", "node__name", "node__cluster__name", "score"
+        )[:limit]
+    )
+    return [vm_hit(*row) for row in rows]
+
+
+def search_postgres(query, limit):
+    hits = search_guests_postgres(query, limit)
+    for node_id, name, ip_address, cluster_name in Node.objects.filter(
+        Q(name__icontains=query) | Q(ip_address__startswith=query)
+    ).values_list("id", "name", "ip_address", "cluster__name")[:limit]:
+        hits.append(
+            node_hit(node_id, name, cluster_name, substring_score(query, name, ip_address))
+        )
+    for cluster_id, name, api_url in ProxmoxCluster.objects.filter(
+        Q(name__icontains=query) | Q(api_url__icontains=query)
+    ).values_list("id", "name", "api_url")[:limit]:
+        hits.append(
+            cluster_hit(cluster_id, name, api_url, substring_score(query, name, api_url))
+        )
+    return hits
+
+
+def terms(*values):
+    """Lowercased values plus their words, the keys a search can start with"""
+    result = set()
+    for value in values:
+        value = str(value or "").lower()
+        if value:
+            result.add(value)
+            result.update(word for word in TERM_SEPARATORS.split(value) if word)
+    return result
+
+
+class PrefixIndex:
+    """
+    Terms of the whole inventory, grouped by length and sorted.
+
+    A match's score only depends on the length of the term it prefixes, so a
+    search walks the lengths upwards, binary-searching each group for the
+    query, and stops once ``limit`` entries are found: later groups can only
+    score lower.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.postings = {}
+        self.lengths = []
+
+    def add(self, hit, *values):
+        entry = len(self.entries)
+        self.entries.append(hit)
+        for term in terms(*values):
+            self.postings.setdefault(term, []).append(entry)
+
+    def finish(self):
+        groups = {}
+        for term in self.postings:
+            groups.setdefault(len(term), []).append(term)
+        self.lengths = [(length, sorted(groups[length])) for length in sorted(groups)]
+        return self
+
+    def search(self, query, limit):
+        query = query.lower()
+        # A numeric query must see every entry of its exact term to find the vmid
+        exhaustive = query.isdigit()
+        scores = {}
+        for length, group in self.lengths:
+            if length < len(query):
+                continue
+            position = bisect.bisect_left(group, query)
+            while position < len(group) and group[position].startswith(query):
+                term = group[position]
+                score = prefix_score(query, term)
+                for entry in self.postings[term]:
+                    if entry in scores:
+                        continue
+                    hit = self.entries[entry]
+                    if hit["type"] == "vm" and term == str(hit["vmid"]):
+                        scores[entry] = EXACT_VMID_SCORE
+                    else:
+                        scores[entry] = score
+                    if len(scores) >= limit and not exhaustive:
+                        break
+                if len(scores) >= limit and not exhaustive:
+                    break
+                position += 1
+            if len(scores) >= limit:
+                break
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+        return [
+            {**self.entries[entry], "score": round(score, 3)} for entry, score in ranked
+        ]
+
+
+def build_prefix_index():
+    index = PrefixIndex()
+    for vm_id, vmid, name, tags, ip_addresses, node_name, cluster_name in (
+        VirtualMachine.objects.values_list(
+            "id",
+            "vmid",
+            "name",
+            "tags",
+            "ip_addresses",
+            "node__name",
+            "node__cluster__name",
+        ).iterator(chunk_size=2000)
+    ):
+        hit = vm_hit(vm_id, vmid, name, node_name, cluster_name, 0)
+        hit["vmid"] = vmid
+        index.add(hit, name, vmid, tags, ip_addresses)
+    for node_id, name, ip_address, cluster_name in Node.objects.values_list(
+        "id", "name", "ip_address", "cluster__name"
+    ):
+        index.add(node_hit(node_id, name, cluster_name, 0), name, ip_address)
+    for cluster_id, name, api_url in ProxmoxCluster.objects.values_list(
+        "id", "name", "api_url"
+    ):
+        host = re.sub(r"^\w+://", "", api_url)
+        index.add(cluster_hit(cluster_id, name, api_url, 0), name, host)
+    return index.finish()
+
+
+class PrefixIndexCache:
+    """The process-wide :class:`PrefixIndex`, rebuilt when the inventory changes"""
+
+    def __init__(self):
+        self.index = None
+        self.generation = None
+        self.built_at = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        generation = inventory_generation()
+        with self._lock:
+            stale = (
+                self.index is None
+                or (generation is not None and generation != self.generation)
+                or time.monotonic() - self.built_at > STATS_TTL
+            )
+            if stale:
+                self.index = build_prefix_index()
+                self.generation = generation
+                self.built_at = time.monotonic()
+            return self.index
+
+
+prefix_index = PrefixIndexCache()
+
+
+def quick_search(query, limit=DEFAULT_LIMIT):
+    """Return up to ``limit`` hits for ``query``, best first"""
+    # Scores compare against lowercased values
+    query = query.strip().lower()
+    limit = min(max(limit, 1), MAX_LIMIT)
+    if len(query) < MIN_QUERY_LENGTH and not query.isdigit():
+        return []
+
+    if connection.vendor == "postgresql":
+        hits = search_postgres(query, limit)
+        hits.sort(key=lambda hit: -hit["score"])
+        hits = hits[:limit]
+    else:
+        hits = prefix_index.get().search(query, limit)
+
+    for hit in hits:
+        hit.pop("vmid", None)
+        hit["url"] = reverse(DETAIL_VIEWS[hit["type"]], args=[hit["id"]])
+    return hits
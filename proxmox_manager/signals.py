@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .breaker import CircuitBreaker
+from .changes import next_change_seq, record_deletions, stamp
+from .connections import pool
+from .endpoints import registry
+from .live import publish_on_commit, task_event
+from .models import CeleryTask, ProxmoxCluster
+from .progress import bump_tasks_version
+from .stats import invalidate_inventory_stats
+
+
+@receiver(post_save, sender=ProxmoxCluster)
+@receiver(post_delete, sender=ProxmoxCluster)
+def invalidate_cluster_connection(sender, instance, **kwargs):
+    """Drop the pooled API connection when a cluster's settings change"""
+    pool.invalidate(instance.pk)
+    registry.forget(instance.pk)
+    # New settings deserve a fresh attempt rather than the old failure count
+    CircuitBreaker(instance.pk).reset()
+    invalidate_inventory_stats()
+
+
+@receiver(post_save, sender=CeleryTask)
+@receiver(post_delete, sender=CeleryTask)
+def task_changed(sender, instance, **kwargs):
+    """Invalidate the ETag of the running tasks API and push the new state"""
+    transaction.on_commit(bump_tasks_version)
+    event = task_event(instance)
+    publish_on_commit("task", lambda: event)
+
+
+@receiver(post_save, sender=CeleryTask)
+def stamp_task(sender, instance, created, update_fields, **kwargs):
+    """
+    Report the task to the delta APIs when it is created or its state changes.
+
+    Other saves (progress, UPID) would take a change number for nothing: the
+    delta APIs read running tasks' progress from Redis.
+    """
+    if update_fields is not None and "state" not in update_fields:
+        return
+    if not created and instance.state == getattr(instance, "saved_state", None):
+        return
+    with transaction.atomic():
+        stamp(CeleryTask.objects.filter(pk=instance.pk), next_change_seq())
+    instance.saved_state = instance.state
+
+
+@receiver(post_delete, sender=CeleryTask)
+def bury_task(sender, instance, **kwargs):
+    """Report the deleted task to the delta APIs"""
+    with transaction.atomic():
+        record_deletions(next_change_seq(), "task", [instance.pk], instance.cluster_id)
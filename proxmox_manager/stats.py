@@ -0,0 +1,161 @@
+"""
+Inventory totals shown in the sidebar of every page and by the dashboard API.
+
+The totals are summed from the per-cluster ``ClusterSummary`` rows the sync
+maintains, in one query over O(clusters) rows, and cached in Redis until a sync
+writes nodes or guests (see ``sync.py``), so page loads and the dashboard poll
+cost one Redis read however large the inventory. :func:`cached_count` caches
+the row counts of filtered listings the same way.
+
+Invalidation bumps a generation number rather than deleting the cached value,
+so a request that computed its totals before a sync committed cannot store
+them over the newer state. The generation, and the per-cluster version bumped
+by every sync write to a cluster, also serve as ETags of the polling APIs.
+"""
+
+import hashlib
+import json
+import logging
+
+import redis
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .live import publish
+from .models import ProxmoxCluster
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "pxmx:inventory-stats:generation"
+STATS_KEY = "pxmx:inventory-stats:{}"
+# Safety net for writes that bypass invalidation (e.g. the admin)
+STATS_TTL = 300
+CLUSTER_VERSION_KEY = "pxmx:inventory-version:cluster:{}"
+COUNT_KEY = "pxmx:inventory-count:{}:{}:{}"
+# Shorter, as power actions change guest status without a sync
+COUNT_TTL = 60
+
+
+def compute_inventory_stats():
+    totals = ProxmoxCluster.objects.aggregate(
+        cluster_count=Count("id", filter=Q(is_active=True)),
+        total_nodes=Sum("summary__node_count", default=0),
+        online_nodes=Sum("summary__online_nodes", default=0),
+        total_vms=Sum("summary__vm_count", default=0),
+        running_vms=Sum("summary__running_vms", default=0),
+        stopped_vms=Sum("summary__stopped_vms", default=0),
+        cpu_usage_sum=Sum("summary__cpu_usage_sum", default=0.0),
+        ram_usage_sum=Sum("summary__ram_usage_sum", default=0.0),
+    )
+    nodes = totals["total_nodes"]
+    cpu_usage_sum = totals.pop("cpu_usage_sum")
+    ram_usage_sum = totals.pop("ram_usage_sum")
+    return {
+        **totals,
+        "avg_cpu": round(cpu_usage_sum / nodes, 2) if nodes else 0,
+        "avg_ram": round(ram_usage_sum / nodes, 2) if nodes else 0,
+    }
+
+
+def inventory_stats():
+    """
+    Return cluster, node and guest totals: ``cluster_count``, ``total_nodes``,
+    ``online_nodes``, ``avg_cpu``, ``avg_ram``, ``total_vms``, ``running_vms``
+    and ``stopped_vms``.
+    """
+    client = get_redis()
+    try:
+        generation = client.get(GENERATION_KEY) or 0
+        cached = client.get(STATS_KEY.format(generation))
+    except redis.RedisError as e:
+        logger.warning(f"Could not read cached inventory stats: {str(e)}")
+        return compute_inventory_stats()
+    if cached:
+        return json.loads(cached)
+
+    stats = compute_inventory_stats()
+    try:
+        client.set(STATS_KEY.format(generation), json.dumps(stats), ex=STATS_TTL)
+    except redis.RedisError as e:
+        logger.warning(f"Could not cache inventory stats: {str(e)}")
+    return stats
+
+
+def cached_count(name, filters, queryset):
+    """
+    ``queryset.count()``, cached until the next sync that changes the inventory.
+
+    ``filters`` (a JSON-serializable dict) must identify the filtering applied
+    to ``queryset``, as it is part of the cache key with ``name``.
+    """
+    digest = hashlib.sha1(
+        json.dumps(filters, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    client = get_redis()
+    try:
+        generation = client.get(GENERATION_KEY) or 0
+        key = COUNT_KEY.format(name, generation, digest)
+        cached = client.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Could not read cached {name} count: {str(e)}")
+        return queryset.count()
+    if cached is not None:
+        return int(cached)
+
+    count = queryset.count()
+    try:
+        client.set(key, count, ex=COUNT_TTL)
+    except redis.RedisError as e:
+        logger.warning(f"Could not cache {name} count: {str(e)}")
+    return count
+
+
+def inventory_generation():
+    """Number bumped by every inventory change, ``None`` when Redis is unreachable"""
+    try:
+        return int(get_redis().get(GENERATION_KEY) or 0)
+    except redis.RedisError as e:
+        logger.warning(f"Could not read inventory generation: {str(e)}")
+        return None
+
+
+def invalidate_inventory_stats():
+    """
+    Drop the cached totals once the current transaction commits, and push the
+    new ones to live event streams
+    """
+
+    def bump():
+        try:
+            get_redis().incr(GENERATION_KEY)
+        except redis.RedisError as e:
+            logger.warning(f"Could not invalidate inventory stats: {str(e)}")
+            return
+        publish("stats", inventory_stats())
+
+    transaction.on_commit(bump)
+
+
+def cluster_version(cluster_id):
+    """
+    Number bumped by every sync write to ``cluster_id``'s nodes or guests,
+    ``None`` when Redis is unreachable
+    """
+    try:
+        return int(get_redis().get(CLUSTER_VERSION_KEY.format(cluster_id)) or 0)
+    except redis.RedisError as e:
+        logger.warning(f"Could not read version of cluster {cluster_id}: {str(e)}")
+        return None
+
+
+def bump_cluster_version(cluster_id):
+    """Bump the version of ``cluster_id`` once the current transaction commits"""
+
+    def bump():
+        try:
+            get_redis().incr(CLUSTER_VERSION_KEY.format(cluster_id))
+        except redis.RedisError as e:
+            logger.warning(f"Could not bump version of cluster {cluster_id}: {str(e)}")
+
+    transaction.on_commit(bump)
@@ -0,0 +1,622 @@
+"""
+Helpers that turn Proxmox API payloads into model rows and persist them.
+
+The sync tasks fetch data from Proxmox in different shapes (per-node status,
+per-guest config/status, or the cluster-wide ``/cluster/resources`` listing);
+these helpers keep the mapping onto ``Node`` and ``VirtualMachine`` in one place,
+and write the collected rows with set-based upserts.
+"""
+
+import hashlib
+import json
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .changes import (
+    NODE_CHANGE_FIELDS,
+    VM_CHANGE_FIELDS,
+    next_change_seq,
+    record_deletions,
+    stamp,
+)
+from .live import publish_on_commit
+from .models import ClusterSummary, Node, NodeSummary, VirtualMachine
+from .stats import bump_cluster_version, invalidate_inventory_stats
+
+DISK_PREFIXES = ("virtio", "scsi", "sata", "ide")
+
+NODE_UPDATE_FIELDS = [
+    "status",
+    "cpu_usage",
+    "ram_usage",
+    "ram_total",
+    "ram_used",
+    "disk_usage",
+    "disk_total",
+    "disk_used",
+    "uptime",
+    "last_synced",
+]
+
+VM_UPDATE_FIELDS = [
+    "name",
+    "vm_type",
+    "status",
+    "cpu_cores",
+    "ram_mb",
+    "disk_gb",
+    "cpu_usage",
+    "ram_usage",
+    "uptime",
+    "tags",
+    "ip_addresses",
+    "last_synced",
+    "config_digest",
+    "listing_digest",
+    "config_synced_at",
+]
+
+NODE_SUMMARY_FIELDS = [
+    "vm_count",
+    "running_vms",
+    "stopped_vms",
+    "cpu_cores",
+    "ram_mb",
+    "disk_gb",
+    "updated_at",
+]
+
+# Node fields pushed to live event streams (see live.py)
+LIVE_NODE_FIELDS = [
+    "id",
+    "name",
+    "status",
+    "cpu_usage",
+    "ram_usage",
+    "disk_usage",
+    "summary__vm_count",
+    "summary__running_vms",
+]
+# ``NodeSummary`` fields among them; a node whose counts change is pushed too
+LIVE_NODE_COUNTS = ["vm_count", "running_vms"]
+
+BULK_BATCH_SIZE = 500
+
+
+def parse_disk_size(value):
+    """Return the size in GB of a Proxmox disk string (e.g. ``local:100/x.raw,size=32G``)"""
+    if not isinstance(value, str) or "size=" not in value:
+        return 0
+    size_part = value.split("size=")[1].split(",")[0]
+    if "G" in size_part:
+        return float(size_part.replace("G", ""))
+    elif "T" in size_part:
+        return float(size_part.replace("T", "")) * 1024
+    elif "M" in size_part:
+        return float(size_part.replace("M", "")) / 1024
+    return 0
+
+
+def config_disk_gb(vm_type, config):
+    """Sum the disk sizes declared in a guest config"""
+    if vm_type == "lxc":
+        return parse_disk_size(config.get("rootfs", ""))
+
+    disk_gb = 0
+    for key, value in config.items():
+        if key.startswith(DISK_PREFIXES):
+            disk_gb += parse_disk_size(value)
+    return disk_gb
+
+
+def config_ip_addresses(vm_type, config):
+    """
+    Static IPs declared in a guest config: ``ip=``/``ip6=`` of the ``netN``
+    entries of containers and of the cloud-init ``ipconfigN`` entries of VMs.
+    """
+    prefix = "net" if vm_type == "lxc" else "ipconfig"
+    addresses = []
+    for key, value in sorted(config.items()):
+        if not key.startswith(prefix) or not key[len(prefix) :].isdigit():
+            continue
+        for option in str(value).split(","):
+            name, _, address = option.partition("=")
+            address = address.split("/")[0]
+            if name in ("ip", "ip6") and address not in ("", "dhcp", "auto", "manual"):
+                addresses.append(address)
+    return " ".join(addresses)[:255]
+
+
+def listing_tags(listing):
+    """Proxmox tags of a guest listing entry, space-separated"""
+    return " ".join(
+        tag for tag in re.split(r"[;,\s]+", listing.get("tags") or "") if tag
+    )[:255]
+
+
+def percentage(used, total):
+    return (used / total * 100) if total > 0 else 0
+
+
+def node_defaults_from_status(node_data, status_data):
+    """Build Node field values from ``/nodes`` and ``/nodes/{node}/status``"""
+    ram_total = status_data.get("memory", {}).get("total", 0)
+    ram_used = status_data.get("memory", {}).get("used", 0)
+    disk_total = status_data.get("rootfs", {}).get("total", 0)
+    disk_used = status_data.get("rootfs", {}).get("used", 0)
+
+    return {
+        "status": "online" if node_data.get("status") == "online" else "offline",
+        "cpu_usage": round(status_data.get("cpu", 0) * 100, 2),
+        "ram_usage": round(percentage(ram_used, ram_total), 2),
+        "ram_total": ram_total,
+        "ram_used": ram_used,
+        "disk_usage": round(percentage(disk_used, disk_total), 2),
+        "disk_total": disk_total,
+        "disk_used": disk_used,
+        "uptime": status_data.get("uptime", 0),
+        "last_synced": timezone.now(),
+    }
+
+
+def node_defaults_from_resource(resource):
+    """Build Node field values from a ``/cluster/resources`` entry of type ``node``"""
+    ram_total = resource.get("maxmem", 0)
+    ram_used = resource.get("mem", 0)
+    disk_total = resource.get("maxdisk", 0)
+    disk_used = resource.get("disk", 0)
+
+    return {
+        "status": "online" if resource.get("status") == "online" else "offline",
+        "cpu_usage": round(resource.get("cpu", 0) * 100, 2),
+        "ram_usage": round(percentage(ram_used, ram_total), 2),
+        "ram_total": ram_total,
+        "ram_used": ram_used,
+        "disk_usage": round(percentage(disk_used, disk_total), 2),
+        "disk_total": disk_total,
+        "disk_used": disk_used,
+        "uptime": resource.get("uptime", 0),
+        "last_synced": timezone.now(),
+    }
+
+
+# Keys of a guest listing entry that reflect its config; when they are unchanged
+# the stored config is assumed current.
+LISTING_CONFIG_KEYS = ("name", "cpus", "maxcpu", "maxmem", "maxdisk", "template", "tags")
+
+CONFIG_FIELDS = (
+    "cpu_cores",
+    "ram_mb",
+    "disk_gb",
+    "ip_addresses",
+    "config_digest",
+    "listing_digest",
+    "config_synced_at",
+)
+
+
+def listing_digest(listing):
+    """Fingerprint of the config-related keys of a guest listing entry"""
+    values = [listing.get(key) for key in LISTING_CONFIG_KEYS]
+    return hashlib.sha1(json.dumps(values, default=str).encode()).hexdigest()
+
+
+def load_known_configs(cluster):
+    """Return vmid -> stored config fields for every guest of ``cluster``"""
+    return {
+        row["vmid"]: row
+        for row in VirtualMachine.objects.filter(node__cluster=cluster).values(
+            "vmid", *CONFIG_FIELDS
+        )
+    }
+
+
+def needs_config(known, listing):
+    """
+    True when a guest's config must be fetched: it was never stored, its
+    listing changed, or it is older than PROXMOX_CONFIG_MAX_AGE seconds.
+    """
+    if not known or not known["config_digest"]:
+        return True
+    if known["listing_digest"] != listing_digest(listing):
+        return True
+    max_age = settings.PROXMOX_CONFIG_MAX_AGE
+    if max_age and (
+        known["config_synced_at"] is None
+        or known["config_synced_at"] < timezone.now() - timedelta(seconds=max_age)
+    ):
+        return True
+    return False
+
+
+def config_defaults(vm_type, listing, config=None, known=None):
+    """
+    Build the config-derived VirtualMachine fields.
+
+    With ``config=None`` (not refetched) or a config whose ``digest`` matches
+    the stored one, the ``known`` values are kept instead of re-parsing.
+    """
+    digest = config.get("digest") if config else None
+    unchanged = bool(known and digest and digest == known["config_digest"])
+    if config is None or unchanged:
+        fields = {
+            key: known[key]
+            for key in (
+                "cpu_cores",
+                "ram_mb",
+                "disk_gb",
+                "ip_addresses",
+                "config_digest",
+            )
+        }
+        fields["config_synced_at"] = (
+            known["config_synced_at"] if config is None else timezone.now()
+        )
+    else:
+        fields = {
+            "cpu_cores": config.get("cores", 1),
+            "ram_mb": config.get("memory", 512),
+            "disk_gb": round(config_disk_gb(vm_type, config), 2),
+            "ip_addresses": config_ip_addresses(vm_type, config),
+            "config_digest": config.get("digest", ""),
+            "config_synced_at": timezone.now(),
+        }
+    fields["listing_digest"] = listing_digest(listing)
+    return fields
+
+
+def vm_defaults_from_config(vm_type, listing, config=None, known=None):
+    """
+    Build VirtualMachine field values from a ``/nodes/{node}/{qemu,lxc}`` entry.
+
+    Runtime fields always come from the listing; see :func:`config_defaults`
+    for when ``config`` may be ``None``.
+    """
+    vmid = listing["vmid"]
+    default_name = f"VM-{vmid}" if vm_type == "qemu" else f"CT-{vmid}"
+    mem_used = listing.get("mem", 0)
+    mem_total = listing.get("maxmem", 0)
+
+    return {
+        "name": listing.get("name", default_name),
+        "vm_type": vm_type,
+        "status": listing.get("status", "unknown"),
+        "cpu_usage": round(listing.get("cpu", 0) * 100, 2),
+        "ram_usage": round(percentage(mem_used, mem_total), 2),
+        "uptime": listing.get("uptime", 0),
+        "tags": listing_tags(listing),
+        "last_synced": timezone.now(),
+        **config_defaults(vm_type, listing, config, known),
+    }
+
+
+def resource_needs_config(resource, known=None):
+    """
+    True when the config of a ``/cluster/resources`` guest entry must be
+    fetched (see :func:`needs_config`).
+
+    The listing's sizing fields cannot replace the config: ``maxcpu`` counts
+    sockets times cores rather than ``cores``, and a VM's ``maxdisk`` is its
+    boot disk only, where the config path sums all of its disks.
+    """
+    return needs_config(known, resource)
+
+
+def vm_defaults_from_resource(resource, config=None, known=None):
+    """
+    Build VirtualMachine field values from a ``/cluster/resources`` guest entry.
+
+    Config-derived fields come from ``config``, or from the ``known`` stored
+    values when the config was not refetched (see :func:`config_defaults`).
+    Only the fields the listing reports the same way are taken from it: the
+    memory (``maxmem``), and the rootfs size of a container (``maxdisk``).
+    """
+    vm_type = resource["type"]
+    vmid = resource["vmid"]
+    default_name = f"VM-{vmid}" if vm_type == "qemu" else f"CT-{vmid}"
+
+    mem_used = resource.get("mem", 0)
+    mem_total = resource.get("maxmem")
+
+    if config is None and not known:
+        fields = config_defaults(vm_type, resource, {})
+    else:
+        fields = config_defaults(vm_type, resource, config, known)
+
+    if mem_total is not None:
+        fields["ram_mb"] = int(mem_total / (1024**2))
+    if vm_type == "lxc" and resource.get("maxdisk") is not None:
+        fields["disk_gb"] = round(resource["maxdisk"] / (1024**3), 2)
+
+    return {
+        "name": resource.get("name", default_name),
+        "vm_type": vm_type,
+        "status": resource.get("status", "unknown"),
+        "cpu_usage": round(resource.get("cpu", 0) * 100, 2),
+        "ram_usage": round(percentage(mem_used, mem_total or 0), 2),
+        "uptime": resource.get("uptime", 0),
+        "tags": listing_tags(resource),
+        "last_synced": timezone.now(),
+        **fields,
+    }
+
+
+def change_values(instance, fields):
+    return tuple(getattr(instance, field) for field in fields)
+
+
+def persist_nodes(cluster, rows):
+    """
+    Upsert ``rows`` (a dict of node name -> field values) for ``cluster``.
+
+    Returns a dict of node name -> saved ``Node`` for every node of the cluster.
+    """
+    nodes = [
+        Node(cluster=cluster, name=name, **defaults) for name, defaults in rows.items()
+    ]
+    existing = {
+        name: tuple(values)
+        for name, *values in Node.objects.filter(cluster=cluster).values_list(
+            "name", *NODE_CHANGE_FIELDS
+        )
+    }
+    changed = [
+        node.name
+        for node in nodes
+        if existing.get(node.name) != change_values(node, NODE_CHANGE_FIELDS)
+    ]
+    with transaction.atomic():
+        Node.objects.bulk_create(
+            nodes,
+            batch_size=BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["cluster", "name"],
+            update_fields=NODE_UPDATE_FIELDS,
+        )
+        refresh_summaries(cluster, changed)
+        if changed:
+            stamp(
+                Node.objects.filter(cluster=cluster, name__in=changed),
+                next_change_seq(),
+            )
+    # New nodes are in ``changed`` too; removed ones are handled by prune_nodes
+    if changed:
+        invalidate_inventory_stats()
+    return {node.name: node for node in Node.objects.filter(cluster=cluster)}
+
+
+def persist_guests(cluster, guests, scope=None, listed_vmids=None):
+    """
+    Upsert unsaved ``VirtualMachine`` instances of ``cluster`` in one transaction.
+
+    Guests that moved to another node keep their row (and audit history) and
+    are re-pointed before the upsert. When ``scope`` (a queryset of the guests
+    this sync is authoritative for) is given, rows in it whose vmid is not in
+    ``listed_vmids`` (default: the vmids of ``guests``) are deleted.
+
+    Returns a dict with ``created``, ``updated``, ``moved``, ``changed`` (status
+    or listing differs from the stored row) and ``deleted`` counts.
+    """
+    if listed_vmids is None:
+        listed_vmids = {guest.vmid for guest in guests}
+
+    existing = {}
+    for pk, vmid, node_id, status, digest, *values in VirtualMachine.objects.filter(
+        node__cluster=cluster
+    ).values_list(
+        "id", "vmid", "node_id", "status", "listing_digest", *VM_CHANGE_FIELDS
+    ):
+        existing.setdefault(vmid, []).append(
+            (pk, node_id, status, digest, tuple(values))
+        )
+
+    moved = []
+    created = 0
+    changed = 0
+    # Guests whose row changes in any way: stamped for the delta APIs and
+    # pushed to live event streams
+    touched = set()
+    for guest in guests:
+        rows = existing.get(guest.vmid)
+        if not rows:
+            created += 1
+            touched.add(guest.vmid)
+            continue
+        current = [row for row in rows if row[1] == guest.node_id]
+        if not current:
+            moved.append(VirtualMachine(id=rows[0][0], node_id=guest.node_id))
+            touched.add(guest.vmid)
+        elif current[0][2:4] != (guest.status, guest.listing_digest):
+            changed += 1
+            touched.add(guest.vmid)
+        elif current[0][4] != change_values(guest, VM_CHANGE_FIELDS):
+            touched.add(guest.vmid)
+
+    deleted = 0
+    deleted_ids = []
+    with transaction.atomic():
+        if moved:
+            VirtualMachine.objects.bulk_update(
+                moved, ["node"], batch_size=BULK_BATCH_SIZE
+            )
+        VirtualMachine.objects.bulk_create(
+            guests,
+            batch_size=BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["node", "vmid"],
+            update_fields=VM_UPDATE_FIELDS,
+        )
+        if scope is not None:
+            deleted_ids = list(
+                scope.exclude(vmid__in=listed_vmids).values_list("id", flat=True)
+            )
+            if deleted_ids:
+                deleted, _ = VirtualMachine.objects.filter(id__in=deleted_ids).delete()
+        refresh_summaries(cluster)
+        if touched or deleted_ids:
+            seq = next_change_seq()
+            stamp(
+                VirtualMachine.objects.filter(node__cluster=cluster, vmid__in=touched),
+                seq,
+            )
+            record_deletions(seq, "vm", deleted_ids, cluster.pk)
+
+    # Guest totals only depend on which guests exist and their status
+    if created or changed or deleted:
+        invalidate_inventory_stats()
+    return {
+        "created": created,
+        "updated": len(guests) - created,
+        "moved": len(moved),
+        "changed": changed,
+        "deleted": deleted,
+    }
+
+
+def prune_nodes(cluster, node_names):
+    """
+    Delete nodes of ``cluster`` not in ``node_names`` (and, with them, their guests).
+
+    An empty ``node_names`` is treated as a failed listing and deletes nothing.
+    """
+    if not node_names:
+        return 0
+    with transaction.atomic():
+        gone = Node.objects.filter(cluster=cluster).exclude(name__in=node_names)
+        node_ids = list(gone.values_list("id", flat=True))
+        if not node_ids:
+            return 0
+        vm_ids = list(
+            VirtualMachine.objects.filter(node_id__in=node_ids).values_list(
+                "id", flat=True
+            )
+        )
+        _, deleted = gone.delete()
+        if deleted:
+            refresh_summaries(cluster)
+            seq = next_change_seq()
+            record_deletions(seq, "node", node_ids, cluster.pk)
+            record_deletions(seq, "vm", vm_ids, cluster.pk)
+    if deleted:
+        invalidate_inventory_stats()
+    return deleted.get(Node._meta.label, 0)
+
+
+def refresh_summaries(cluster, changed_nodes=()):
+    """
+    Recompute the ``ClusterSummary`` of ``cluster`` and the ``NodeSummary`` of
+    each of its nodes.
+
+    Called inside the transaction of every write to the cluster's nodes or
+    guests. The ``ClusterSummary`` row is locked before aggregating, so
+    concurrent writes to a cluster recompute its summaries one at a time, each
+    after the previous one committed; the last to commit sees every other
+    write. Also bumps the cluster's version (see ``stats.cluster_version``) and
+    publishes a ``cluster`` live event carrying the nodes named in
+    ``changed_nodes`` and those whose guest counts changed.
+    Returns the ``ClusterSummary``.
+    """
+    with transaction.atomic():
+        ClusterSummary.objects.get_or_create(cluster=cluster)
+        summary = ClusterSummary.objects.select_for_update().get(cluster=cluster)
+
+        nodes = Node.objects.filter(cluster=cluster).aggregate(
+            node_count=Count("id"),
+            online_nodes=Count("id", filter=Q(status="online")),
+            cpu_usage_sum=Sum("cpu_usage", default=0.0),
+            ram_usage_sum=Sum("ram_usage", default=0.0),
+            disk_usage_sum=Sum("disk_usage", default=0.0),
+            ram_total=Sum("ram_total", default=0),
+            ram_used=Sum("ram_used", default=0),
+            disk_total=Sum("disk_total", default=0),
+            disk_used=Sum("disk_used", default=0),
+        )
+        guests = {
+            row.pop("node_id"): row
+            for row in VirtualMachine.objects.filter(node__cluster=cluster)
+            .values("node_id")
+            .annotate(
+                vm_count=Count("id"),
+                running_vms=Count("id", filter=Q(status="running")),
+                stopped_vms=Count("id", filter=Q(status="stopped")),
+                cpu_cores=Sum("cpu_cores", default=0),
+                ram_mb=Sum("ram_mb", default=0),
+                disk_gb=Sum("disk_gb", default=0.0),
+            )
+            .order_by()
+        }
+        recounted = [
+            node_id
+            for node_id, *counts in NodeSummary.objects.filter(
+                node__cluster=cluster
+            ).values_list("node_id", *LIVE_NODE_COUNTS)
+            if counts
+            != [guests.get(node_id, {}).get(field, 0) for field in LIVE_NODE_COUNTS]
+        ]
+
+        NodeSummary.objects.bulk_create(
+            [
+                NodeSummary(node_id=node_id, **guests.get(node_id, {}))
+                for node_id in Node.objects.filter(cluster=cluster).values_list(
+                    "id", flat=True
+                )
+            ],
+            batch_size=BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["node"],
+            update_fields=NODE_SUMMARY_FIELDS,
+        )
+        totals = {
+            **nodes,
+            **{
+                field: sum(row[field] for row in guests.values())
+                for field in ("vm_count", "running_vms", "stopped_vms")
+            },
+        }
+        for field, value in totals.items():
+            setattr(summary, field, value)
+        summary.save()
+        bump_cluster_version(cluster.pk)
+        live_nodes = Q(name__in=changed_nodes) | Q(id__in=recounted)
+        publish_on_commit(
+            "cluster", lambda: cluster_event(cluster, summary, live_nodes)
+        )
+    return summary
+
+
+def cluster_event(cluster, summary, nodes):
+    """``cluster`` live event payload: summary counts and the node rows ``nodes``"""
+    return {
+        "cluster_id": cluster.pk,
+        "summary": {
+            "node_count": summary.node_count,
+            "online_nodes": summary.online_nodes,
+            "vm_count": summary.vm_count,
+            "running_vms": summary.running_vms,
+            "avg_cpu": summary.avg_cpu,
+            "avg_ram": summary.avg_ram,
+        },
+        "nodes": list(
+            Node.objects.filter(nodes, cluster=cluster).values(*LIVE_NODE_FIELDS)
+        ),
+    }
+
+
+def cluster_aggregates(cluster):
+    """Node and guest totals of ``cluster``, read from its ``ClusterSummary``"""
+    summary = ClusterSummary.objects.filter(cluster=cluster).first()
+    if summary is None:
+        summary = refresh_summaries(cluster)
+    return {
+        "node_count": summary.node_count,
+        "online_nodes": summary.online_nodes,
+        "vm_count": summary.vm_count,
+        "running_vms": summary.running_vms,
+        "avg_cpu": summary.avg_cpu,
+        "avg_ram": summary.avg_ram,
+    }
@@ -0,0 +1,174 @@
+"""
+Tracking of Proxmox tasks (UPIDs) started by VM operations.
+
+Operations such as migrations, power actions and snapshots return a UPID right
+away and leave their ``AuditLog`` (and ``CeleryTask``) pending. The tracker
+follows every outstanding UPID of a cluster with one ``/cluster/tasks`` call
+per poll, falling back to one ``/nodes/{node}/tasks`` call per node for UPIDs
+that have dropped out of the cluster task list, and records the real outcome
+once Proxmox reports the task as finished.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.utils import timezone
+
+from .connections import get_proxmox_connection
+from .models import AuditLog, CeleryTask, ProxmoxCluster
+from .progress import clear_progress
+from .resync import refresh_guests
+
+logger = logging.getLogger(__name__)
+
+# Operations pending for longer than this are given up on
+TRACK_TIMEOUT = timedelta(hours=24)
+
+
+def parse_upid(upid):
+    """
+    Split ``UPID:node:pid:pstart:starttime:type:id:user:`` into a dict.
+
+    ``pid``, ``pstart`` and ``starttime`` are hexadecimal in the UPID.
+    """
+    parts = upid.split(":")
+    if len(parts) < 8 or parts[0] != "UPID":
+        raise ValueError(f"Invalid UPID: {upid}")
+    return {
+        "node": parts[1],
+        "pid": int(parts[2], 16),
+        "pstart": int(parts[3], 16),
+        "starttime": int(parts[4], 16),
+        "type": parts[5],
+        "id": parts[6],
+        "user": parts[7],
+    }
+
+
+def is_upid(value):
+    return isinstance(value, str) and value.startswith("UPID:")
+
+
+def is_success(exit_status):
+    """Proxmox reports ``OK``, or ``WARNINGS: n`` for tasks that completed with warnings"""
+    return exit_status == "OK" or exit_status.startswith("WARNINGS")
+
+
+def pending_operations(cluster_id=None):
+    """Pending audit log entries waiting for a Proxmox task"""
+    entries = AuditLog.objects.filter(status="pending", task_id__startswith="UPID:")
+    if cluster_id is not None:
+        entries = entries.filter(cluster_id=cluster_id)
+    return entries
+
+
+def fetch_finished_tasks(prox, upids):
+    """
+    Return ``{upid: task}`` for those of ``upids`` that have finished.
+
+    One ``/cluster/tasks`` call covers recent tasks of every node; UPIDs it does
+    not list are looked up with one ``/nodes/{node}/tasks`` call per node.
+    """
+    finished = {}
+    listed = set()
+    for task in prox.cluster.tasks.get():
+        if task.get("upid") in upids:
+            listed.add(task["upid"])
+            if task.get("endtime") and task.get("status"):
+                finished[task["upid"]] = task
+
+    missing = {}
+    for upid in upids - listed:
+        info = parse_upid(upid)
+        missing.setdefault(info["node"], []).append(info["starttime"])
+
+    for node_name, starttimes in missing.items():
+        try:
+            tasks = prox.nodes(node_name).tasks.get(
+                source="all", since=min(starttimes), limit=1000
+            )
+        except Exception as e:
+            logger.warning(f"Error listing tasks of node {node_name}: {str(e)}")
+            continue
+        for task in tasks:
+            if task.get("upid") in upids and task.get("endtime") and task.get("status"):
+                finished[task["upid"]] = task
+    return finished
+
+
+def finish_operation(entry, task):
+    """Record the outcome of a finished Proxmox task on its audit log and CeleryTask"""
+    exit_status = task["status"]
+    success = is_success(exit_status)
+    completed_at = datetime.fromtimestamp(task["endtime"], tz=dt_timezone.utc)
+    duration = task["endtime"] - task.get("starttime", task["endtime"])
+
+    entry.status = "success" if success else "failed"
+    entry.exit_status = exit_status[:255]
+    entry.duration = duration
+    entry.completed_at = completed_at
+    entry.details += f"\nProxmox task finished after {duration}s: {exit_status}"
+    entry.save()
+
+    for celery_task in CeleryTask.objects.filter(upid=entry.task_id):
+        celery_task.state = "SUCCESS" if success else "FAILURE"
+        celery_task.result = exit_status
+        celery_task.progress = 100 if success else celery_task.progress
+        # Local clock, so execution_time is not skewed against started_at
+        celery_task.completed_at = timezone.now()
+        celery_task.save()
+        clear_progress(celery_task.task_id)
+
+
+def give_up(entry):
+    entry.status = "failed"
+    entry.completed_at = timezone.now()
+    entry.details += "\nGave up waiting for the Proxmox task to finish"
+    entry.save()
+
+    for celery_task in CeleryTask.objects.filter(upid=entry.task_id):
+        celery_task.state = "FAILURE"
+        celery_task.result = "Gave up waiting for the Proxmox task"
+        celery_task.completed_at = entry.completed_at
+        celery_task.save()
+        clear_progress(celery_task.task_id)
+
+
+def poll_cluster(cluster_id):
+    """
+    Poll the outstanding Proxmox tasks of one cluster.
+
+    Returns ``(finished, remaining)`` counts.
+    """
+    entries = list(pending_operations(cluster_id).select_related("vm"))
+    if not entries:
+        return 0, 0
+
+    cluster = ProxmoxCluster.objects.get(id=cluster_id)
+    prox = get_proxmox_connection(cluster)
+    finished = fetch_finished_tasks(prox, {entry.task_id for entry in entries})
+
+    done = 0
+    vmids = set()
+    deadline = timezone.now() - TRACK_TIMEOUT
+    for entry in entries:
+        task = finished.get(entry.task_id)
+        if task is not None:
+            finish_operation(entry, task)
+            done += 1
+            if entry.vm is not None:
+                vmids.add(entry.vm.vmid)
+        elif entry.created_at < deadline:
+            give_up(entry)
+            done += 1
+
+    if vmids:
+        try:
+            refresh_guests(cluster, prox, vmids)
+        except Exception as e:
+            logger.warning(f"Error refreshing guests {sorted(vmids)}: {str(e)}")
+
+    if done:
+        logger.info(f"Cluster {cluster.name}: {done} Proxmox tasks finished")
+    return done, len(entries) - done
@@ -1,13 +1,56 @@
 import logging
+import time
 
-from celery import current_task, shared_task
+from celery import chord, current_task, shared_task
+from django.conf import settings
 from django.utils import timezone
-from proxmoxer import ProxmoxAPI
 
+from .async_sync import sync_cluster_async
+from .breaker import is_open
+from .changes import prune_tombstones
+from .endpoints import discover_endpoints
+from .connections import get_proxmox_connection
+from .events import classify_events, read_new_events
+from .locks import (
+    RESERVE_TTL,
+    cluster_sync_lock,
+    enqueue_single_flight,
+    event_watcher_lock,
+    hand_off_lock,
+    lock_owner,
+    node_sync_lock,
+    single_flight,
+    task_tracker_lock,
+)
 from .models import AuditLog, CeleryTask, Node, ProxmoxCluster, VirtualMachine
+from .progress import (
+    child_done,
+    clear_progress,
+    publish_progress,
+    start_children,
+    throttle,
+)
+from .resync import refresh_guests, refresh_nodes
+from .scheduling import add_churn, due_schedules, guest_churn, postpone, record_sync
+from .sync import (
+    cluster_aggregates,
+    load_known_configs,
+    needs_config,
+    node_defaults_from_resource,
+    node_defaults_from_status,
+    persist_guests,
+    persist_nodes,
+    prune_nodes,
+    resource_needs_config,
+    vm_defaults_from_config,
+    vm_defaults_from_resource,
+)
+from .task_tracker import is_upid, pending_operations, poll_cluster
 
 logger = logging.getLogger(__name__)
 
+SYNC_MODES = ("resources", "nodes", "async")
+
 
 def track_task(task_name, user=None, vm=None, cluster=None):
     """Helper function to create a CeleryTask record for tracking"""
@@ -32,11 +75,20 @@ def track_task(task_name, user=None, vm=None, cluster=None):
 
 
 def update_task_progress(celery_task, progress, message=""):
-    """Update task progress"""
+    """
+    Update task progress.
+
+    Progress goes to the Redis side channel (see ``progress.py``), throttled by
+    time and delta; the row itself is only saved by ``complete_task`` unless
+    Redis is unavailable.
+    """
     if celery_task:
         celery_task.progress = progress
         celery_task.progress_message = message
-        celery_task.save()
+        if not throttle.should_publish(celery_task.task_id, progress):
+            return
+        if not publish_progress(celery_task.task_id, progress, message):
+            celery_task.save(update_fields=["progress", "progress_message"])
 
 
 def complete_task(celery_task, state, result=None, traceback=None):
@@ -48,6 +100,7 @@ def complete_task(celery_task, state, result=None, traceback=None):
         celery_task.completed_at = timezone.now()
         celery_task.progress = 100 if state == "SUCCESS" else celery_task.progress
         celery_task.save()
+        clear_progress(celery_task.task_id)
 
 
 @shared_task
@@ -56,7 +109,7 @@ def sync_all_clusters():
     try:
         clusters = ProxmoxCluster.objects.filter(is_active=True)
         for cluster in clusters:
-            sync_cluster_data.delay(cluster.id)
+            enqueue_cluster_sync(cluster.id)
         logger.info(f"Started sync for {clusters.count()} clusters")
         return f"Synced {clusters.count()} clusters"
     except Exception as e:
@@ -64,70 +117,77 @@ def sync_all_clusters():
         return f"Error: {str(e)}"
 
 
-def get_proxmox_connection(cluster):
-    return ProxmoxAPI(
-        cluster.api_url.replace("https://", "").replace("http://", "").split(":")[0],
-        user=cluster.username,
-        password=cluster.password,
-        verify_ssl=cluster.verify_ssl,
+@shared_task
+def schedule_cluster_syncs():
+    """Periodic task starting the clusters whose adaptive sync interval elapsed"""
+    try:
+        started = 0
+        for schedule in due_schedules():
+            # Left due, so the first run after the breaker allows a probe syncs
+            if is_open(schedule.cluster_id):
+                continue
+            task_id, is_new = enqueue_cluster_sync(schedule.cluster_id)
+            postpone(schedule)
+            started += is_new
+        if started:
+            logger.info(f"Started scheduled sync for {started} clusters")
+        return f"Started {started} scheduled syncs"
+    except Exception as e:
+        logger.error(f"Error in schedule_cluster_syncs: {str(e)}")
+        return f"Error: {str(e)}"
+
+
+def enqueue_cluster_sync(cluster_id, mode=None, **options):
+    """
+    Start ``sync_cluster_data`` unless a sync of this cluster is in flight.
+
+    ``options`` are passed to ``apply_async`` (e.g. ``priority``). Returns
+    ``(task_id, started)``; ``task_id`` is the in-flight task when ``started``
+    is False.
+    """
+    return enqueue_single_flight(
+        sync_cluster_data, cluster_sync_lock(cluster_id), (cluster_id, mode), **options
     )
 
 
 @shared_task
-def sync_cluster_data(cluster_id):
+@single_flight(cluster_sync_lock)
+def sync_cluster_data(cluster_id, mode=None):
+    """
+    Sync nodes and guests of a cluster.
+
+    ``mode`` selects how inventory is fetched (defaults to PROXMOX_SYNC_MODE):
+    ``resources`` reads the whole cluster from one ``/cluster/resources`` call,
+    ``nodes`` queries every node and runs a chord of ``sync_vms_for_node``
+    tasks whose ``reconcile_cluster_sync`` callback completes this task,
+    ``async`` queries every node and guest concurrently in this task.
+    """
     celery_task = None
+    mode = mode or settings.PROXMOX_SYNC_MODE
+    started = time.time()
     try:
+        if mode not in SYNC_MODES:
+            raise ValueError(f"Unknown sync mode: {mode}")
+
         cluster = ProxmoxCluster.objects.get(id=cluster_id)
         celery_task = track_task(f"sync_cluster_data", cluster=cluster)
 
         update_task_progress(celery_task, 10, f"Connecting to cluster {cluster.name}")
         prox = get_proxmox_connection(cluster)
+        try:
+            discover_endpoints(cluster, prox)
+        except Exception as e:
+            logger.warning(f"Error discovering API endpoints of {cluster.name}: {str(e)}")
 
-        update_task_progress(celery_task, 30, "Fetching nodes data")
-        nodes_data = prox.nodes.get()
-        total_nodes = len(nodes_data)
-
-        for idx, node_data in enumerate(nodes_data):
-            progress = 30 + int((idx / total_nodes) * 40)
-            node_name = node_data["node"]
-            update_task_progress(celery_task, progress, f"Syncing node {node_name}")
-
-            node_status_data = prox.nodes(node_name).status.get()
-
-            cpu_usage = node_status_data.get("cpu", 0) * 100
-            ram_total = node_status_data.get("memory", {}).get("total", 0)
-            ram_used = node_status_data.get("memory", {}).get("used", 0)
-            ram_usage = (ram_used / ram_total * 100) if ram_total > 0 else 0
-
-            disk_total = node_status_data.get("rootfs", {}).get("total", 0)
-            disk_used = node_status_data.get("rootfs", {}).get("used", 0)
-            disk_usage = (disk_used / disk_total * 100) if disk_total > 0 else 0
-
-            node, created = Node.objects.update_or_create(
-                cluster=cluster,
-                name=node_name,
-                defaults={
-                    "status": (
-                        "online" if node_data.get("status") == "online" else "offline"
-                    ),
-                    "cpu_usage": round(cpu_usage, 2),
-                    "ram_usage": round(ram_usage, 2),
-                    "ram_total": ram_total,
-                    "ram_used": ram_used,
-                    "disk_usage": round(disk_usage, 2),
-                    "disk_total": disk_total,
-                    "disk_used": disk_used,
-                    "uptime": node_status_data.get("uptime", 0),
-                    "last_synced": timezone.now(),
-                },
-            )
-
-            sync_vms_for_node.delay(node.id)
+        if mode == "nodes":
+            return sync_cluster_nodes(cluster, prox, celery_task, started)
 
-        update_task_progress(celery_task, 90, "Finalizing cluster sync")
-        result = f"Successfully synced cluster {cluster.name}"
-        complete_task(celery_task, "SUCCESS", result)
-        return result
+        if mode == "resources":
+            result = sync_cluster_resources(cluster, prox, celery_task)
+        else:
+            update_task_progress(celery_task, 30, "Fetching nodes and guests")
+            result = sync_cluster_async(cluster)
+        return finish_cluster_sync(cluster, celery_task, result, started)
 
     except Exception as e:
         logger.error(f"Error syncing cluster {cluster_id}: {str(e)}")
@@ -137,8 +197,237 @@ def sync_cluster_data(cluster_id):
         return f"Error syncing cluster: {str(e)}"
 
 
+def finish_cluster_sync(cluster, celery_task, result, started):
+    """
+    Complete a cluster sync once all of its nodes and guests are saved.
+
+    Recomputes the cluster aggregates for the result and records the total
+    duration for adaptive scheduling.
+    """
+    aggregates = cluster_aggregates(cluster)
+    duration = time.time() - started
+    record_sync(cluster.id, duration)
+
+    result = (
+        f"{result} in {duration:.1f}s: {aggregates['vm_count']} guests "
+        f"({aggregates['running_vms']} running) on {aggregates['online_nodes']}/"
+        f"{aggregates['node_count']} online nodes"
+    )
+    complete_task(celery_task, "SUCCESS", result)
+    return result
+
+
+def sync_cluster_nodes(cluster, prox, celery_task=None, started=None):
+    """
+    Sync node status, then the guests of every node in a chord.
+
+    The chord callback, ``reconcile_cluster_sync``, completes ``celery_task``
+    and releases the cluster lock, which this task hands off to it. An empty
+    node listing is treated as a failed one: no chord is started and nothing
+    is deleted.
+    """
+    update_task_progress(celery_task, 30, "Fetching nodes data")
+    nodes_data = prox.nodes.get()
+    total_nodes = len(nodes_data)
+    if not nodes_data:
+        logger.warning(f"Proxmox listed no nodes for {cluster.name}, nothing synced")
+        return finish_cluster_sync(
+            cluster,
+            celery_task,
+            f"Synced cluster {cluster.name}: no nodes listed, nothing deleted",
+            started or time.time(),
+        )
+
+    node_rows = {}
+    for idx, node_data in enumerate(nodes_data):
+        progress = 30 + int((idx / total_nodes) * 10)
+        node_name = node_data["node"]
+        update_task_progress(celery_task, progress, f"Syncing node {node_name}")
+
+        node_status_data = prox.nodes(node_name).status.get()
+        node_rows[node_name] = node_defaults_from_status(node_data, node_status_data)
+
+    nodes = persist_nodes(cluster, node_rows)
+    parent_task_id = celery_task.task_id if celery_task else None
+    if parent_task_id:
+        start_children(parent_task_id, len(node_rows))
+    update_task_progress(
+        celery_task, 40, f"Syncing guests of {len(node_rows)} nodes"
+    )
+
+    chord(
+        sync_vms_for_node.si(nodes[node_name].id, parent_task_id)
+        for node_name in node_rows
+    )(
+        reconcile_cluster_sync.s(
+            cluster.id, list(node_rows), parent_task_id, started or time.time()
+        )
+    )
+    hand_off_lock()
+    return f"Syncing guests of {len(node_rows)} nodes of cluster {cluster.name}"
+
+
+@shared_task
+def reconcile_cluster_sync(results, cluster_id, node_names, parent_task_id, started):
+    """
+    Chord callback of a ``nodes`` mode sync, run once every node sync ended.
+
+    Deletes the guests no node listed, prunes nodes Proxmox no longer lists
+    (and their guests), completes the parent ``sync_cluster_data`` task and
+    releases its cluster lock. Successful node syncs return their listed
+    vmids; guests are only deleted when every node sync succeeded, as a
+    guest missing from one node's listing may have moved to a failed one,
+    and when Proxmox listed nodes at all (like ``prune_nodes``).
+    """
+    celery_task = CeleryTask.objects.filter(task_id=parent_task_id).first()
+    try:
+        cluster = ProxmoxCluster.objects.get(id=cluster_id)
+        update_task_progress(celery_task, 90, "Reconciling cluster")
+        listings = [r for r in results if isinstance(r, dict)]
+        failed = len(results) - len(listings)
+        deleted = 0
+        if not node_names:
+            logger.warning(
+                f"Not deleting guests of {cluster.name}: Proxmox listed no nodes"
+            )
+        elif failed:
+            logger.warning(
+                f"Not deleting guests of {cluster.name}: "
+                f"{failed} node syncs did not complete"
+            )
+        else:
+            counts = persist_guests(
+                cluster,
+                [],
+                scope=VirtualMachine.objects.filter(node__cluster=cluster),
+                listed_vmids={vmid for r in listings for vmid in r["vmids"]},
+            )
+            deleted = counts["deleted"]
+            add_churn(cluster.id, deleted)
+        pruned = prune_nodes(cluster, node_names)
+        return finish_cluster_sync(
+            cluster,
+            celery_task,
+            f"Successfully synced cluster {cluster.name} ({len(node_names)} nodes, "
+            f"{failed} failed, {pruned} removed, {deleted} guests deleted)",
+            started,
+        )
+    except Exception as e:
+        logger.error(f"Error reconciling cluster {cluster_id}: {str(e)}")
+        import traceback
+
+        complete_task(celery_task, "FAILURE", str(e), traceback.format_exc())
+        return f"Error reconciling cluster: {str(e)}"
+    finally:
+        if parent_task_id:
+            cluster_sync_lock(cluster_id).release(parent_task_id)
+
+
+def node_sync_finished(parent_task_id, node_id):
+    """Advance the progress of a chord parent as one of its node syncs ends"""
+    done, total = child_done(parent_task_id)
+    if total:
+        publish_progress(
+            parent_task_id,
+            40 + int(done / total * 50),
+            f"Synced guests of {done} of {total} nodes",
+        )
+    node = Node.objects.filter(id=node_id).only("cluster_id").first()
+    if node is not None:
+        # Keep the handed-off cluster lock alive while node syncs run
+        cluster_sync_lock(node.cluster_id).extend(parent_task_id, RESERVE_TTL)
+
+
+def sync_cluster_resources(cluster, prox, celery_task=None):
+    """
+    Sync a cluster from a single ``/cluster/resources`` call.
+
+    Per-guest config requests are only made for new guests, guests whose
+    listing changed and stale configs (see ``resource_needs_config``).
+    """
+    update_task_progress(celery_task, 30, "Fetching cluster resources")
+    resources = prox.cluster.resources.get()
+
+    node_resources = [r for r in resources if r.get("type") == "node"]
+    guest_resources = [r for r in resources if r.get("type") in ("qemu", "lxc")]
+
+    update_task_progress(celery_task, 50, f"Syncing {len(node_resources)} nodes")
+    nodes = persist_nodes(
+        cluster,
+        {r["node"]: node_defaults_from_resource(r) for r in node_resources},
+    )
+
+    update_task_progress(celery_task, 60, f"Syncing {len(guest_resources)} guests")
+    known_configs = load_known_configs(cluster)
+    guests = []
+    config_fetches = 0
+    for resource in guest_resources:
+        node = nodes.get(resource.get("node"))
+        vmid = resource["vmid"]
+        if node is None:
+            logger.warning(f"Guest {vmid} reported on unknown node {resource.get('node')}")
+            continue
+
+        try:
+            known = known_configs.get(vmid)
+            config = None
+            if resource_needs_config(resource, known):
+                guest = getattr(prox.nodes(node.name), resource["type"])(vmid)
+                config = guest.config.get()
+                config_fetches += 1
+
+            guests.append(
+                VirtualMachine(
+                    node=node,
+                    vmid=vmid,
+                    **vm_defaults_from_resource(resource, config, known),
+                )
+            )
+        except Exception as e:
+            logger.warning(f"Error syncing guest {vmid} on node {node.name}: {str(e)}")
+            continue
+
+    update_task_progress(celery_task, 80, "Saving guests")
+    counts = persist_guests(
+        cluster,
+        guests,
+        scope=VirtualMachine.objects.filter(node__cluster=cluster),
+        listed_vmids={r["vmid"] for r in guest_resources},
+    )
+    add_churn(cluster.id, guest_churn(counts))
+    prune_nodes(cluster, [r["node"] for r in node_resources])
+
+    update_task_progress(celery_task, 90, "Finalizing cluster sync")
+    logger.info(
+        f"Synced cluster {cluster.name} from resources: {len(nodes)} nodes, "
+        f"{len(guest_resources)} guests, {config_fetches} config fetches, "
+        f"{counts['created']} created, {counts['moved']} moved, "
+        f"{counts['deleted']} deleted"
+    )
+    return (
+        f"Successfully synced cluster {cluster.name} "
+        f"({len(nodes)} nodes, {len(guest_resources)} guests)"
+    )
+
+
 @shared_task
-def sync_vms_for_node(node_id):
+def sync_vms_for_node(node_id, parent_task_id=None):
+    """
+    Sync the guests of a node, as a child of a ``nodes`` mode cluster sync
+    when ``parent_task_id`` is given.
+
+    The parent's progress advances however the child ends, including when it
+    is skipped because the node is already being synced.
+    """
+    try:
+        return sync_node_guests(node_id)
+    finally:
+        if parent_task_id:
+            node_sync_finished(parent_task_id, node_id)
+
+
+@single_flight(node_sync_lock)
+def sync_node_guests(node_id):
     celery_task = None
     try:
         node = Node.objects.get(id=node_id)
@@ -148,9 +437,13 @@ def sync_vms_for_node(node_id):
         update_task_progress(celery_task, 10, f"Connecting to node {node.name}")
         prox = get_proxmox_connection(cluster)
 
+        known_configs = load_known_configs(cluster)
+        config_fetches = 0
+
         update_task_progress(celery_task, 30, "Fetching VMs")
         vms_data = prox.nodes(node.name).qemu.get()
         total_vms = len(vms_data)
+        guests = []
 
         for idx, vm_data in enumerate(vms_data):
             progress = 30 + int((idx / max(total_vms, 1)) * 30)
@@ -158,35 +451,18 @@ def sync_vms_for_node(node_id):
             update_task_progress(celery_task, progress, f"Syncing VM {vmid}")
 
             try:
-                vm_config = prox.nodes(node.name).qemu(vmid).config.get()
-                vm_status = prox.nodes(node.name).qemu(vmid).status.current.get()
-
-                disk_gb = 0
-                for key, value in vm_config.items():
-                    if key.startswith(("virtio", "scsi", "sata", "ide")):
-                        if isinstance(value, str) and "size=" in value:
-                            size_part = value.split("size=")[1].split(",")[0]
-                            if "G" in size_part:
-                                disk_gb += float(size_part.replace("G", ""))
-                            elif "T" in size_part:
-                                disk_gb += float(size_part.replace("T", "")) * 1024
-                            elif "M" in size_part:
-                                disk_gb += float(size_part.replace("M", "")) / 1024
-
-                VirtualMachine.objects.update_or_create(
-                    node=node,
-                    vmid=vmid,
-                    defaults={
-                        "name": vm_data.get("name", f"VM-{vmid}"),
-                        "vm_type": "qemu",
-                        "status": vm_data.get("status", "unknown"),
-                        "cpu_cores": vm_config.get("cores", 1),
-                        "ram_mb": vm_config.get("memory", 512),
-                        "disk_gb": round(disk_gb, 2),
-                        "cpu_usage": round(vm_status.get("cpu", 0) * 100, 2),
-                        "uptime": vm_status.get("uptime", 0),
-                        "last_synced": timezone.now(),
-                    },
+                known = known_configs.get(vmid)
+                vm_config = None
+                if needs_config(known, vm_data):
+                    vm_config = prox.nodes(node.name).qemu(vmid).config.get()
+                    config_fetches += 1
+
+                guests.append(
+                    VirtualMachine(
+                        node=node,
+                        vmid=vmid,
+                        **vm_defaults_from_config("qemu", vm_data, vm_config, known),
+                    )
                 )
             except Exception as e:
                 logger.warning(f"Error syncing VM {vmid} on node {node.name}: {str(e)}")
@@ -202,34 +478,20 @@ def sync_vms_for_node(node_id):
             update_task_progress(celery_task, progress, f"Syncing container {vmid}")
 
             try:
-                container_config = prox.nodes(node.name).lxc(vmid).config.get()
-                container_status = prox.nodes(node.name).lxc(vmid).status.current.get()
-
-                disk_gb = 0
-                rootfs = container_config.get("rootfs", "")
-                if isinstance(rootfs, str) and "size=" in rootfs:
-                    size_part = rootfs.split("size=")[1].split(",")[0]
-                    if "G" in size_part:
-                        disk_gb = float(size_part.replace("G", ""))
-                    elif "T" in size_part:
-                        disk_gb = float(size_part.replace("T", "")) * 1024
-                    elif "M" in size_part:
-                        disk_gb = float(size_part.replace("M", "")) / 1024
-
-                VirtualMachine.objects.update_or_create(
-                    node=node,
-                    vmid=vmid,
-                    defaults={
-                        "name": container_data.get("name", f"CT-{vmid}"),
-                        "vm_type": "lxc",
-                        "status": container_data.get("status", "unknown"),
-                        "cpu_cores": container_config.get("cores", 1),
-                        "ram_mb": container_config.get("memory", 512),
-                        "disk_gb": round(disk_gb, 2),
-                        "cpu_usage": round(container_status.get("cpu", 0) * 100, 2),
-                        "uptime": container_status.get("uptime", 0),
-                        "last_synced": timezone.now(),
-                    },
+                known = known_configs.get(vmid)
+                container_config = None
+                if needs_config(known, container_data):
+                    container_config = prox.nodes(node.name).lxc(vmid).config.get()
+                    config_fetches += 1
+
+                guests.append(
+                    VirtualMachine(
+                        node=node,
+                        vmid=vmid,
+                        **vm_defaults_from_config(
+                            "lxc", container_data, container_config, known
+                        ),
+                    )
                 )
             except Exception as e:
                 logger.warning(
@@ -237,9 +499,24 @@ def sync_vms_for_node(node_id):
                 )
                 continue
 
+        update_task_progress(celery_task, 95, "Saving guests")
+        # No deletes here: a guest migrating while the node syncs run would
+        # lose its row (and history) when its old node is synced first.
+        # reconcile_cluster_sync deletes the guests no node listed
+        counts = persist_guests(cluster, guests)
+        add_churn(cluster.id, guest_churn(counts))
+        logger.info(
+            f"Synced node {node.name}: {len(guests)} guests, "
+            f"{config_fetches} config fetches"
+        )
+
         result = f"Successfully synced {total_vms} VMs and {total_lxc} containers for node {node.name}"
         complete_task(celery_task, "SUCCESS", result)
-        return result
+        return {
+            "node": node.name,
+            "vmids": [g["vmid"] for g in vms_data + lxc_data],
+            "result": result,
+        }
 
     except Exception as e:
         logger.error(f"Error syncing VMs for node {node_id}: {str(e)}")
@@ -249,9 +526,60 @@ def sync_vms_for_node(node_id):
         return f"Error syncing VMs: {str(e)}"
 
 
+@shared_task
+def watch_all_cluster_events():
+    """Periodic task polling the task log of every active cluster"""
+    clusters = ProxmoxCluster.objects.filter(is_active=True).values_list("id", flat=True)
+    for cluster_id in clusters:
+        if is_open(cluster_id):
+            continue
+        enqueue_single_flight(
+            watch_cluster_events, event_watcher_lock(cluster_id), (cluster_id,)
+        )
+    return f"Watching events of {len(clusters)} clusters"
+
+
+@shared_task
+@single_flight(event_watcher_lock)
+def watch_cluster_events(cluster_id):
+    """
+    Resync the guests and nodes touched by new entries in the cluster task log.
+
+    Costs one ``/cluster/tasks`` call per poll, plus one ``/cluster/resources``
+    call per kind of row touched; falls back to a full ``sync_cluster_data``
+    when the log may have skipped entries or an entry touched many guests.
+    """
+    try:
+        cluster = ProxmoxCluster.objects.get(id=cluster_id)
+        prox = get_proxmox_connection(cluster)
+        events, gap = read_new_events(cluster, prox)
+        if not events:
+            return "No new events"
+
+        vmids, node_names, full = classify_events(events)
+        if gap or full:
+            task_id, started = enqueue_cluster_sync(cluster.id)
+            return f"{len(events)} events, full sync {task_id}"
+
+        refresh_nodes(cluster, prox, node_names)
+        refresh_guests(cluster, prox, vmids)
+        logger.info(
+            f"Cluster {cluster.name}: {len(events)} new events, resynced "
+            f"{len(vmids)} guests and {len(node_names)} nodes"
+        )
+        return (
+            f"{len(events)} events, resynced {len(vmids)} guests "
+            f"and {len(node_names)} nodes"
+        )
+    except Exception as e:
+        logger.error(f"Error watching events of cluster {cluster_id}: {str(e)}")
+        return f"Error watching events: {str(e)}"
+
+
 @shared_task
 def migrate_vm_task(vm_id, target_node_id, user_id, online=True):
     log_entry = None
+    celery_task = None
     try:
         vm = VirtualMachine.objects.get(id=vm_id)
         target_node = Node.objects.get(id=target_node_id)
@@ -269,6 +597,9 @@ def migrate_vm_task(vm_id, target_node_id, user_id, online=True):
             status="pending",
             details=f"Migrating VM {vm.vmid} from {source_node.name} to {target_node.name}",
         )
+        celery_task = track_task(
+            "migrate_vm_task", user=log_entry.user, vm=vm, cluster=cluster
+        )
 
         prox = get_proxmox_connection(cluster)
 
@@ -285,21 +616,19 @@ def migrate_vm_task(vm_id, target_node_id, user_id, online=True):
                 .migrate.post(target=target_node.name, online=1 if online else 0)
             )
 
-        log_entry.task_id = task_id
-        log_entry.save()
-
-        vm.node = target_node
-        vm.save()
-
-        log_entry.status = "success"
-        log_entry.completed_at = timezone.now()
-        log_entry.details += f"\nMigration completed successfully. Task ID: {task_id}"
-        log_entry.save()
+        # The guest is re-pointed to the target node once the tracker sees the
+        # migration finish, not before
+        await_proxmox_task(
+            log_entry, celery_task, task_id, f"Migrating to {target_node.name}"
+        )
 
         return f"Migration of VM {vm.vmid} to {target_node.name} initiated. Task: {task_id}"
 
     except Exception as e:
         logger.error(f"Error migrating VM {vm_id}: {str(e)}")
+        import traceback
+
+        complete_task(celery_task, "FAILURE", str(e), traceback.format_exc())
         if log_entry:
             log_entry.status = "failed"
             log_entry.completed_at = timezone.now()
@@ -311,6 +640,7 @@ def migrate_vm_task(vm_id, target_node_id, user_id, online=True):
 @shared_task
 def vm_power_action(vm_id, action, user_id):
     log_entry = None
+    celery_task = None
     try:
         vm = VirtualMachine.objects.get(id=vm_id)
         cluster = vm.node.cluster
@@ -323,6 +653,9 @@ def vm_power_action(vm_id, action, user_id):
             status="pending",
             details=f"Executing {action} on VM {vm.vmid}",
         )
+        celery_task = track_task(
+            "vm_power_action", user=log_entry.user, vm=vm, cluster=cluster
+        )
 
         prox = get_proxmox_connection(cluster)
 
@@ -333,34 +666,27 @@ def vm_power_action(vm_id, action, user_id):
 
         if action == "start":
             task_id = vm_handler.start.post()
-            vm.status = "running"
         elif action == "stop":
             task_id = vm_handler.stop.post()
-            vm.status = "stopped"
         elif action == "reboot":
             task_id = vm_handler.reboot.post()
         elif action == "shutdown":
             task_id = vm_handler.shutdown.post()
-            vm.status = "stopped"
         else:
             raise ValueError(f"Unknown action: {action}")
 
-        vm.save()
-
-        log_entry.task_id = task_id
-        log_entry.status = "success"
-        log_entry.completed_at = timezone.now()
-        log_entry.details += (
-            f"\n{action.capitalize()} completed successfully. Task ID: {task_id}"
+        # The guest status is refreshed once the tracker sees the task finish
+        await_proxmox_task(
+            log_entry, celery_task, task_id, f"Waiting for {action} to finish"
         )
-        log_entry.save()
 
-        return (
-            f"{action.capitalize()} action on VM {vm.vmid} completed. Task: {task_id}"
-        )
+        return f"{action.capitalize()} action on VM {vm.vmid} initiated. Task: {task_id}"
 
     except Exception as e:
         logger.error(f"Error executing {action} on VM {vm_id}: {str(e)}")
+        import traceback
+
+        complete_task(celery_task, "FAILURE", str(e), traceback.format_exc())
         if log_entry:
             log_entry.status = "failed"
             log_entry.completed_at = timezone.now()
@@ -372,6 +698,7 @@ def vm_power_action(vm_id, action, user_id):
 @shared_task
 def create_snapshot(vm_id, snapshot_name, user_id):
     log_entry = None
+    celery_task = None
     try:
         vm = VirtualMachine.objects.get(id=vm_id)
         cluster = vm.node.cluster
@@ -384,6 +711,9 @@ def create_snapshot(vm_id, snapshot_name, user_id):
             status="pending",
             details=f"Creating snapshot '{snapshot_name}' for VM {vm.vmid}",
         )
+        celery_task = track_task(
+            "create_snapshot", user=log_entry.user, vm=vm, cluster=cluster
+        )
 
         prox = get_proxmox_connection(cluster)
 
@@ -400,19 +730,105 @@ def create_snapshot(vm_id, snapshot_name, user_id):
                 .snapshot.post(snapname=snapshot_name)
             )
 
-        log_entry.task_id = task_id
-        log_entry.status = "success"
-        log_entry.completed_at = timezone.now()
-        log_entry.details += f"\nSnapshot created successfully. Task ID: {task_id}"
-        log_entry.save()
+        await_proxmox_task(
+            log_entry, celery_task, task_id, f"Creating snapshot '{snapshot_name}'"
+        )
 
-        return f"Snapshot '{snapshot_name}' created for VM {vm.vmid}. Task: {task_id}"
+        return f"Snapshot '{snapshot_name}' of VM {vm.vmid} initiated. Task: {task_id}"
 
     except Exception as e:
         logger.error(f"Error creating snapshot for VM {vm_id}: {str(e)}")
+        import traceback
+
+        complete_task(celery_task, "FAILURE", str(e), traceback.format_exc())
         if log_entry:
             log_entry.status = "failed"
             log_entry.completed_at = timezone.now()
             log_entry.details += f"\nSnapshot creation failed: {str(e)}"
             log_entry.save()
         return f"Snapshot creation failed: {str(e)}"
+
+
+def await_proxmox_task(log_entry, celery_task, upid, message):
+    """
+    Leave an operation pending until the Proxmox task ``upid`` finishes.
+
+    The audit log entry and CeleryTask are completed by ``track_proxmox_tasks``.
+    Calls that did not start a Proxmox task are completed right away.
+    """
+    if not is_upid(upid):
+        log_entry.status = "success"
+        log_entry.completed_at = timezone.now()
+        log_entry.save()
+        complete_task(celery_task, "SUCCESS", upid)
+        return
+
+    log_entry.task_id = upid
+    log_entry.details += f"\nProxmox task started: {upid}"
+    log_entry.save()
+
+    if celery_task:
+        celery_task.upid = upid
+        celery_task.save(update_fields=["upid"])
+        update_task_progress(celery_task, 50, message)
+
+    watch_proxmox_tasks(log_entry.cluster_id)
+
+
+def watch_proxmox_tasks(cluster_id):
+    """Start the task tracker of a cluster unless it is already polling"""
+    return enqueue_single_flight(
+        track_proxmox_tasks,
+        task_tracker_lock(cluster_id),
+        (cluster_id,),
+        countdown=settings.PROXMOX_TASK_POLL_MIN_INTERVAL,
+    )
+
+
+@shared_task
+def track_proxmox_tasks(cluster_id, delay=None):
+    """
+    Poll the outstanding Proxmox tasks of a cluster in one batch.
+
+    While any remain, the task re-enqueues itself, doubling the delay up to
+    PROXMOX_TASK_POLL_MAX_INTERVAL after polls where nothing finished.
+    """
+    delay = delay or settings.PROXMOX_TASK_POLL_MIN_INTERVAL
+    lock = task_tracker_lock(cluster_id)
+    owner = lock_owner()
+    if not lock.acquire(owner):
+        return f"Skipped: already tracked by task {lock.owner()}"
+
+    try:
+        with lock.held(owner):
+            finished, remaining = poll_cluster(cluster_id)
+    except Exception as e:
+        logger.error(f"Error tracking Proxmox tasks of cluster {cluster_id}: {str(e)}")
+        finished, remaining = 0, pending_operations(cluster_id).count()
+
+    if remaining:
+        if finished:
+            delay = settings.PROXMOX_TASK_POLL_MIN_INTERVAL
+        else:
+            delay = min(delay * 2, settings.PROXMOX_TASK_POLL_MAX_INTERVAL)
+        enqueue_single_flight(
+            track_proxmox_tasks, lock, (cluster_id, delay), countdown=delay
+        )
+    return f"{finished} Proxmox tasks finished, {remaining} pending"
+
+
+@shared_task
+def track_all_proxmox_tasks():
+    """Periodic task restarting the tracker of clusters with pending operations"""
+    cluster_ids = set(pending_operations().values_list("cluster_id", flat=True))
+    for cluster_id in cluster_ids:
+        if cluster_id is not None and not is_open(cluster_id):
+            watch_proxmox_tasks(cluster_id)
+    return f"Tracking Proxmox tasks of {len(cluster_ids)} clusters"
+
+
+@shared_task
+def prune_change_tombstones():
+    """Periodic task dropping deletions the delta APIs no longer list"""
+    pruned = prune_tombstones(settings.CHANGE_TOMBSTONE_RETENTION)
+    return f"Pruned {pruned} tombstones"
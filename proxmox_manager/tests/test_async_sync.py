@@ -0,0 +1,96 @@
+from unittest import mock
+
+import aiohttp
+from django.test import TestCase
+
+from proxmox_manager.async_sync import sync_cluster_async
+from proxmox_manager.models import Node, ProxmoxCluster, VirtualMachine
+
+NODE_STATUS = {
+    "cpu": 0.1,
+    "memory": {"total": 8 << 30, "used": 4 << 30},
+    "rootfs": {"total": 100 << 30, "used": 10 << 30},
+    "uptime": 3600,
+}
+
+
+class FakeClient:
+    """Answers ``get`` from ``routes``, raising the routes that are exceptions"""
+
+    def __init__(self, routes):
+        self.routes = routes
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def get(self, path, **params):
+        value = self.routes[path]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+class SyncClusterAsyncTests(TestCase):
+    def setUp(self):
+        self.cluster = ProxmoxCluster.objects.create(
+            name="lab", api_url="https://pve.example:8006", username="root@pam"
+        )
+        self.pve1 = Node.objects.create(cluster=self.cluster, name="pve1")
+        self.pve2 = Node.objects.create(cluster=self.cluster, name="pve2")
+        VirtualMachine.objects.create(node=self.pve1, vmid=100, name="web")
+        VirtualMachine.objects.create(node=self.pve1, vmid=101, name="gone")
+        VirtualMachine.objects.create(node=self.pve2, vmid=200, name="db")
+
+    def sync(self, routes):
+        endpoints = mock.Mock()
+        endpoints.best.return_value = None
+        with mock.patch(
+            "proxmox_manager.async_sync.AsyncProxmoxClient",
+            lambda *args: FakeClient(routes),
+        ), mock.patch(
+            "proxmox_manager.async_sync.get_auth_headers", return_value={}
+        ), mock.patch(
+            "proxmox_manager.async_sync.get_endpoints", return_value=endpoints
+        ):
+            return sync_cluster_async(self.cluster)
+
+    def test_failed_node_keeps_its_row_and_guests(self):
+        self.sync(
+            {
+                "/nodes": [
+                    {"node": "pve1", "status": "online"},
+                    {"node": "pve2", "status": "online"},
+                ],
+                "/nodes/pve1/status": NODE_STATUS,
+                "/nodes/pve1/qemu": [
+                    {"vmid": 100, "name": "web", "status": "running", "cpus": 2}
+                ],
+                "/nodes/pve1/lxc": [],
+                "/nodes/pve1/qemu/100/config": {"cores": 2, "memory": 2048},
+                "/nodes/pve2/status": aiohttp.ClientConnectionError("unreachable"),
+                "/nodes/pve2/qemu": [],
+                "/nodes/pve2/lxc": [],
+            }
+        )
+
+        self.assertTrue(Node.objects.filter(pk=self.pve2.pk).exists())
+        self.assertCountEqual(
+            VirtualMachine.objects.values_list("vmid", "node__name"),
+            [(100, "pve1"), (200, "pve2")],
+        )
+
+    def test_unlisted_node_is_pruned(self):
+        self.sync(
+            {
+                "/nodes": [{"node": "pve1", "status": "online"}],
+                "/nodes/pve1/status": NODE_STATUS,
+                "/nodes/pve1/qemu": [],
+                "/nodes/pve1/lxc": [],
+            }
+        )
+
+        self.assertFalse(Node.objects.filter(pk=self.pve2.pk).exists())
+        self.assertFalse(VirtualMachine.objects.exists())
@@ -0,0 +1,85 @@
+from unittest import mock
+
+from django.test import override_settings
+
+from proxmox_manager.breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    is_open,
+)
+
+from .utils import RedisTestCase
+
+
+@override_settings(
+    PROXMOX_BREAKER_FAILURE_THRESHOLD=3, PROXMOX_BREAKER_RESET_TIMEOUT=60
+)
+class CircuitBreakerTests(RedisTestCase):
+    def setUp(self):
+        super().setUp()
+        self.breaker = CircuitBreaker(1)
+        self.now = 1000.0
+        patcher = mock.patch(
+            "proxmox_manager.breaker.time.time", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fail(self, times=1):
+        for _ in range(times):
+            self.breaker.record_failure("timed out")
+
+    def test_opens_after_threshold_failures(self):
+        self.fail(2)
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.status()["state"], CLOSED)
+
+        self.fail()
+        self.assertEqual(self.breaker.status()["state"], OPEN)
+        self.assertTrue(is_open(1))
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_success_resets_the_failure_count(self):
+        self.fail(2)
+        self.breaker.record_success()
+        self.fail(2)
+
+        self.assertEqual(self.breaker.status()["state"], CLOSED)
+
+    def test_single_probe_after_reset_timeout(self):
+        self.fail(3)
+        self.now += 60
+
+        self.assertFalse(is_open(1))
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.status()["state"], HALF_OPEN)
+        # Other callers keep failing fast while the probe is in flight
+        self.assertTrue(is_open(1))
+        with self.assertRaises(CircuitOpenError):
+            CircuitBreaker(1).before_call()
+
+    def test_successful_probe_closes(self):
+        self.fail(3)
+        self.now += 60
+        self.breaker.before_call()
+        self.breaker.record_success()
+
+        self.assertEqual(self.breaker.status()["state"], CLOSED)
+        self.assertFalse(is_open(1))
+        CircuitBreaker(1).before_call()
+
+    def test_failed_probe_opens_again(self):
+        self.fail(3)
+        self.now += 60
+        self.breaker.before_call()
+        self.fail()
+
+        status = self.breaker.status()
+        self.assertEqual(status["state"], OPEN)
+        self.assertFalse(status["probe_due"])
+        with self.assertRaises(CircuitOpenError):
+            CircuitBreaker(1).before_call()
@@ -0,0 +1,164 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from proxmox_manager.changes import (
+    change_window,
+    changes_since,
+    next_change_seq,
+    prune_tombstones,
+    record_deletions,
+    stamp,
+)
+from proxmox_manager.models import (
+    CeleryTask,
+    ChangeCounter,
+    Node,
+    ProxmoxCluster,
+    Tombstone,
+    VirtualMachine,
+)
+
+
+class ChangesSinceTests(TestCase):
+    def setUp(self):
+        self.lab = ProxmoxCluster.objects.create(
+            name="lab", api_url="https://lab.example:8006", username="root@pam"
+        )
+        self.prod = ProxmoxCluster.objects.create(
+            name="prod", api_url="https://prod.example:8006", username="root@pam"
+        )
+        self.pve1 = Node.objects.create(cluster=self.lab, name="pve1")
+        self.pve2 = Node.objects.create(cluster=self.prod, name="pve2")
+        self.web = VirtualMachine.objects.create(node=self.pve1, vmid=100, name="web")
+        self.db = VirtualMachine.objects.create(node=self.pve2, vmid=200, name="db")
+        self.start = next_change_seq()
+        stamp(Node.objects.all(), self.start)
+        stamp(VirtualMachine.objects.all(), self.start)
+
+    def ids(self, changes, kind):
+        return [row["id"] for row in changes[kind]]
+
+    def test_sequence_numbers_increase(self):
+        self.assertEqual(next_change_seq(), self.start + 1)
+        self.assertEqual(change_window(), (self.start + 1, 0))
+
+    def test_delta_lists_rows_changed_after_since(self):
+        seq = next_change_seq()
+        stamp(VirtualMachine.objects.filter(pk=self.web.pk), seq)
+
+        changes = changes_since(self.start)
+        self.assertFalse(changes["full"])
+        self.assertEqual(changes["seq"], seq)
+        self.assertEqual(self.ids(changes, "vms"), [self.web.pk])
+        self.assertEqual(changes["nodes"], [])
+
+        self.assertEqual(changes_since(seq)["vms"], [])
+
+    def test_deletions_are_reported_as_tombstones(self):
+        seq = next_change_seq()
+        db_id = self.db.pk
+        record_deletions(seq, "vm", [db_id], self.prod.pk)
+        self.db.delete()
+
+        self.assertEqual(changes_since(self.start)["deleted"]["vms"], [db_id])
+        self.assertEqual(changes_since(seq)["deleted"]["vms"], [])
+
+    def test_cluster_filter(self):
+        seq = next_change_seq()
+        stamp(VirtualMachine.objects.all(), seq)
+        record_deletions(seq, "node", [999], self.prod.pk)
+
+        changes = changes_since(self.start, self.lab)
+        self.assertEqual(self.ids(changes, "vms"), [self.web.pk])
+        self.assertEqual(changes["deleted"]["nodes"], [])
+
+    def test_since_zero_is_a_full_listing(self):
+        changes = changes_since(0)
+
+        self.assertTrue(changes["full"])
+        self.assertEqual(self.ids(changes, "vms"), [self.web.pk, self.db.pk])
+        self.assertEqual(self.ids(changes, "nodes"), [self.pve1.pk, self.pve2.pk])
+
+    def test_since_ahead_of_the_counter_is_a_full_listing(self):
+        changes = changes_since(self.start + 10)
+
+        self.assertTrue(changes["full"])
+        self.assertEqual(len(changes["vms"]), 2)
+
+    def test_since_before_pruned_tombstones_is_a_full_listing(self):
+        seq = next_change_seq()
+        record_deletions(seq, "vm", [self.db.pk], self.prod.pk)
+        self.db.delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(hours=2))
+        prune_tombstones(3600)
+
+        changes = changes_since(self.start)
+        self.assertTrue(changes["full"])
+        self.assertEqual(changes["deleted"]["vms"], [])
+        self.assertEqual(self.ids(changes, "vms"), [self.web.pk])
+        self.assertFalse(changes_since(seq)["full"])
+
+
+class StampTaskTests(TestCase):
+    def setUp(self):
+        self.task = CeleryTask.objects.create(task_id="t1", task_name="sync")
+
+    def counter(self):
+        return ChangeCounter.objects.get(pk=1).value
+
+    def test_creation_and_state_changes_are_stamped(self):
+        created = self.counter()
+        self.assertEqual(CeleryTask.objects.get(pk=self.task.pk).change_seq, created)
+
+        task = CeleryTask.objects.get(pk=self.task.pk)
+        task.state = "STARTED"
+        task.save()
+
+        self.assertEqual(self.counter(), created + 1)
+        self.assertEqual(CeleryTask.objects.get(pk=task.pk).change_seq, created + 1)
+
+    def test_other_saves_take_no_number(self):
+        created = self.counter()
+        task = CeleryTask.objects.get(pk=self.task.pk)
+        task.progress = 50
+        task.save(update_fields=["progress", "progress_message"])
+        task.upid = "UPID:pve1:1"
+        task.save()
+        self.task.progress = 60
+        self.task.save()
+
+        self.assertEqual(self.counter(), created)
+
+
+class PruneTombstonesTests(TestCase):
+    def setUp(self):
+        old = timezone.now() - timedelta(hours=2)
+        for object_id in (1, 2):
+            record_deletions(next_change_seq(), "vm", [object_id])
+        Tombstone.objects.update(deleted_at=old)
+        record_deletions(next_change_seq(), "vm", [3])
+
+    def test_prunes_old_tombstones(self):
+        self.assertEqual(prune_tombstones(3600), 2)
+
+        self.assertEqual(
+            list(Tombstone.objects.values_list("object_id", flat=True)), [3]
+        )
+        self.assertEqual(ChangeCounter.objects.get(pk=1).pruned_through, 2)
+
+    def test_nothing_to_prune(self):
+        self.assertEqual(prune_tombstones(3 * 3600), 0)
+
+        self.assertEqual(Tombstone.objects.count(), 3)
+        self.assertEqual(ChangeCounter.objects.get(pk=1).pruned_through, 0)
+
+    def test_pruned_through_never_goes_back(self):
+        prune_tombstones(3600)
+        Tombstone.objects.all().delete()
+        record_deletions(1, "vm", [4])
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(hours=2))
+        prune_tombstones(3600)
+
+        self.assertEqual(ChangeCounter.objects.get(pk=1).pruned_through, 2)
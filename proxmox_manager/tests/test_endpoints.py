@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from proxmox_manager.endpoints import MAX_QUARANTINE, EndpointSet
+from proxmox_manager.models import Node, ProxmoxCluster
+
+
+@override_settings(PROXMOX_ENDPOINT_FAILOVER=True, PROXMOX_ENDPOINT_QUARANTINE=30)
+class EndpointSetTests(TestCase):
+    def setUp(self):
+        cluster = ProxmoxCluster.objects.create(
+            name="lab", api_url="https://pve.example:8006", username="root@pam"
+        )
+        Node.objects.create(
+            cluster=cluster, name="pve1", status="online", ip_address="10.0.0.1"
+        )
+        Node.objects.create(
+            cluster=cluster, name="pve2", status="online", ip_address="10.0.0.2"
+        )
+        Node.objects.create(
+            cluster=cluster, name="pve3", status="offline", ip_address="10.0.0.3"
+        )
+        self.cluster = cluster
+        self.endpoints = EndpointSet(cluster.pk, "pve.example", 8006)
+        self.now = 1000.0
+        patcher = mock.patch(
+            "proxmox_manager.endpoints.time.monotonic", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unmeasured_hosts_rank_first_with_primary_on_ties(self):
+        self.assertEqual(
+            self.endpoints.candidates(), ["pve.example", "10.0.0.1", "10.0.0.2"]
+        )
+
+    def test_verified_clusters_only_use_the_api_url_host(self):
+        endpoints = EndpointSet(self.cluster.pk, "pve.example", 8006, verify_ssl=True)
+
+        self.assertEqual(endpoints.candidates(), ["pve.example"])
+        self.assertEqual(endpoints.host_for_node("pve1"), "pve.example")
+
+    def test_candidates_are_ordered_by_latency(self):
+        self.endpoints.record_latency("pve.example", 0.3)
+        self.endpoints.record_latency("10.0.0.1", 0.2)
+        self.endpoints.record_latency("10.0.0.2", 0.1)
+
+        self.assertEqual(
+            self.endpoints.candidates(), ["10.0.0.2", "10.0.0.1", "pve.example"]
+        )
+        self.assertEqual(self.endpoints.best(), "10.0.0.2")
+
+    def test_latency_is_a_moving_average(self):
+        self.endpoints.record_latency("10.0.0.1", 0.1)
+        self.endpoints.record_latency("10.0.0.1", 1.1)
+
+        self.assertAlmostEqual(self.endpoints.latency["10.0.0.1"], 0.4)
+
+    def test_down_hosts_come_last_until_their_quarantine_ends(self):
+        self.endpoints.mark_down("pve.example", "timed out")
+        self.now += 10
+        self.endpoints.mark_down("10.0.0.1", "timed out")
+
+        self.assertEqual(
+            self.endpoints.candidates(), ["10.0.0.2", "pve.example", "10.0.0.1"]
+        )
+        self.now += 20
+        self.assertEqual(
+            self.endpoints.candidates(), ["pve.example", "10.0.0.2", "10.0.0.1"]
+        )
+
+    def test_quarantine_doubles_up_to_the_maximum(self):
+        quarantines = []
+        for _ in range(7):
+            self.endpoints.mark_down("10.0.0.1", "timed out")
+            quarantines.append(self.endpoints.down_until["10.0.0.1"] - self.now)
+
+        self.assertEqual(
+            quarantines, [30, 60, 120, 240, 480, MAX_QUARANTINE, MAX_QUARANTINE]
+        )
+
+    def test_success_clears_the_quarantine(self):
+        self.endpoints.mark_down("10.0.0.1", "timed out")
+        self.endpoints.mark_down("10.0.0.1", "timed out")
+        self.endpoints.record_latency("10.0.0.1", 0.1)
+        self.endpoints.mark_down("10.0.0.1", "timed out")
+
+        self.assertEqual(self.endpoints.down_until["10.0.0.1"] - self.now, 30)
+
+    def test_host_for_node_falls_back_when_the_node_is_down(self):
+        self.assertEqual(self.endpoints.host_for_node("pve2"), "10.0.0.2")
+        self.endpoints.mark_down("10.0.0.2", "connection refused")
+
+        self.assertEqual(self.endpoints.host_for_node("pve2"), "pve.example")
+        self.assertEqual(self.endpoints.host_for_node("pve3"), "pve.example")
+
+    @override_settings(PROXMOX_ENDPOINT_FAILOVER=False)
+    def test_failover_disabled_only_uses_the_primary(self):
+        self.assertEqual(self.endpoints.candidates(), ["pve.example"])
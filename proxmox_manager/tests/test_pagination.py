@@ -0,0 +1,63 @@
+from django.test import SimpleTestCase, TestCase
+
+from proxmox_manager.models import Node, ProxmoxCluster, VirtualMachine
+from proxmox_manager.pagination import InvalidCursor, after_filter, keyset_page
+
+
+class AfterFilterTests(SimpleTestCase):
+    def test_single_field(self):
+        self.assertEqual(str(after_filter(["vmid"], [5])), "(AND: ('vmid__gt', 5))")
+
+    def test_row_comparison(self):
+        self.assertEqual(
+            str(after_filter(["node_id", "vmid"], [2, 5])),
+            "(OR: ('node_id__gt', 2), (AND: ('node_id', 2), ('vmid__gt', 5)))",
+        )
+
+
+class KeysetPageTests(TestCase):
+    def setUp(self):
+        cluster = ProxmoxCluster.objects.create(
+            name="lab", api_url="https://pve.example:8006", username="root@pam"
+        )
+        for name in ("pve1", "pve2"):
+            node = Node.objects.create(cluster=cluster, name=name)
+            for vmid in (100, 101, 102):
+                VirtualMachine.objects.create(node=node, vmid=vmid, name=f"vm{vmid}")
+        self.vms = VirtualMachine.objects.all()
+        self.fields = ["node_id", "vmid"]
+
+    def rows(self, page):
+        return [(vm.node.name, vm.vmid) for vm in page.items]
+
+    def test_pages_cover_every_row_once(self):
+        rows = []
+        after = None
+        while True:
+            page = keyset_page(self.vms, self.fields, after, size=4)
+            rows += self.rows(page)
+            if not page.has_next:
+                break
+            after = page.next_cursor
+
+        self.assertEqual(
+            rows,
+            [(n, vmid) for n in ("pve1", "pve2") for vmid in (100, 101, 102)],
+        )
+
+    def test_cursor_is_the_last_row(self):
+        page = keyset_page(self.vms, self.fields, size=4)
+        last = page.items[-1]
+
+        self.assertEqual(page.next_cursor, f"{last.node_id}.{last.vmid}")
+
+    def test_last_full_page_has_no_next(self):
+        page = keyset_page(self.vms, self.fields, size=6)
+
+        self.assertEqual(len(page.items), 6)
+        self.assertFalse(page.has_next)
+
+    def test_invalid_cursors(self):
+        for cursor in ("1", "1.2.3", "a.b"):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                keyset_page(self.vms, self.fields, cursor)
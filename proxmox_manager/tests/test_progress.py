@@ -0,0 +1,39 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from proxmox_manager.progress import ProgressThrottle
+
+
+class ProgressThrottleTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch(
+            "proxmox_manager.progress.time.monotonic", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.throttle = ProgressThrottle()
+
+    def test_small_quick_steps_are_throttled(self):
+        self.assertTrue(self.throttle.should_publish("t1", 10))
+        self.assertFalse(self.throttle.should_publish("t1", 12))
+        self.assertTrue(self.throttle.should_publish("t1", 15))
+
+        self.now += 1
+        self.assertTrue(self.throttle.should_publish("t1", 16))
+
+    def test_completed_tasks_are_forgotten(self):
+        self.throttle.should_publish("t1", 10)
+
+        self.assertTrue(self.throttle.should_publish("t1", 100))
+        self.assertNotIn("t1", self.throttle._last)
+
+    def test_stale_entries_are_swept(self):
+        self.throttle.should_publish("t1", 10)
+        self.now += 0.5
+        self.throttle.should_publish("t2", 10)
+        self.now += 0.6
+        self.throttle.should_publish("t3", 10)
+
+        self.assertEqual(sorted(self.throttle._last), ["t2", "t3"])
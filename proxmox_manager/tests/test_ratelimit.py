@@ -0,0 +1,63 @@
+from django.test import override_settings
+
+from proxmox_manager.ratelimit import (
+    BACKGROUND,
+    INTERACTIVE,
+    acquire_async,
+    api_priority,
+    take_token,
+)
+
+from .utils import RedisTestCase
+
+
+@override_settings(
+    PROXMOX_RATE_LIMIT=1,
+    PROXMOX_RATE_LIMIT_BURST=3,
+    PROXMOX_RATE_LIMIT_INTERACTIVE_RESERVE=1,
+)
+class TokenBucketTests(RedisTestCase):
+    def test_burst_then_wait(self):
+        self.assertEqual([take_token(1, INTERACTIVE) for _ in range(3)], [0, 0, 0])
+
+        wait = take_token(1, INTERACTIVE)
+        self.assertGreater(wait, 0.9)
+        self.assertLessEqual(wait, 1)
+
+    def test_background_calls_leave_the_reserve(self):
+        self.assertEqual([take_token(1, BACKGROUND) for _ in range(2)], [0, 0])
+        self.assertGreater(take_token(1, BACKGROUND), 0)
+
+        self.assertEqual(take_token(1, INTERACTIVE), 0)
+        self.assertGreater(take_token(1, INTERACTIVE), 0)
+
+    def test_priority_defaults_to_the_context(self):
+        with api_priority(BACKGROUND):
+            self.assertEqual([take_token(1) for _ in range(2)], [0, 0])
+            self.assertGreater(take_token(1), 0)
+        self.assertEqual(take_token(1), 0)
+
+    def test_buckets_are_per_cluster(self):
+        for _ in range(3):
+            take_token(1, INTERACTIVE)
+
+        self.assertEqual(take_token(2, INTERACTIVE), 0)
+
+    @override_settings(PROXMOX_RATE_LIMIT_INTERACTIVE_RESERVE=5)
+    def test_reserve_leaves_background_calls_one_token(self):
+        self.assertEqual(take_token(1, BACKGROUND), 0)
+        wait = take_token(1, BACKGROUND)
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 1)
+
+    @override_settings(PROXMOX_RATE_LIMIT=0)
+    def test_zero_rate_disables_the_limit(self):
+        self.assertEqual([take_token(1, INTERACTIVE) for _ in range(10)], [0] * 10)
+
+    @override_settings(PROXMOX_RATE_LIMIT=50, PROXMOX_RATE_LIMIT_BURST=1)
+    async def test_acquire_async_waits_for_a_token(self):
+        self.assertEqual(await acquire_async(1, INTERACTIVE), 0)
+
+        waited = await acquire_async(1, INTERACTIVE)
+        self.assertGreater(waited, 0)
+        self.assertLess(waited, 0.1)
@@ -0,0 +1,44 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from proxmox_manager.models import Node, ProxmoxCluster, VirtualMachine
+from proxmox_manager.search import PrefixIndexCache, quick_search, substring_score
+
+
+class SubstringScoreTests(SimpleTestCase):
+    def test_prefix_scores_above_substring(self):
+        self.assertEqual(substring_score("pve", "PVE1"), 0.75)
+        self.assertEqual(substring_score("pve", "lab-pve1"), 0.1875)
+        self.assertEqual(substring_score("pve", "node"), 0.0)
+
+
+class QuickSearchTests(TestCase):
+    def setUp(self):
+        cluster = ProxmoxCluster.objects.create(
+            name="Lab", api_url="https://pve.example:8006", username="root@pam"
+        )
+        node = Node.objects.create(cluster=cluster, name="PVE1")
+        VirtualMachine.objects.create(node=node, vmid=100, name="Web")
+        patcher = mock.patch("proxmox_manager.search.prefix_index", PrefixIndexCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def labels(self, query):
+        return [hit["label"] for hit in quick_search(query)]
+
+    def test_mixed_case_queries(self):
+        self.assertEqual(self.labels("pve1"), ["PVE1"])
+        self.assertEqual(self.labels("PvE1"), ["PVE1"])
+        self.assertEqual(self.labels("WEB"), ["Web (100)"])
+
+    def test_postgres_hits_are_scored_with_the_lowercased_query(self):
+        hits = [{"type": "node", "id": 1, "label": "PVE1", "score": 0.75}]
+        with mock.patch(
+            "proxmox_manager.search.connection", vendor="postgresql"
+        ), mock.patch(
+            "proxmox_manager.search.search_postgres", return_value=hits
+        ) as search_postgres:
+            quick_search("  PVE ")
+
+        search_postgres.assert_called_once_with("pve", 10)
@@ -0,0 +1,89 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from proxmox_manager.models import (
+    ClusterSummary,
+    Node,
+    NodeSummary,
+    ProxmoxCluster,
+    VirtualMachine,
+)
+from proxmox_manager.sync import persist_nodes, refresh_summaries
+
+
+class RefreshSummariesTests(TestCase):
+    def setUp(self):
+        self.cluster = ProxmoxCluster.objects.create(
+            name="lab", api_url="https://pve.example:8006", username="root@pam"
+        )
+        self.pve1 = Node.objects.create(
+            cluster=self.cluster, name="pve1", status="online", ram_total=8 << 30
+        )
+        self.pve2 = Node.objects.create(
+            cluster=self.cluster, name="pve2", status="offline", ram_total=8 << 30
+        )
+        VirtualMachine.objects.create(
+            node=self.pve1, vmid=100, status="running", cpu_cores=2, ram_mb=2048
+        )
+        VirtualMachine.objects.create(
+            node=self.pve1, vmid=101, status="stopped", cpu_cores=1, ram_mb=512
+        )
+
+    def test_cluster_and_node_totals(self):
+        summary = refresh_summaries(self.cluster)
+
+        self.assertEqual(
+            (summary.node_count, summary.online_nodes, summary.ram_total),
+            (2, 1, 16 << 30),
+        )
+        self.assertEqual(
+            (summary.vm_count, summary.running_vms, summary.stopped_vms), (2, 1, 1)
+        )
+        node = NodeSummary.objects.get(node=self.pve1)
+        self.assertEqual((node.vm_count, node.cpu_cores, node.ram_mb), (2, 3, 2560))
+        self.assertEqual(NodeSummary.objects.get(node=self.pve2).vm_count, 0)
+
+    def test_refresh_updates_the_existing_rows(self):
+        refresh_summaries(self.cluster)
+        VirtualMachine.objects.filter(vmid=101).update(node=self.pve2)
+        refresh_summaries(self.cluster)
+
+        self.assertEqual(ClusterSummary.objects.get(cluster=self.cluster).vm_count, 2)
+        self.assertEqual(NodeSummary.objects.get(node=self.pve1).vm_count, 1)
+        self.assertEqual(NodeSummary.objects.get(node=self.pve2).vm_count, 1)
+
+    def cluster_event(self, refresh):
+        with mock.patch("proxmox_manager.live.publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                refresh()
+        (event, data), _ = publish.call_args
+        self.assertEqual(event, "cluster")
+        return data
+
+    def test_event_carries_only_changed_nodes(self):
+        refresh_summaries(self.cluster)
+        data = self.cluster_event(
+            lambda: persist_nodes(
+                self.cluster,
+                {
+                    "pve1": {"status": "online", "ram_total": 8 << 30},
+                    "pve2": {"status": "online", "ram_total": 8 << 30},
+                },
+            )
+        )
+
+        self.assertEqual(data["summary"]["online_nodes"], 2)
+        self.assertEqual([node["name"] for node in data["nodes"]], ["pve2"])
+
+    def test_event_carries_nodes_whose_guest_counts_changed(self):
+        refresh_summaries(self.cluster)
+        VirtualMachine.objects.filter(vmid=101).update(node=self.pve2)
+        data = self.cluster_event(lambda: refresh_summaries(self.cluster))
+
+        self.assertEqual(
+            sorted(node["name"] for node in data["nodes"]), ["pve1", "pve2"]
+        )
+
+        data = self.cluster_event(lambda: refresh_summaries(self.cluster))
+        self.assertEqual(data["nodes"], [])
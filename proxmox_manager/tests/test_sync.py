@@ -0,0 +1,110 @@
+from django.test import TestCase
+
+from proxmox_manager.models import ProxmoxCluster, VirtualMachine
+from proxmox_manager.tasks import sync_cluster_resources
+
+
+class FakeResource:
+    """proxmoxer-style resource answering ``get`` from ``routes`` by path"""
+
+    def __init__(self, routes, calls, path=""):
+        self.routes = routes
+        self.calls = calls
+        self.path = path
+
+    def __getattr__(self, name):
+        return FakeResource(self.routes, self.calls, f"{self.path}/{name}")
+
+    def __call__(self, resource_id):
+        return FakeResource(self.routes, self.calls, f"{self.path}/{resource_id}")
+
+    def get(self, **params):
+        self.calls.append(self.path)
+        return self.routes[self.path]
+
+
+class SyncClusterResourcesTests(TestCase):
+    def setUp(self):
+        self.cluster = ProxmoxCluster.objects.create(
+            name="lab", api_url="https://pve.example:8006", username="root@pam"
+        )
+        self.routes = {
+            "/cluster/resources": [
+                {"type": "node", "node": "pve1", "status": "online", "maxmem": 8 << 30},
+                {
+                    "type": "qemu",
+                    "node": "pve1",
+                    "vmid": 100,
+                    "name": "web",
+                    "status": "running",
+                    "maxcpu": 4,
+                    "maxmem": 2 << 30,
+                    "maxdisk": 10 << 30,
+                },
+                {
+                    "type": "lxc",
+                    "node": "pve1",
+                    "vmid": 200,
+                    "name": "dns",
+                    "status": "running",
+                    "maxcpu": 1,
+                    "maxmem": 512 << 20,
+                    "maxdisk": 8 << 30,
+                },
+            ],
+            "/nodes/pve1/qemu/100/config": {
+                "sockets": 2,
+                "cores": 2,
+                "memory": 2048,
+                "scsi0": "local-lvm:vm-100-disk-0,size=10G",
+                "scsi1": "local-lvm:vm-100-disk-1,size=20G",
+                "ipconfig0": "ip=10.0.0.10/24,gw=10.0.0.1",
+                "digest": "a",
+            },
+            "/nodes/pve1/lxc/200/config": {
+                "cores": 1,
+                "memory": 512,
+                "rootfs": "local-lvm:subvol-200-disk-0,size=8G",
+                "net0": "name=eth0,bridge=vmbr0,ip=10.0.0.20/24",
+                "digest": "b",
+            },
+        }
+        self.calls = []
+
+    def sync(self):
+        self.calls.clear()
+        sync_cluster_resources(self.cluster, FakeResource(self.routes, self.calls))
+        return {vm.vmid: vm for vm in VirtualMachine.objects.all()}
+
+    def test_new_guests_get_config_fields(self):
+        vms = self.sync()
+
+        self.assertEqual(
+            (vms[100].cpu_cores, vms[100].disk_gb, vms[100].ip_addresses),
+            (2, 30.0, "10.0.0.10"),
+        )
+        self.assertEqual(
+            (vms[200].cpu_cores, vms[200].disk_gb, vms[200].ip_addresses),
+            (1, 8.0, "10.0.0.20"),
+        )
+
+    def test_unchanged_listing_keeps_config_fields(self):
+        self.sync()
+        vms = self.sync()
+
+        self.assertEqual(self.calls, ["/cluster/resources"])
+        self.assertEqual(
+            (vms[100].cpu_cores, vms[100].disk_gb, vms[100].ip_addresses),
+            (2, 30.0, "10.0.0.10"),
+        )
+
+    def test_changed_listing_refetches_the_config(self):
+        self.sync()
+        self.routes["/cluster/resources"][1]["maxmem"] = 4 << 30
+        self.routes["/nodes/pve1/qemu/100/config"].update(
+            memory=4096, ipconfig0="ip=10.0.0.11/24", digest="c"
+        )
+        vms = self.sync()
+
+        self.assertIn("/nodes/pve1/qemu/100/config", self.calls)
+        self.assertEqual((vms[100].ram_mb, vms[100].ip_addresses), (4096, "10.0.0.11"))
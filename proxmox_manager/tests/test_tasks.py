@@ -0,0 +1,32 @@
+import time
+from unittest import mock
+
+from django.test import TestCase
+
+from proxmox_manager.models import Node, ProxmoxCluster, VirtualMachine
+from proxmox_manager.tasks import reconcile_cluster_sync, sync_cluster_nodes
+
+from .test_sync import FakeResource
+
+
+class EmptyNodeListingTests(TestCase):
+    def setUp(self):
+        self.cluster = ProxmoxCluster.objects.create(
+            name="lab", api_url="https://pve.example:8006", username="root@pam"
+        )
+        node = Node.objects.create(cluster=self.cluster, name="pve1")
+        VirtualMachine.objects.create(node=node, vmid=100, name="web")
+
+    def test_sync_starts_no_chord_and_keeps_inventory(self):
+        with mock.patch("proxmox_manager.tasks.chord") as chord:
+            sync_cluster_nodes(self.cluster, FakeResource({"/nodes": []}, []))
+
+        chord.assert_not_called()
+        self.assertEqual(Node.objects.count(), 1)
+        self.assertEqual(VirtualMachine.objects.count(), 1)
+
+    def test_reconcile_keeps_guests(self):
+        reconcile_cluster_sync([], self.cluster.id, [], None, time.time())
+
+        self.assertEqual(Node.objects.count(), 1)
+        self.assertEqual(VirtualMachine.objects.count(), 1)
@@ -0,0 +1,75 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from proxmox_manager.models import Node, ProxmoxCluster, VirtualMachine
+from proxmox_manager.tasks import sync_cluster_resources
+
+from .test_sync import FakeResource
+from .utils import RedisTestCase
+
+
+# The manifest storage needs collectstatic
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class VMListTests(TestCase):
+    def setUp(self):
+        cluster = ProxmoxCluster.objects.create(
+            name="lab", api_url="https://pve.example:8006", username="root@pam"
+        )
+        node = Node.objects.create(cluster=cluster, name="pve1")
+        VirtualMachine.objects.create(node=node, vmid=101, name="web")
+        VirtualMachine.objects.create(node=node, vmid=102, name="db101")
+        VirtualMachine.objects.create(node=node, vmid=103, name="cache")
+        user = User.objects.create_user("admin", password="x")
+        self.client.force_login(user)
+
+    def search(self, query):
+        response = self.client.get(reverse("vm_list"), {"search": query})
+        self.assertEqual(response.status_code, 200)
+        return sorted(vm.vmid for vm in response.context["vms"])
+
+    def test_numeric_search_matches_ids_and_names(self):
+        self.assertEqual(self.search("101"), [101, 102])
+
+    def test_text_search_matches_names(self):
+        self.assertEqual(self.search("CACHE"), [103])
+
+
+class DashboardStatsETagTests(RedisTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cluster = ProxmoxCluster.objects.create(
+            name="lab", api_url="https://pve.example:8006", username="root@pam"
+        )
+        self.routes = {
+            "/cluster/resources": [
+                {"type": "node", "node": "pve1", "status": "online", "cpu": 0.1},
+                {"type": "qemu", "node": "pve1", "vmid": 100, "status": "running"},
+            ],
+            "/nodes/pve1/qemu/100/config": {"cores": 1, "digest": "a"},
+        }
+        self.client.force_login(User.objects.create_user("admin", password="x"))
+
+    def sync(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            sync_cluster_resources(self.cluster, FakeResource(self.routes, []))
+
+    def test_unchanged_sync_keeps_the_etag(self):
+        self.sync()
+        url = reverse("api_dashboard_stats")
+        etag = self.client.get(url)["ETag"]
+        self.sync()
+
+        self.assertEqual(self.client.get(url)["ETag"], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_changed_node_changes_the_etag(self):
+        self.sync()
+        url = reverse("api_dashboard_stats")
+        etag = self.client.get(url)["ETag"]
+        self.routes["/cluster/resources"][0]["cpu"] = 0.5
+        self.sync()
+
+        self.assertNotEqual(self.client.get(url)["ETag"], etag)
@@ -0,0 +1,31 @@
+from unittest import mock
+from urllib.parse import urlsplit
+
+import redis
+from django.conf import settings
+from django.test import TestCase
+
+# Database of the REDIS_URL server the tests use, flushed before each test
+TEST_REDIS_DB = 15
+
+
+def redis_test_url():
+    return urlsplit(settings.REDIS_URL)._replace(path=f"/{TEST_REDIS_DB}").geturl()
+
+
+class RedisTestCase(TestCase):
+    """
+    Test case whose ``get_redis()`` is an empty database of the REDIS_URL
+    server; skipped when that server is unreachable.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.redis = redis.Redis.from_url(redis_test_url(), decode_responses=True)
+        try:
+            self.redis.flushdb()
+        except redis.ConnectionError:
+            self.skipTest(f"Redis is not reachable at {settings.REDIS_URL}")
+        patcher = mock.patch("proxmox_manager.redis_client._client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
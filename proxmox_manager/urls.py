@@ -34,12 +34,15 @@ urlpatterns = [
         views.get_cluster_stats,
         name="api_cluster_stats",
     ),
+    path("api/search/", views.get_search_results, name="api_search"),
+    path("api/events/", views.live_events, name="api_live_events"),
     # Task management endpoints
     path("tasks/", views.task_list, name="task_list"),
     path(
         "api/tasks/<str:task_id>/status/", views.get_task_status, name="get_task_status"
     ),
     path("api/tasks/running/", views.get_running_tasks, name="get_running_tasks"),
+    path("api/metrics/queues/", views.get_queue_metrics, name="get_queue_metrics"),
     path("api/tasks/<str:task_id>/retry/", views.retry_task, name="retry_task"),
     path("api/tasks/<str:task_id>/cancel/", views.cancel_task, name="cancel_task"),
 ]
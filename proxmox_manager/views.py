@@ -1,51 +1,83 @@
+import functools
+import hashlib
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.core.paginator import Paginator
-from django.db.models import Avg, Q
-from django.http import JsonResponse
-from django.shortcuts import get_object_or_404, redirect, render
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import F, Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.utils import timezone
+from django.views.decorators.http import condition
 
+from .async_client import client_for
+from .breaker import CircuitBreaker, breaker_statuses
+from .changes import change_window, changes_since
+from .connections import get_endpoints
 from .forms import MigrationForm, SnapshotForm, VMSearchForm
-from .models import AuditLog, CeleryTask, Node, ProxmoxCluster, VirtualMachine
+from .live import event_stream
+from .locks import cluster_sync_lock
+from .models import (
+    AuditLog,
+    CeleryTask,
+    ClusterSyncSchedule,
+    Node,
+    ProxmoxCluster,
+    VirtualMachine,
+)
+from .pagination import InvalidCursor, keyset_page
+from .priorities import PRIORITY_HIGH
+from .progress import read_progress, tasks_version
+from .queue_metrics import queue_latency_stats
+from .search import DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT
+from .search import quick_search
+from .stats import (
+    cached_count,
+    cluster_version,
+    inventory_generation,
+    inventory_stats,
+)
 from .tasks import (
     create_snapshot,
-    get_proxmox_connection,
+    enqueue_cluster_sync,
     migrate_vm_task,
-    sync_cluster_data,
     vm_power_action,
 )
+from .vnc_relay import console_token
 
 
-@login_required
-def dashboard(request):
-    clusters = ProxmoxCluster.objects.filter(is_active=True)
-    nodes = Node.objects.all()
-    vms = VirtualMachine.objects.all()
-    recent_logs = AuditLog.objects.select_related("user", "vm", "cluster")[:10]
+def async_login_required(view):
+    """``login_required`` for async views, which Django 5.0's only wraps as sync"""
 
-    total_vms = vms.count()
-    running_vms = vms.filter(status="running").count()
-    stopped_vms = vms.filter(status="stopped").count()
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
 
-    total_nodes = nodes.count()
-    online_nodes = nodes.filter(status="online").count()
+    return wrapper
 
-    avg_cpu = nodes.aggregate(Avg("cpu_usage"))["cpu_usage__avg"] or 0
-    avg_ram = nodes.aggregate(Avg("ram_usage"))["ram_usage__avg"] or 0
+
+@login_required
+def dashboard(request):
+    clusters = ProxmoxCluster.objects.filter(is_active=True).select_related("summary")
+    nodes = Node.objects.select_related("cluster")
+    vms = VirtualMachine.objects.select_related("node", "node__cluster")
+    recent_logs = AuditLog.objects.select_related("user", "vm", "cluster")[:10]
 
     context = {
         "clusters": clusters,
         "nodes": nodes,
         "vms": vms,
-        "total_vms": total_vms,
-        "running_vms": running_vms,
-        "stopped_vms": stopped_vms,
-        "total_nodes": total_nodes,
-        "online_nodes": online_nodes,
-        "avg_cpu": round(avg_cpu, 2),
-        "avg_ram": round(avg_ram, 2),
         "recent_logs": recent_logs,
+        # Totals come from the sidebar_stats context processor
     }
 
     return render(request, "proxmox_manager/dashboard.html", context)
@@ -53,9 +85,17 @@ def dashboard(request):
 
 @login_required
 def vm_list(request):
-    vms = VirtualMachine.objects.select_related("node", "node__cluster").all()
+    """
+    Guests ordered by (node, vmid), one keyset page at a time.
+
+    ``?after=<cursor>`` continues after the last guest of the previous page;
+    the page's "Load more" script requests it with XMLHttpRequest and gets the
+    rendered rows and the next page's URL as JSON.
+    """
+    vms = VirtualMachine.objects.select_related("node", "node__cluster")
 
     form = VMSearchForm(request.GET or None)
+    filters = {}
 
     if form.is_valid():
         search = form.cleaned_data.get("search")
@@ -64,34 +104,63 @@ def vm_list(request):
         vm_type = form.cleaned_data.get("vm_type")
 
         if search:
-            vms = vms.filter(Q(name__icontains=search) | Q(vmid__icontains=search))
+            filters["search"] = search
+            # Guest IDs are matched exactly so the vmid index can be used;
+            # names may contain digits too
+            condition = Q(name__icontains=search)
+            if search.isdigit():
+                condition |= Q(vmid=int(search))
+            vms = vms.filter(condition)
 
         if cluster:
+            filters["cluster"] = cluster.id
             vms = vms.filter(node__cluster=cluster)
 
         if status:
+            filters["status"] = status
             vms = vms.filter(status=status)
 
         if vm_type:
+            filters["vm_type"] = vm_type
             vms = vms.filter(vm_type=vm_type)
 
-    # Add stats for right sidebar
-    clusters = ProxmoxCluster.objects.filter(is_active=True)
-    nodes = Node.objects.all()
-    all_vms = VirtualMachine.objects.all()
+    try:
+        page_size = int(request.GET.get("page_size", settings.VM_LIST_PAGE_SIZE))
+    except ValueError:
+        page_size = settings.VM_LIST_PAGE_SIZE
+    page_size = min(max(page_size, 1), settings.VM_LIST_MAX_PAGE_SIZE)
+
+    is_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
+    try:
+        page = keyset_page(
+            vms, ["node_id", "vmid"], request.GET.get("after"), page_size
+        )
+    except InvalidCursor as e:
+        if is_ajax:
+            return JsonResponse({"error": str(e)}, status=400)
+        page = keyset_page(vms, ["node_id", "vmid"], size=page_size)
+
+    next_url = None
+    if page.has_next:
+        query = request.GET.copy()
+        query["after"] = page.next_cursor
+        next_url = f"{request.path}?{query.urlencode()}"
+
+    if is_ajax:
+        return JsonResponse(
+            {
+                "html": render_to_string(
+                    "proxmox_manager/vm_list_rows.html", {"vms": page.items}, request
+                ),
+                "next_url": next_url,
+            }
+        )
 
     context = {
-        "vms": vms,
+        "vms": page.items,
+        "vm_count": cached_count("vm_list", filters, vms),
+        "next_url": next_url,
         "form": form,
-        # Stats for right sidebar
-        "clusters": clusters,
-        "nodes": nodes,
-        "total_vms": all_vms.count(),
-        "running_vms": all_vms.filter(status="running").count(),
-        "total_nodes": nodes.count(),
-        "online_nodes": nodes.filter(status="online").count(),
-        "avg_cpu": round(nodes.aggregate(Avg("cpu_usage"))["cpu_usage__avg"] or 0, 2),
-        "avg_ram": round(nodes.aggregate(Avg("ram_usage"))["ram_usage__avg"] or 0, 2),
     }
 
     return render(request, "proxmox_manager/vm_list.html", context)
@@ -105,24 +174,9 @@ def vm_detail(request, vm_id):
         cluster=vm.node.cluster, status="online"
     ).exclude(id=vm.node.id)
 
-    # Add stats for right sidebar
-    clusters = ProxmoxCluster.objects.filter(is_active=True)
-    nodes = Node.objects.all()
-    vms = VirtualMachine.objects.all()
-
     context = {
         "vm": vm,
         "available_nodes": available_nodes,
-        # Stats for right sidebar
-        "clusters": clusters,
-        "nodes": nodes,
-        "vms": vms,
-        "total_vms": vms.count(),
-        "running_vms": vms.filter(status="running").count(),
-        "total_nodes": nodes.count(),
-        "online_nodes": nodes.filter(status="online").count(),
-        "avg_cpu": round(nodes.aggregate(Avg("cpu_usage"))["cpu_usage__avg"] or 0, 2),
-        "avg_ram": round(nodes.aggregate(Avg("ram_usage"))["ram_usage__avg"] or 0, 2),
     }
 
     return render(request, "proxmox_manager/vm_detail.html", context)
@@ -193,40 +247,22 @@ def create_vm_snapshot(request, vm_id):
 
 @login_required
 def cluster_list(request):
-    clusters = ProxmoxCluster.objects.prefetch_related("nodes").all()
+    clusters = ProxmoxCluster.objects.select_related("summary")
+
+    breakers = breaker_statuses(cluster.id for cluster in clusters)
 
     cluster_stats = []
     for cluster in clusters:
-        nodes = cluster.nodes.all()
-        vms = VirtualMachine.objects.filter(node__cluster=cluster)
-
         cluster_stats.append(
             {
                 "cluster": cluster,
-                "node_count": nodes.count(),
-                "vm_count": vms.count(),
-                "running_vms": vms.filter(status="running").count(),
-                "online_nodes": nodes.filter(status="online").count(),
+                **summary_counts(cluster),
+                "breaker": breakers[cluster.id],
             }
         )
 
-    # Add stats for right sidebar
-    all_clusters = ProxmoxCluster.objects.filter(is_active=True)
-    nodes = Node.objects.all()
-    vms = VirtualMachine.objects.all()
-
     context = {
         "cluster_stats": cluster_stats,
-        # Stats for right sidebar
-        "clusters": all_clusters,
-        "nodes": nodes,
-        "vms": vms,
-        "total_vms": vms.count(),
-        "running_vms": vms.filter(status="running").count(),
-        "total_nodes": nodes.count(),
-        "online_nodes": nodes.filter(status="online").count(),
-        "avg_cpu": round(nodes.aggregate(Avg("cpu_usage"))["cpu_usage__avg"] or 0, 2),
-        "avg_ram": round(nodes.aggregate(Avg("ram_usage"))["ram_usage__avg"] or 0, 2),
     }
 
     return render(request, "proxmox_manager/cluster_list.html", context)
@@ -235,13 +271,16 @@ def cluster_list(request):
 @login_required
 def cluster_detail(request, cluster_id):
     cluster = get_object_or_404(ProxmoxCluster, id=cluster_id)
-    nodes = cluster.nodes.all()
+    nodes = cluster.nodes.select_related("summary")
     vms = VirtualMachine.objects.filter(node__cluster=cluster)
 
     context = {
         "cluster": cluster,
         "nodes": nodes,
         "vms": vms,
+        "sync_schedule": ClusterSyncSchedule.objects.filter(cluster=cluster).first(),
+        "breaker": CircuitBreaker(cluster.id).status(),
+        "endpoints": get_endpoints(cluster).snapshot(),
     }
 
     return render(request, "proxmox_manager/cluster_detail.html", context)
@@ -251,21 +290,25 @@ def cluster_detail(request, cluster_id):
 def sync_cluster(request, cluster_id):
     cluster = get_object_or_404(ProxmoxCluster, id=cluster_id)
 
+    task_id, started = enqueue_cluster_sync(cluster.id, priority=PRIORITY_HIGH)
+    if started:
+        message = f"Sync initiated for cluster {cluster.name}"
+    else:
+        message = f"Sync already running for cluster {cluster.name}"
+
     # If AJAX request, return JSON
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        task = sync_cluster_data.delay(cluster.id)
         return JsonResponse(
             {
-                "status": "started",
-                "message": f"Sync initiated for cluster {cluster.name}",
-                "task_id": task.id,
+                "status": "started" if started else "running",
+                "message": message,
+                "task_id": task_id,
                 "cluster_id": cluster.id,
             }
         )
 
     # Regular request - redirect with message
-    sync_cluster_data.delay(cluster.id)
-    messages.success(request, f"Sync initiated for cluster {cluster.name}")
+    messages.success(request, message)
     return redirect("dashboard")
 
 
@@ -273,15 +316,20 @@ def sync_cluster(request, cluster_id):
 def sync_all_clusters(request):
     clusters = ProxmoxCluster.objects.filter(is_active=True)
 
+    task_ids = []
+    for cluster in clusters:
+        task_id, started = enqueue_cluster_sync(cluster.id, priority=PRIORITY_HIGH)
+        task_ids.append(
+            {
+                "cluster_id": cluster.id,
+                "task_id": task_id,
+                "name": cluster.name,
+                "already_running": not started,
+            }
+        )
+
     # If AJAX request, return JSON
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        task_ids = []
-        for cluster in clusters:
-            task = sync_cluster_data.delay(cluster.id)
-            task_ids.append(
-                {"cluster_id": cluster.id, "task_id": task.id, "name": cluster.name}
-            )
-
         return JsonResponse(
             {
                 "status": "started",
@@ -291,18 +339,89 @@ def sync_all_clusters(request):
         )
 
     # Regular request - redirect with message
-    for cluster in clusters:
-        sync_cluster_data.delay(cluster.id)
     messages.success(request, "Sync initiated for all clusters")
     return redirect("dashboard")
 
 
+def etag(*parts):
+    """ETag for a response determined by ``parts``"""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+
+def delta_etag_parts(request):
+    """
+    ETag parts of a delta (``?since=``) response: the change sequence and the
+    tasks version, which change with every row it could list
+    """
+    since = request.GET.get("since")
+    if since is None:
+        return ()
+    return (since, change_window()[0], tasks_version())
+
+
+def parse_since(request):
+    """The ``since`` parameter as an int, ``None`` when absent"""
+    since = request.GET.get("since")
+    return None if since is None else int(since)
+
+
+def cluster_stats_etag(request, cluster_id):
+    """
+    Changes with every sync write to the cluster, cluster edit, schedule
+    update or breaker transition; ``None`` (no ETag) when Redis is unreachable.
+    """
+    version = cluster_version(cluster_id)
+    generation = inventory_generation()
+    if version is None or generation is None:
+        return None
+    breaker = CircuitBreaker(cluster_id).status()
+    return etag(
+        version,
+        generation,
+        ClusterSyncSchedule.objects.filter(cluster_id=cluster_id)
+        .values_list("next_sync_at", "last_sync_at", "interval")
+        .first(),
+        breaker["state"],
+        breaker["failures"],
+        breaker["last_error_at"],
+        *delta_etag_parts(request),
+    )
+
+
 @login_required
+@condition(etag_func=cluster_stats_etag)
 def get_cluster_stats(request, cluster_id):
-    """API endpoint to get cluster stats without page reload"""
-    cluster = get_object_or_404(ProxmoxCluster, id=cluster_id)
-    nodes = cluster.nodes.all()
-    vms = VirtualMachine.objects.filter(node__cluster=cluster)
+    """
+    API endpoint to get cluster stats without page reload.
+
+    With ``?since=<seq>`` (the ``seq`` of a previous response) only the nodes,
+    guests and tasks changed after it and the ids of those deleted are listed
+    (see ``changes.changes_since``).
+    """
+    cluster = get_object_or_404(
+        ProxmoxCluster.objects.select_related("summary"), id=cluster_id
+    )
+    try:
+        since = parse_since(request)
+    except ValueError:
+        return JsonResponse({"error": "since must be an integer"}, status=400)
+
+    data = {
+        "cluster": {
+            "id": cluster.id,
+            "name": cluster.name,
+            "is_active": cluster.is_active,
+        },
+        "stats": summary_counts(cluster),
+        "sync_schedule": sync_schedule_data(cluster),
+        "breaker": breaker_data(cluster),
+    }
+    if since is not None:
+        return JsonResponse({**data, **changes_since(since, cluster)})
+
+    # Read before the rows, so changes made meanwhile are listed again
+    seq, _ = change_window()
+    nodes = cluster.nodes.select_related("summary")
 
     nodes_data = []
     for node in nodes:
@@ -314,99 +433,149 @@ def get_cluster_stats(request, cluster_id):
                 "cpu_usage": float(node.cpu_usage),
                 "ram_usage": float(node.ram_usage),
                 "disk_usage": float(node.disk_usage),
-                "vm_count": node.virtual_machines.count(),
+                "vm_count": node.summary.vm_count if hasattr(node, "summary") else 0,
             }
         )
 
-    vms_data = []
-    for vm in vms[:20]:  # Limit to 20 VMs for performance
-        vms_data.append(
-            {
-                "id": vm.id,
-                "name": vm.name,
-                "vmid": vm.vmid,
-                "status": vm.status,
-                "cpu_usage": float(vm.cpu_usage) if vm.cpu_usage else 0,
-                "ram_mb": vm.ram_mb,
-                "node_name": vm.node.name,
-            }
+    vms_data = list(
+        VirtualMachine.objects.filter(node__cluster=cluster)
+        .order_by("node_id", "vmid")
+        .values(
+            "id",
+            "name",
+            "vmid",
+            "status",
+            "cpu_usage",
+            "ram_mb",
+            node_name=F("node__name"),
         )
-
-    return JsonResponse(
-        {
-            "cluster": {
-                "id": cluster.id,
-                "name": cluster.name,
-                "is_active": cluster.is_active,
-            },
-            "stats": {
-                "node_count": nodes.count(),
-                "vm_count": vms.count(),
-                "running_vms": vms.filter(status="running").count(),
-                "online_nodes": nodes.filter(status="online").count(),
-            },
-            "nodes": nodes_data,
-            "vms": vms_data,
-        }
     )
 
+    return JsonResponse({**data, "seq": seq, "nodes": nodes_data, "vms": vms_data})
+
+
+def summary_counts(cluster):
+    """Node and guest counts of ``cluster`` from its ``ClusterSummary``"""
+    summary = getattr(cluster, "summary", None)
+    return {
+        field: getattr(summary, field, 0)
+        for field in ("node_count", "online_nodes", "vm_count", "running_vms")
+    }
+
+
+def sync_schedule_data(cluster):
+    schedule = ClusterSyncSchedule.objects.filter(cluster=cluster).first()
+    if schedule is None:
+        return None
+    return {
+        "interval": schedule.interval,
+        "next_sync_at": schedule.next_sync_at.isoformat(),
+        "last_sync_at": (
+            schedule.last_sync_at.isoformat() if schedule.last_sync_at else None
+        ),
+        "last_duration": schedule.last_duration,
+        "last_churn": schedule.last_churn,
+    }
+
+
+def breaker_data(cluster):
+    status = CircuitBreaker(cluster.id).status()
+    return {
+        "state": status["state"],
+        "failures": status["failures"],
+        "last_error": status["last_error"],
+        "last_error_at": (
+            status["last_error_at"].isoformat() if status["last_error_at"] else None
+        ),
+        "retry_at": status["retry_at"].isoformat() if status["retry_at"] else None,
+    }
+
+
+def dashboard_stats_etag(request):
+    generation = inventory_generation()
+    if generation is None:
+        return None
+    return etag(generation, *delta_etag_parts(request))
+
 
 @login_required
+@condition(etag_func=dashboard_stats_etag)
 def get_dashboard_stats(request):
-    """API endpoint to get dashboard stats without page reload"""
-    clusters = ProxmoxCluster.objects.filter(is_active=True)
-    nodes = Node.objects.all()
-    vms = VirtualMachine.objects.all()
+    """
+    API endpoint to get dashboard stats without page reload.
+
+    With ``?since=<seq>`` the nodes, guests and tasks of every cluster changed
+    after it, and the ids of those deleted, are listed too (see
+    ``changes.changes_since``); rows of clusters missing from ``clusters``
+    are gone.
+    """
+    try:
+        since = parse_since(request)
+    except ValueError:
+        return JsonResponse({"error": "since must be an integer"}, status=400)
+
+    if since is not None:
+        changes = changes_since(since)
+    else:
+        changes = {"seq": change_window()[0]}
+    clusters = ProxmoxCluster.objects.filter(is_active=True).select_related("summary")
 
     return JsonResponse(
         {
-            "stats": {
-                "total_vms": vms.count(),
-                "running_vms": vms.filter(status="running").count(),
-                "stopped_vms": vms.filter(status="stopped").count(),
-                "total_nodes": nodes.count(),
-                "online_nodes": nodes.filter(status="online").count(),
-                "avg_cpu": round(
-                    nodes.aggregate(Avg("cpu_usage"))["cpu_usage__avg"] or 0, 2
-                ),
-                "avg_ram": round(
-                    nodes.aggregate(Avg("ram_usage"))["ram_usage__avg"] or 0, 2
-                ),
-            },
+            "stats": inventory_stats(),
             "clusters": [
                 {
                     "id": c.id,
                     "name": c.name,
-                    "node_count": c.nodes.count(),
-                    "vm_count": VirtualMachine.objects.filter(node__cluster=c).count(),
+                    "node_count": summary_counts(c)["node_count"],
+                    "vm_count": summary_counts(c)["vm_count"],
                 }
                 for c in clusters
             ],
+            **changes,
         }
     )
 
 
+@login_required
+def get_search_results(request):
+    """API endpoint behind the quick search box: ``?q=<query>&limit=<n>``"""
+    try:
+        limit = int(request.GET.get("limit", DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        limit = DEFAULT_SEARCH_LIMIT
+    query = request.GET.get("q", "")
+
+    return JsonResponse({"query": query, "results": quick_search(query, limit)})
+
+
+async def live_events(request):
+    """
+    Server-Sent Events stream of live updates (see live.py).
+
+    Only served under ASGI: a WSGI worker would be tied up for as long as the
+    browser stays connected, so it answers 204, which makes ``EventSource``
+    give up and the page keep polling.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Keep nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 @login_required
 def audit_log(request):
     logs = AuditLog.objects.select_related("user", "vm", "cluster").all()[:100]
 
-    # Add stats for right sidebar
-    clusters = ProxmoxCluster.objects.filter(is_active=True)
-    nodes = Node.objects.all()
-    vms = VirtualMachine.objects.all()
-
     context = {
         "logs": logs,
-        # Stats for right sidebar
-        "clusters": clusters,
-        "nodes": nodes,
-        "vms": vms,
-        "total_vms": vms.count(),
-        "running_vms": vms.filter(status="running").count(),
-        "total_nodes": nodes.count(),
-        "online_nodes": nodes.filter(status="online").count(),
-        "avg_cpu": round(nodes.aggregate(Avg("cpu_usage"))["cpu_usage__avg"] or 0, 2),
-        "avg_ram": round(nodes.aggregate(Avg("ram_usage"))["ram_usage__avg"] or 0, 2),
     }
 
     return render(request, "proxmox_manager/audit_log.html", context)
@@ -417,57 +586,77 @@ def node_detail(request, node_id):
     node = get_object_or_404(Node, id=node_id)
     vms = node.virtual_machines.all()
 
-    # Add stats for right sidebar
-    clusters = ProxmoxCluster.objects.filter(is_active=True)
-    nodes = Node.objects.all()
-    all_vms = VirtualMachine.objects.all()
-
     context = {
         "node": node,
         "vms": vms,
-        # Stats for right sidebar
-        "clusters": clusters,
-        "nodes": nodes,
-        "total_vms": all_vms.count(),
-        "running_vms": all_vms.filter(status="running").count(),
-        "total_nodes": nodes.count(),
-        "online_nodes": nodes.filter(status="online").count(),
-        "avg_cpu": round(nodes.aggregate(Avg("cpu_usage"))["cpu_usage__avg"] or 0, 2),
-        "avg_ram": round(nodes.aggregate(Avg("ram_usage"))["ram_usage__avg"] or 0, 2),
     }
 
     return render(request, "proxmox_manager/node_detail.html", context)
 
 
-@login_required
-def vm_console(request, vm_id):
-    vm = get_object_or_404(VirtualMachine, id=vm_id)
+@async_login_required
+async def vm_console(request, vm_id):
+    """
+    Console page of a guest.
+
+    Async, so a slow cluster only delays its own consoles: under ASGI the
+    Proxmox requests are awaited on the event loop. Worker threads are only
+    used for short blocking steps: the database queries, the login when the
+    pooled ticket is stale (see ``async_client.client_for``), and the Redis
+    calls of the circuit breaker and rate limiter.
+    """
+    vm = await aget_object_or_404(
+        VirtualMachine.objects.select_related("node__cluster"), id=vm_id
+    )
+    cluster = vm.node.cluster
+    node_name = vm.node.name
+
+    # vm_type is the API path segment: qemu or lxc
+    console_path = f"/nodes/{node_name}/{vm.vm_type}/{vm.vmid}"
+    websocket_mode = settings.VNC_RELAY_MODE == "websocket"
 
     # Get console connection details from Proxmox
     try:
-        proxmox = get_proxmox_connection(vm.node.cluster)
-        node_name = vm.node.name
-
-        # Create console ticket
-        if vm.vm_type == "qemu":
-            console_data = proxmox.nodes(node_name).qemu(vm.vmid).vncproxy.post()
-        else:  # lxc
-            console_data = proxmox.nodes(node_name).lxc(vm.vmid).vncproxy.post()
+        # Create console ticket; in websocket mode the console is only
+        # reachable through the guest's vncwebsocket endpoint
+        async with await client_for(cluster) as client:
+            console_data = await client.post(
+                f"{console_path}/vncproxy", websocket=1 if websocket_mode else None
+            )
 
         # Get ticket and port for authentication
         vnc_ticket = console_data["ticket"]
         vnc_port = console_data["port"]
 
-        # Get Proxmox host IP/hostname
-        proxmox_host = (
-            vm.node.cluster.api_url.replace("https://", "")
-            .replace(":8006", "")
-            .split(":")[0]
-        )
-
-        # Create websockify token: vmid_proxmoxhost_vncport
-        # This will be used by our custom websockify plugin to create SSH tunnel
-        ws_token = f"{vm.vmid}_{proxmox_host}_{vnc_port}"
+        # Address of the guest's node if it is reachable, otherwise the best
+        # API endpoint of the cluster
+        proxmox_host = await sync_to_async(
+            get_endpoints(cluster).host_for_node
+        )(node_name)
+
+        # Signed token letting the console relay reach the VNC port, through
+        # vncwebsocket or over SSH
+        if websocket_mode:
+            ws_token = console_token(
+                mode="websocket",
+                cluster=cluster.pk,
+                path=f"{console_path}/vncwebsocket",
+                port=vnc_port,
+                vncticket=vnc_ticket,
+            )
+        else:
+            ws_token = console_token(mode="ssh", host=proxmox_host, port=vnc_port)
+        relay_url = None
+        if settings.VNC_RELAY_URL:
+            query = urlencode(
+                {
+                    "autoconnect": 1,
+                    "resize": "scale",
+                    "path": f"websockify?token={ws_token}",
+                    "password": vnc_ticket,
+                }
+            )
+            relay_url = f"{settings.VNC_RELAY_URL.rstrip('/')}/vnc.html?{query}"
 
         context = {
             "vm": vm,
@@ -475,43 +664,36 @@ def vm_console(request, vm_id):
             "vnc_port": vnc_port,
             "proxmox_host": proxmox_host,
             "ws_token": ws_token,
+            "relay_url": relay_url,
             "node_name": node_name,
             "vmid": vm.vmid,
             "vm_type": vm.vm_type,
         }
 
-        return render(request, "proxmox_manager/vm_console.html", context)
+        # Context processors read the session and database
+        return await sync_to_async(render)(
+            request, "proxmox_manager/vm_console.html", context
+        )
 
     except Exception as e:
         messages.error(request, f"Failed to open console: {str(e)}")
         return redirect("vm_detail", vm_id=vm_id)
 
 
-@login_required
-def vm_console_proxy(request, vm_id):
+@async_login_required
+async def vm_console_proxy(request, vm_id):
     """Proxy endpoint for noVNC websocket connection"""
-    vm = get_object_or_404(VirtualMachine, id=vm_id)
+    vm = await aget_object_or_404(
+        VirtualMachine.objects.select_related("node__cluster"), id=vm_id
+    )
 
     try:
-        proxmox = get_proxmox_connection(vm.node.cluster)
-        node_name = vm.node.name
-
         # Create VNC websocket
-        if vm.vm_type == "qemu":
-            vncwebsocket = (
-                proxmox.nodes(node_name)
-                .qemu(vm.vmid)
-                .vncwebsocket.get(
-                    port=request.GET.get("port"), vncticket=request.GET.get("vncticket")
-                )
-            )
-        else:  # lxc
-            vncwebsocket = (
-                proxmox.nodes(node_name)
-                .lxc(vm.vmid)
-                .vncwebsocket.get(
-                    port=request.GET.get("port"), vncticket=request.GET.get("vncticket")
-                )
+        async with await client_for(vm.node.cluster) as client:
+            vncwebsocket = await client.get(
+                f"/nodes/{vm.node.name}/{vm.vm_type}/{vm.vmid}/vncwebsocket",
+                port=request.GET.get("port"),
+                vncticket=request.GET.get("vncticket"),
             )
 
         return JsonResponse(vncwebsocket)
@@ -549,11 +731,6 @@ def task_list(request):
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
-    # Add stats for right sidebar
-    clusters = ProxmoxCluster.objects.filter(is_active=True)
-    nodes = Node.objects.all()
-    vms = VirtualMachine.objects.all()
-
     # Get task stats
     total_tasks = CeleryTask.objects.count()
     running_tasks = CeleryTask.objects.filter(
@@ -571,26 +748,29 @@ def task_list(request):
         "running_tasks": running_tasks,
         "success_tasks": success_tasks,
         "failed_tasks": failed_tasks,
-        # Stats for right sidebar
-        "clusters": clusters,
-        "nodes": nodes,
-        "vms": vms,
-        "total_vms": vms.count(),
-        "running_vms": vms.filter(status="running").count(),
-        "total_nodes": nodes.count(),
-        "online_nodes": nodes.filter(status="online").count(),
-        "avg_cpu": round(nodes.aggregate(Avg("cpu_usage"))["cpu_usage__avg"] or 0, 2),
-        "avg_ram": round(nodes.aggregate(Avg("ram_usage"))["ram_usage__avg"] or 0, 2),
     }
 
     return render(request, "proxmox_manager/task_list.html", context)
 
 
+def apply_live_progress(tasks):
+    """Overlay progress published by running tasks onto their CeleryTask rows"""
+    tasks = list(tasks)
+    live = read_progress(task.task_id for task in tasks)
+    for task in tasks:
+        if task.task_id in live:
+            task.progress = live[task.task_id]["progress"]
+            task.progress_message = live[task.task_id]["message"]
+    return tasks
+
+
 @login_required
 def get_task_status(request, task_id):
     """API endpoint to get task status"""
     try:
         task = CeleryTask.objects.get(task_id=task_id)
+        if task.is_running:
+            apply_live_progress([task])
         return JsonResponse(
             {
                 "task_id": task.task_id,
@@ -614,12 +794,19 @@ def get_task_status(request, task_id):
         return JsonResponse({"error": "Task not found"}, status=404)
 
 
+def running_tasks_etag(request):
+    version = tasks_version()
+    return None if version is None else etag(version)
+
+
 @login_required
+@condition(etag_func=running_tasks_etag)
 def get_running_tasks(request):
     """API endpoint to get all running tasks"""
     tasks = CeleryTask.objects.filter(
         state__in=["PENDING", "STARTED", "RETRY"]
     ).select_related("vm", "cluster")[:20]
+    tasks = apply_live_progress(tasks)
 
     tasks_data = []
     for task in tasks:
@@ -640,6 +827,12 @@ def get_running_tasks(request):
     return JsonResponse({"tasks": tasks_data})
 
 
+@login_required
+def get_queue_metrics(request):
+    """API endpoint with recent queue latency (enqueue to start) per Celery queue"""
+    return JsonResponse({"queues": queue_latency_stats()})
+
+
 @login_required
 def retry_task(request, task_id):
     """Retry a failed task"""
@@ -657,12 +850,16 @@ def retry_task(request, task_id):
 
         # Re-execute the task based on task name
         if task.task_name == "sync_cluster_data" and task.cluster:
-            new_task = sync_cluster_data.delay(task.cluster.id)
+            new_task_id, started = enqueue_cluster_sync(task.cluster.id)
             return JsonResponse(
                 {
                     "status": "success",
-                    "message": "Task retried successfully",
-                    "new_task_id": new_task.id,
+                    "message": (
+                        "Task retried successfully"
+                        if started
+                        else "A sync of this cluster is already running"
+                    ),
+                    "new_task_id": new_task_id,
                 }
             )
         elif task.task_name == "sync_vms_for_node" and task.vm:
@@ -692,6 +889,8 @@ def cancel_task(request, task_id):
 
         # Revoke the task
         current_app.control.revoke(task_id, terminate=True)
+        if task.cluster:
+            cluster_sync_lock(task.cluster.id).release(task_id)
 
         # Update the database record
         task.state = "REVOKED"
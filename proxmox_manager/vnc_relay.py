@@ -0,0 +1,309 @@
+"""
+Browser console relay: noVNC WebSockets to guest VNC consoles.
+
+``vncproxy`` opens a VNC port on the guest's node that only accepts local
+connections. The relay (``manage.py start_vnc_proxy``) keeps one SSH connection
+per Proxmox host and opens a ``direct-tcpip`` channel on it for each console,
+bridging the browser's WebSocket frames straight to the channel. Consoles thus
+start no ``ssh`` process and bind no local port (guests with the same vmid on
+different clusters used to collide on ``15000 + vmid``), and a single process
+serves hundreds of them over a handful of connections.
+
+With ``VNC_RELAY_MODE = "websocket"`` the relay needs no SSH access: the
+console is opened with ``vncproxy`` in WebSocket mode, and the relay connects
+to the guest's ``vncwebsocket`` API endpoint with the cluster's ticket or API
+token and forwards frames between the two WebSockets.
+
+The console page hands the browser a token signed with ``SECRET_KEY``
+(:func:`console_token`) naming the console; the relay only opens consoles for
+valid tokens younger than ``VNC_RELAY_TOKEN_MAX_AGE`` seconds.
+"""
+
+import asyncio
+import contextlib
+import logging
+
+import aiohttp
+import asyncssh
+from aiohttp import WSMsgType, web
+from django.conf import settings
+from django.core import signing
+
+from .async_client import client_for
+from .models import ProxmoxCluster
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = "proxmox_manager.vnc_relay"
+# Bytes read from a VNC channel per WebSocket message
+READ_SIZE = 64 * 1024
+# Largest WebSocket message accepted from the browser or Proxmox. Each
+# direction holds at most one message while it is being sent on, and aiohttp
+# stops reading a socket once 64 KiB of parsed frames wait, which bounds the
+# memory of a console
+MAX_MESSAGE_SIZE = 4 * 1024 * 1024
+SSH_CONNECT_TIMEOUT = 10
+SSH_KEEPALIVE_INTERVAL = 30
+# Seconds between WebSocket pings, so proxies do not close idle consoles
+WS_HEARTBEAT = 30
+
+
+def console_token(**target):
+    """
+    Token letting the relay open the console ``target`` for a short while:
+    ``mode="ssh"`` with the ``host`` and VNC ``port``, or ``mode="websocket"``
+    with the ``cluster`` id and the ``path``, ``port`` and ``vncticket`` of
+    its ``vncwebsocket`` endpoint
+    """
+    return signing.dumps(target, salt=TOKEN_SALT)
+
+
+def read_console_token(token):
+    """
+    Console target of ``token``; raises ``signing.BadSignature`` when it is
+    forged or expired
+    """
+    return signing.loads(
+        token, salt=TOKEN_SALT, max_age=settings.VNC_RELAY_TOKEN_MAX_AGE
+    )
+
+
+def ssh_options():
+    return {
+        "username": settings.VNC_RELAY_SSH_USER,
+        # Empty: the default keys of the user running the relay, and its agent
+        "client_keys": (
+            [settings.VNC_RELAY_SSH_KEY] if settings.VNC_RELAY_SSH_KEY else ()
+        ),
+        # Like the ssh tunnels the relay replaces, host keys are only checked
+        # when a known_hosts file is configured
+        "known_hosts": settings.VNC_RELAY_KNOWN_HOSTS or None,
+        "connect_timeout": SSH_CONNECT_TIMEOUT,
+        "keepalive_interval": SSH_KEEPALIVE_INTERVAL,
+    }
+
+
+class SSHPool:
+    """
+    One SSH connection per Proxmox host, shared by the channels of its
+    consoles and closed once it has carried none for ``idle_timeout`` seconds
+    """
+
+    def __init__(self, idle_timeout):
+        self.idle_timeout = idle_timeout
+        self.connections = {}
+        self.channels = {}
+        self.idle_timers = {}
+        self.locks = {}
+
+    async def connection(self, host):
+        # Consoles opened at once on a new host wait for a single connection
+        async with self.locks.setdefault(host, asyncio.Lock()):
+            connection = self.connections.get(host)
+            if connection is None:
+                connection = await asyncssh.connect(host, **ssh_options())
+                self.connections[host] = connection
+                asyncio.get_running_loop().create_task(
+                    self.forget_when_closed(host, connection)
+                )
+                logger.info(f"Opened SSH connection to {host}")
+            return connection
+
+    async def forget_when_closed(self, host, connection):
+        await connection.wait_closed()
+        if self.connections.get(host) is connection:
+            del self.connections[host]
+        logger.info(f"SSH connection to {host} closed")
+
+    async def open_channel(self, host, port):
+        """
+        ``(reader, writer)`` of a channel to ``localhost:port`` on ``host``;
+        :meth:`release` it once closed
+        """
+        # Counted from the start, so the connection is not closed as idle meanwhile
+        self.channels[host] = self.channels.get(host, 0) + 1
+        timer = self.idle_timers.pop(host, None)
+        if timer is not None:
+            timer.cancel()
+
+        try:
+            connection = await self.connection(host)
+            try:
+                return await connection.open_connection("localhost", port)
+            except (asyncssh.DisconnectError, ConnectionError):
+                # The connection dropped while idle; retry once on a new one
+                if self.connections.get(host) is connection:
+                    del self.connections[host]
+                connection.close()
+                connection = await self.connection(host)
+                return await connection.open_connection("localhost", port)
+        except BaseException:
+            self.release(host)
+            raise
+
+    def release(self, host):
+        self.channels[host] -= 1
+        if not self.channels[host]:
+            del self.channels[host]
+            self.idle_timers[host] = asyncio.get_running_loop().call_later(
+                self.idle_timeout, self.close_idle, host
+            )
+
+    def close_idle(self, host):
+        self.idle_timers.pop(host, None)
+        if host not in self.channels and host in self.connections:
+            self.connections.pop(host).close()
+
+    async def close(self):
+        for timer in self.idle_timers.values():
+            timer.cancel()
+        self.idle_timers.clear()
+        connections = list(self.connections.values())
+        self.connections.clear()
+        for connection in connections:
+            connection.close()
+        await asyncio.gather(
+            *(connection.wait_closed() for connection in connections),
+            return_exceptions=True,
+        )
+
+
+async def first_completed(*coroutines):
+    """Run ``coroutines`` until one of them ends, then cancel the others"""
+    tasks = [asyncio.create_task(coroutine) for coroutine in coroutines]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.debug(f"Console relay ended: {str(result)}")
+
+
+async def relay(ws, reader, writer):
+    """Bridge a noVNC WebSocket and a VNC channel until either side closes"""
+
+    async def upstream():
+        async for message in ws:
+            if message.type == WSMsgType.BINARY:
+                writer.write(message.data)
+                # Stop reading the browser while the channel's window is full
+                await writer.drain()
+        writer.write_eof()
+
+    async def downstream():
+        while data := await reader.read(READ_SIZE):
+            # Waits while the browser's socket buffer is full
+            await ws.send_bytes(data)
+
+    try:
+        await first_completed(upstream(), downstream())
+    finally:
+        await ws.close()
+
+
+async def bridge(browser, proxmox):
+    """Forward messages between two WebSockets until either side closes"""
+
+    async def forward(source, target):
+        async for message in source:
+            # Payloads are passed on as parsed, and the next message is only
+            # read once this one is written: a slow side stops the other from
+            # being read
+            if message.type == WSMsgType.BINARY:
+                await target.send_bytes(message.data)
+            elif message.type == WSMsgType.TEXT:
+                await target.send_str(message.data)
+
+    try:
+        await first_completed(forward(browser, proxmox), forward(proxmox, browser))
+    finally:
+        await browser.close()
+        await proxmox.close()
+
+
+class ConsoleRelay:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def handle(self, request):
+        try:
+            target = read_console_token(request.query.get("token", ""))
+        except signing.BadSignature:
+            raise web.HTTPForbidden(text="Invalid or expired console token")
+
+        if target["mode"] == "websocket":
+            return await self.bridge_websocket(request, target)
+        return await self.relay_ssh(request, target["host"], target["port"])
+
+    async def relay_ssh(self, request, host, port):
+        try:
+            reader, writer = await self.pool.open_channel(host, port)
+        except (OSError, asyncio.TimeoutError, asyncssh.Error) as e:
+            logger.warning(f"Could not reach VNC port {port} of {host}: {str(e)}")
+            raise web.HTTPBadGateway(text=f"Could not reach the console of {host}")
+
+        ws = web.WebSocketResponse(
+            protocols=("binary",),
+            heartbeat=WS_HEARTBEAT,
+            max_msg_size=MAX_MESSAGE_SIZE,
+        )
+        try:
+            await ws.prepare(request)
+            await relay(ws, reader, writer)
+        finally:
+            writer.close()
+            self.pool.release(host)
+        return ws
+
+    async def bridge_websocket(self, request, target):
+        async with contextlib.AsyncExitStack() as stack:
+            try:
+                cluster = await ProxmoxCluster.objects.aget(pk=target["cluster"])
+                client = await stack.enter_async_context(await client_for(cluster))
+                proxmox = await client.websocket(
+                    target["path"],
+                    {"port": target["port"], "vncticket": target["vncticket"]},
+                    protocols=("binary",),
+                    heartbeat=WS_HEARTBEAT,
+                    max_msg_size=MAX_MESSAGE_SIZE,
+                )
+            except aiohttp.WSServerHandshakeError as e:
+                # Not str(e): its URL holds the vncticket
+                logger.warning(f"Could not open {target['path']}: HTTP {e.status}")
+                raise web.HTTPBadGateway(text="Could not reach the console on Proxmox")
+            except Exception as e:
+                logger.warning(f"Could not open {target['path']}: {str(e)}")
+                raise web.HTTPBadGateway(text="Could not reach the console on Proxmox")
+
+            ws = web.WebSocketResponse(
+                protocols=("binary",),
+                heartbeat=WS_HEARTBEAT,
+                max_msg_size=MAX_MESSAGE_SIZE,
+            )
+            try:
+                await ws.prepare(request)
+            except BaseException:
+                await proxmox.close()
+                raise
+            await bridge(ws, proxmox)
+        return ws
+
+
+def relay_app(web_dir=None):
+    """
+    aiohttp application relaying ``/websockify?token=<token>`` (noVNC's
+    default path), and serving noVNC itself from ``web_dir`` if given
+    """
+    pool = SSHPool(settings.VNC_RELAY_SSH_IDLE_TIMEOUT)
+
+    async def close_pool(app):
+        await pool.close()
+
+    app = web.Application()
+    app.router.add_get("/websockify", ConsoleRelay(pool).handle)
+    if web_dir:
+        app.router.add_static("/", web_dir)
+    app.on_cleanup.append(close_pool)
+    return app
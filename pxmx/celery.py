@@ -2,6 +2,9 @@ import os
 
 from celery import Celery
 from celery.schedules import crontab
+from kombu import Queue
+
+from proxmox_manager.priorities import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pxmx.settings")
 
@@ -10,11 +13,92 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
 
 
+# Queues
+# interactive: user-triggered VM operations, which must not wait behind syncs
+# sync:        cluster/node syncs and event-driven resyncs
+# maintenance: periodic bookkeeping (scheduler ticks, tracker safety nets)
+# Run one worker per queue so each has its own concurrency, e.g.
+#   celery -A pxmx worker -Q interactive -c 4
+#   celery -A pxmx worker -Q sync -c 8
+#   celery -A pxmx worker -Q maintenance -c 1
+app.conf.task_queues = (
+    Queue("interactive"),
+    Queue("sync"),
+    Queue("maintenance"),
+)
+app.conf.task_default_queue = "maintenance"
+
+# Priorities (see proxmox_manager/priorities.py) map to the priority_steps
+# sub-queues of the Redis transport below
+
+app.conf.task_routes = {
+    "proxmox_manager.tasks.vm_power_action": {
+        "queue": "interactive",
+        "priority": PRIORITY_HIGH,
+    },
+    "proxmox_manager.tasks.migrate_vm_task": {
+        "queue": "interactive",
+        "priority": PRIORITY_HIGH,
+    },
+    "proxmox_manager.tasks.create_snapshot": {
+        "queue": "interactive",
+        "priority": PRIORITY_HIGH,
+    },
+    # Completes the audit log of user operations, so it runs with them
+    "proxmox_manager.tasks.track_proxmox_tasks": {
+        "queue": "interactive",
+        "priority": PRIORITY_NORMAL,
+    },
+    "proxmox_manager.tasks.sync_cluster_data": {
+        "queue": "sync",
+        "priority": PRIORITY_NORMAL,
+    },
+    "proxmox_manager.tasks.watch_cluster_events": {
+        "queue": "sync",
+        "priority": PRIORITY_NORMAL,
+    },
+    # Chord callback completing a cluster sync; short, so it jumps the fan-out
+    "proxmox_manager.tasks.reconcile_cluster_sync": {
+        "queue": "sync",
+        "priority": PRIORITY_HIGH,
+    },
+    "proxmox_manager.tasks.sync_vms_for_node": {
+        "queue": "sync",
+        "priority": PRIORITY_LOW,
+    },
+}
+app.conf.task_default_priority = PRIORITY_NORMAL
+app.conf.broker_transport_options = {
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    "queue_order_strategy": "priority",
+}
+# Do not let a worker reserve queued tasks it cannot start yet
+app.conf.worker_prefetch_multiplier = 1
+
+
 # Periodic task schedule
+# Each cluster has its own adaptive sync interval (see proxmox_manager/scheduling.py);
+# this tick only starts the clusters that are due.
 app.conf.beat_schedule = {
-    "sync-all-clusters-every-5-minutes": {
-        "task": "proxmox_manager.tasks.sync_all_clusters",
-        "schedule": 300.0,  # 5 minutes in seconds
+    "schedule-cluster-syncs": {
+        "task": "proxmox_manager.tasks.schedule_cluster_syncs",
+        "schedule": 30.0,
+    },
+    # Targeted resyncs from new entries in each cluster's task log
+    "watch-all-cluster-events": {
+        "task": "proxmox_manager.tasks.watch_all_cluster_events",
+        "schedule": 10.0,
+    },
+    # Safety net for Proxmox task trackers lost to a worker restart
+    "track-all-proxmox-tasks": {
+        "task": "proxmox_manager.tasks.track_all_proxmox_tasks",
+        "schedule": 60.0,
+    },
+    # Deletions older than CHANGE_TOMBSTONE_RETENTION (see proxmox_manager/changes.py)
+    "prune-change-tombstones": {
+        "task": "proxmox_manager.tasks.prune_change_tombstones",
+        "schedule": 3600.0,
     },
 }
 
@@ -54,6 +54,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "proxmox_manager.context_processors.sidebar_stats",
             ],
         },
     },
@@ -127,6 +128,9 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Redis (task progress, locks and caches)
+REDIS_URL = env("REDIS_URL", default="redis://localhost:6379/0")
+
 # Celery Configuration
 CELERY_BROKER_URL = env("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND")
@@ -138,3 +142,79 @@ CELERY_TIMEZONE = TIME_ZONE
 # Login URLs
 LOGIN_URL = "/admin/login/"
 LOGIN_REDIRECT_URL = "/"
+
+# Proxmox sync
+# "resources" reads the whole inventory from one /cluster/resources call,
+# "nodes" queries each node and guest individually, "async" does the same
+# concurrently (see PROXMOX_SYNC_CONCURRENCY).
+PROXMOX_SYNC_MODE = env("PROXMOX_SYNC_MODE", default="resources")
+# Guest configs are only refetched when their listing changes, or after this
+# many seconds as a safety net (0 disables the periodic refetch)
+PROXMOX_CONFIG_MAX_AGE = env.int("PROXMOX_CONFIG_MAX_AGE", default=3600)
+# Adaptive sync interval bounds in seconds: the interval halves after a sync
+# that found changes and grows by half after one that did not
+PROXMOX_SYNC_DEFAULT_INTERVAL = env.int("PROXMOX_SYNC_DEFAULT_INTERVAL", default=300)
+PROXMOX_SYNC_MIN_INTERVAL = env.int("PROXMOX_SYNC_MIN_INTERVAL", default=60)
+PROXMOX_SYNC_MAX_INTERVAL = env.int("PROXMOX_SYNC_MAX_INTERVAL", default=1800)
+# Next sync times are randomised by +/- this fraction of the interval
+PROXMOX_SYNC_JITTER = env.float("PROXMOX_SYNC_JITTER", default=0.2)
+
+# Proxmox API connections (pooled per worker process)
+# Seconds before a password login ticket is renewed; Proxmox expires them after 2h
+PROXMOX_TICKET_RENEW_AGE = env.int("PROXMOX_TICKET_RENEW_AGE", default=3600)
+# Keep-alive HTTP connections kept open per cluster
+PROXMOX_HTTP_POOL_SIZE = env.int("PROXMOX_HTTP_POOL_SIZE", default=10)
+# Maximum concurrent API requests per cluster for the "async" sync mode
+PROXMOX_SYNC_CONCURRENCY = env.int("PROXMOX_SYNC_CONCURRENCY", default=16)
+# Seconds to wait for a TCP connection / for a response to an API call
+PROXMOX_CONNECT_TIMEOUT = env.float("PROXMOX_CONNECT_TIMEOUT", default=3.05)
+PROXMOX_READ_TIMEOUT = env.float("PROXMOX_READ_TIMEOUT", default=30)
+# Circuit breaker: after this many consecutive failures the cluster's API calls
+# fail fast, until a probe call is let through after the reset timeout (seconds)
+PROXMOX_BREAKER_FAILURE_THRESHOLD = env.int("PROXMOX_BREAKER_FAILURE_THRESHOLD", default=3)
+PROXMOX_BREAKER_RESET_TIMEOUT = env.int("PROXMOX_BREAKER_RESET_TIMEOUT", default=60)
+# Send API calls to whichever node of the cluster answers fastest, failing over
+# to the others; a failed endpoint is skipped for this many seconds (doubling
+# while it keeps failing)
+PROXMOX_ENDPOINT_FAILOVER = env.bool("PROXMOX_ENDPOINT_FAILOVER", default=True)
+PROXMOX_ENDPOINT_QUARANTINE = env.int("PROXMOX_ENDPOINT_QUARANTINE", default=30)
+# Also send a read to the second-best endpoint when the first has not answered
+# after this many seconds (0 disables hedging)
+PROXMOX_HEDGE_READS_AFTER = env.float("PROXMOX_HEDGE_READS_AFTER", default=0)
+# Token bucket shared by all processes: sustained API requests per second per
+# cluster (0 disables the limit) and burst size. Sync and maintenance tasks
+# leave the reserved tokens (at most burst - 1) to web requests and interactive
+# tasks.
+PROXMOX_RATE_LIMIT = env.float("PROXMOX_RATE_LIMIT", default=20)
+PROXMOX_RATE_LIMIT_BURST = env.int("PROXMOX_RATE_LIMIT_BURST", default=40)
+PROXMOX_RATE_LIMIT_INTERACTIVE_RESERVE = env.int(
+    "PROXMOX_RATE_LIMIT_INTERACTIVE_RESERVE", default=10
+)
+
+# Guests per page of the VM list (the page_size parameter is capped at the max)
+VM_LIST_PAGE_SIZE = env.int("VM_LIST_PAGE_SIZE", default=50)
+VM_LIST_MAX_PAGE_SIZE = env.int("VM_LIST_MAX_PAGE_SIZE", default=200)
+
+# Seconds deletions stay listed by the delta APIs (?since=); clients further
+# behind get a full listing
+CHANGE_TOMBSTONE_RETENTION = env.int("CHANGE_TOMBSTONE_RETENTION", default=86400)
+
+# Proxmox task (UPID) tracking: outstanding tasks of a cluster are polled in one
+# batch, backing off exponentially between these bounds (seconds)
+PROXMOX_TASK_POLL_MIN_INTERVAL = env.int("PROXMOX_TASK_POLL_MIN_INTERVAL", default=2)
+PROXMOX_TASK_POLL_MAX_INTERVAL = env.int("PROXMOX_TASK_POLL_MAX_INTERVAL", default=60)
+
+# Browser consoles: public URL of the relay run by `manage.py start_vnc_proxy`
+# (empty hides the browser console), seconds a console token stays valid, and
+# how the relay reaches the Proxmox hosts over SSH. Without a known_hosts file
+# host keys are not checked.
+VNC_RELAY_URL = env("VNC_RELAY_URL", default="")
+# "ssh" relays consoles over SSH to the Proxmox hosts; "websocket" through the
+# guests' vncwebsocket API endpoints, with the cluster's credentials and no SSH
+VNC_RELAY_MODE = env("VNC_RELAY_MODE", default="ssh")
+VNC_RELAY_TOKEN_MAX_AGE = env.int("VNC_RELAY_TOKEN_MAX_AGE", default=60)
+VNC_RELAY_SSH_USER = env("VNC_RELAY_SSH_USER", default="root")
+VNC_RELAY_SSH_KEY = env("VNC_RELAY_SSH_KEY", default="")
+VNC_RELAY_KNOWN_HOSTS = env("VNC_RELAY_KNOWN_HOSTS", default="")
+# Seconds an SSH connection carrying no console stays open
+VNC_RELAY_SSH_IDLE_TIMEOUT = env.int("VNC_RELAY_SSH_IDLE_TIMEOUT", default=300)
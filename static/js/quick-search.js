@@ -0,0 +1,122 @@
+// Global quick search: typeahead over guests, nodes and clusters backed by /api/search/
+class QuickSearch {
+    constructor(input, results) {
+        this.input = input;
+        this.results = results;
+        this.debounceDelay = 150; // ms to wait after the last keystroke
+        this.debounceTimer = null;
+        this.controller = null;
+        this.hits = [];
+        this.selected = -1;
+
+        this.input.addEventListener('input', () => this.schedule());
+        this.input.addEventListener('keydown', event => this.onKeyDown(event));
+        this.input.addEventListener('focus', () => this.render());
+        document.addEventListener('click', event => {
+            if (!this.input.parentElement.contains(event.target)) this.close();
+        });
+        document.addEventListener('keydown', event => {
+            // "/" focuses the search box unless the user is typing somewhere
+            const typing = ['INPUT', 'TEXTAREA', 'SELECT'].includes(document.activeElement.tagName);
+            if (event.key === '/' && !typing) {
+                event.preventDefault();
+                this.input.focus();
+            }
+        });
+    }
+
+    schedule() {
+        clearTimeout(this.debounceTimer);
+        this.debounceTimer = setTimeout(() => this.search(), this.debounceDelay);
+    }
+
+    async search() {
+        const query = this.input.value.trim();
+        if (!query) {
+            this.hits = [];
+            this.close();
+            return;
+        }
+
+        // Only the latest query's answer matters
+        if (this.controller) this.controller.abort();
+        this.controller = new AbortController();
+
+        try {
+            const response = await fetch(`/api/search/?q=${encodeURIComponent(query)}`, {
+                signal: this.controller.signal
+            });
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            const data = await response.json();
+            this.hits = data.results;
+            this.selected = this.hits.length ? 0 : -1;
+            this.render();
+        } catch (error) {
+            if (error.name !== 'AbortError') console.error('Quick search failed:', error);
+        }
+    }
+
+    render() {
+        if (!this.input.value.trim()) {
+            this.close();
+            return;
+        }
+
+        const icons = {vm: 'bi-laptop', node: 'bi-hdd-rack', cluster: 'bi-diagram-3'};
+        this.results.replaceChildren();
+
+        if (!this.hits.length) {
+            const empty = document.createElement('div');
+            empty.className = 'quick-search-empty';
+            empty.textContent = 'No matches';
+            this.results.appendChild(empty);
+        }
+
+        this.hits.forEach((hit, index) => {
+            const link = document.createElement('a');
+            link.href = hit.url;
+            link.className = 'quick-search-hit' + (index === this.selected ? ' selected' : '');
+
+            const icon = document.createElement('i');
+            icon.className = `bi ${icons[hit.type] || 'bi-search'}`;
+            const label = document.createElement('span');
+            label.className = 'quick-search-label';
+            label.textContent = hit.label;
+            const detail = document.createElement('span');
+            detail.className = 'quick-search-detail';
+            detail.textContent = hit.detail || '';
+
+            link.append(icon, label, detail);
+            this.results.appendChild(link);
+        });
+
+        this.results.hidden = false;
+    }
+
+    onKeyDown(event) {
+        if (event.key === 'ArrowDown' || event.key === 'ArrowUp') {
+            if (!this.hits.length) return;
+            event.preventDefault();
+            const step = event.key === 'ArrowDown' ? 1 : -1;
+            this.selected = (this.selected + step + this.hits.length) % this.hits.length;
+            this.render();
+        } else if (event.key === 'Enter') {
+            event.preventDefault();
+            const hit = this.hits[this.selected];
+            if (hit) window.location.href = hit.url;
+        } else if (event.key === 'Escape') {
+            this.close();
+            this.input.blur();
+        }
+    }
+
+    close() {
+        this.results.hidden = true;
+    }
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const input = document.getElementById('quick-search-input');
+    const results = document.getElementById('quick-search-results');
+    if (input && results) window.quickSearch = new QuickSearch(input, results);
+});
@@ -1,4 +1,5 @@
-// Real-time sync functionality with continuous background polling
+// Real-time sync functionality: live updates pushed over Server-Sent Events,
+// with background polling while the event stream is unavailable
 class RealtimeSync {
     constructor() {
         this.syncingClusters = new Set();
@@ -7,9 +8,57 @@ class RealtimeSync {
         this.toastContainer = this.createToastContainer();
         this.pollRate = 30000; // 30 seconds for background polling
         this.syncPollRate = 2000; // 2 seconds during active sync
-
-        // Start background polling on page load
+        this.syncTimeout = 600000; // stop waiting for sync tasks after 10 minutes
+        this.responses = new Map(); // url -> {etag, data} of the last response
+        this.eventSource = null;
+        this.live = false; // true while the event stream is open
+        this.liveEvents = ['stats', 'cluster', 'task'];
+        this.syncTaskListener = null;
+
+        // Poll until the event stream opens (or for good if it never does)
         this.startBackgroundPolling();
+        this.connectLive();
+    }
+
+    // Subscribe to /api/events/. Every event is re-dispatched on document as
+    // a "pxmx:<event>" CustomEvent so pages can apply what concerns them.
+    connectLive() {
+        if (!window.EventSource) return;
+
+        this.eventSource = new EventSource('/api/events/');
+        this.eventSource.addEventListener('open', () => {
+            this.live = true;
+            this.stopBackgroundPolling();
+            // Catch up on anything missed while disconnected
+            this.refreshDashboard(true);
+        });
+        this.eventSource.addEventListener('error', () => {
+            // The browser reconnects by itself unless the stream is CLOSED
+            // (e.g. a 204 from a server that cannot stream); poll meanwhile
+            this.live = false;
+            if (!this.backgroundPollInterval) {
+                this.startBackgroundPolling();
+            }
+        });
+
+        this.liveEvents.forEach(name => {
+            this.eventSource.addEventListener(name, message => {
+                const data = JSON.parse(message.data);
+                if (name === 'stats') {
+                    this.applyDashboardStats(data);
+                    this.updateLastRefreshTime();
+                }
+                document.dispatchEvent(new CustomEvent(`pxmx:${name}`, {detail: data}));
+            });
+        });
+    }
+
+    disconnectLive() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+            this.live = false;
+        }
     }
 
     createToastContainer() {
@@ -96,11 +145,11 @@ class RealtimeSync {
 
             const data = await response.json();
 
-            if (data.status === 'started') {
-                this.showToast(data.message, 'success');
+            if (data.status === 'started' || data.status === 'running') {
+                this.showToast(data.message, data.status === 'started' ? 'success' : 'info');
 
                 // Switch to fast polling during sync
-                this.startSyncPolling(clusterId);
+                this.startSyncPolling([data.task_id]);
             }
         } catch (error) {
             console.error('Sync error:', error);
@@ -142,7 +191,7 @@ class RealtimeSync {
                 });
 
                 // Switch to fast polling during sync
-                this.startSyncPolling();
+                this.startSyncPolling(data.tasks.map(task => task.task_id));
             }
         } catch (error) {
             console.error('Sync error:', error);
@@ -155,46 +204,96 @@ class RealtimeSync {
         }
     }
 
-    startSyncPolling(clusterId = null) {
-        // Clear existing sync poll if any
+    startSyncPolling(taskIds = []) {
+        this.stopSyncPolling();
+
+        const pending = new Set(taskIds.filter(Boolean));
+        const failed = [];
+        const startedAt = Date.now();
+
+        const settle = state => {
+            if (!state || !state.is_completed || !pending.has(state.task_id)) return;
+            pending.delete(state.task_id);
+            if (state.state !== 'SUCCESS') {
+                failed.push(state);
+            }
+            if (pending.size === 0) {
+                this.finishSync(failed);
+            }
+        };
+
+        // Task events finish the sync as soon as it completes
+        this.syncTaskListener = event => settle(event.detail);
+        document.addEventListener('pxmx:task', this.syncTaskListener);
+
+        const poll = async () => {
+            const states = await Promise.all([...pending].map(taskId => this.fetchTaskState(taskId)));
+            states.forEach(settle);
+
+            // Stats are pushed while live
+            if (!this.live) {
+                await this.refreshDashboard();
+            }
+
+            if (pending.size > 0 && Date.now() - startedAt > this.syncTimeout) {
+                this.finishSync(failed, true);
+            }
+        };
+
+        // Fast poll every 2 seconds until every sync task has completed; while
+        // live only a slow safety net, checked once right away for tasks that
+        // completed before the stream could report them
+        this.syncPollInterval = setInterval(poll, this.live ? this.pollRate : this.syncPollRate);
+        if (this.live) {
+            poll();
+        }
+    }
+
+    stopSyncPolling() {
         if (this.syncPollInterval) {
             clearInterval(this.syncPollInterval);
+            this.syncPollInterval = null;
         }
+        if (this.syncTaskListener) {
+            document.removeEventListener('pxmx:task', this.syncTaskListener);
+            this.syncTaskListener = null;
+        }
+    }
 
-        // Fast poll every 2 seconds during sync
-        this.syncPollInterval = setInterval(async () => {
-            if (this.syncingClusters.size === 0) {
-                clearInterval(this.syncPollInterval);
-                this.syncPollInterval = null;
-                return;
-            }
+    async fetchTaskState(taskId) {
+        try {
+            const response = await fetch(`/api/tasks/${taskId}/status/`);
+            // 404 until a worker picks the task up
+            return response.ok ? await response.json() : null;
+        } catch (error) {
+            console.error('Task status error:', error);
+            return null;
+        }
+    }
 
-            // Refresh dashboard stats
-            await this.refreshDashboard();
-        }, this.syncPollRate);
+    finishSync(failed = [], timedOut = false) {
+        if (!this.syncPollInterval) return; // already finished
+        this.stopSyncPolling();
 
-        // Assume sync completes after 5 seconds
-        setTimeout(() => {
-            this.syncingClusters.clear();
+        this.syncingClusters.clear();
+        if (failed.length > 0) {
+            this.showToast(`Sync failed: ${failed[0].result || 'unknown error'}`, 'error', 6000);
+        } else if (timedOut) {
+            this.showToast('Sync is still running in the background', 'warning');
+        } else {
             this.showToast('Sync completed! Refreshing...', 'success');
+        }
 
-            // Re-enable all sync buttons
-            document.querySelectorAll('[data-sync-button]').forEach(btn => {
-                btn.disabled = false;
-                if (btn.dataset.originalHTML) {
-                    btn.innerHTML = btn.dataset.originalHTML;
-                }
-            });
-
-            // Clear sync polling
-            if (this.syncPollInterval) {
-                clearInterval(this.syncPollInterval);
-                this.syncPollInterval = null;
+        // Re-enable all sync buttons
+        document.querySelectorAll('[data-sync-button]').forEach(btn => {
+            btn.disabled = false;
+            if (btn.dataset.originalHTML) {
+                btn.innerHTML = btn.dataset.originalHTML;
             }
+        });
 
-            // Reload page to show updated data
-            setTimeout(() => window.location.reload(), 1000);
-        }, 5000);
+        // Reload page to show updated data
+        setTimeout(() => window.location.reload(), 1000);
     }
 
     startBackgroundPolling() {
@@ -217,28 +316,37 @@ class RealtimeSync {
         }
     }
 
+    // GET a JSON API with If-None-Match; on 304 the previous data is reused.
+    // Resolves to {data, modified}.
+    async fetchJSON(url) {
+        const previous = this.responses.get(url);
+        const headers = previous ? {'If-None-Match': previous.etag} : {};
+        const response = await fetch(url, {headers, cache: 'no-store'});
+
+        if (response.status === 304 && previous) {
+            return {data: previous.data, modified: false};
+        }
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+
+        const data = await response.json();
+        const etag = response.headers.get('ETag');
+        if (etag) {
+            this.responses.set(url, {etag, data});
+        }
+        return {data, modified: true};
+    }
+
     async refreshDashboard(silent = false) {
         try {
-            const response = await fetch('/api/dashboard/stats/');
-            const data = await response.json();
+            const {data, modified} = await this.fetchJSON('/api/dashboard/stats/');
+            if (!modified) {
+                this.updateLastRefreshTime();
+                return;
+            }
 
-            // Update dashboard stats if elements exist
-            this.updateElement('total-vms', data.stats.total_vms);
-            this.updateElement('running-vms', data.stats.running_vms);
-            this.updateElement('stopped-vms', data.stats.stopped_vms);
-            this.updateElement('total-nodes', data.stats.total_nodes);
-            this.updateElement('online-nodes', data.stats.online_nodes);
-            this.updateElement('avg-cpu', data.stats.avg_cpu + '%');
-            this.updateElement('avg-ram', data.stats.avg_ram + '%');
-
-            // Update sidebar stats
-            this.updateElement('sidebar-nodes', data.stats.total_nodes);
-            this.updateElement('sidebar-total-vms', data.stats.total_vms);
-            this.updateElement('sidebar-running-vms', data.stats.running_vms);
-            this.updateElement('sidebar-online', data.stats.online_nodes);
-            this.updateElement('sidebar-total', data.stats.total_nodes);
-            this.updateElement('sidebar-cpu', data.stats.avg_cpu + '%');
-            this.updateElement('sidebar-ram', data.stats.avg_ram + '%');
+            this.applyDashboardStats(data.stats);
 
             // Update last updated indicator
             this.updateLastRefreshTime();
@@ -254,6 +362,26 @@ class RealtimeSync {
         }
     }
 
+    applyDashboardStats(stats) {
+        // Update dashboard stats if elements exist
+        this.updateElement('total-vms', stats.total_vms);
+        this.updateElement('running-vms', stats.running_vms);
+        this.updateElement('stopped-vms', stats.stopped_vms);
+        this.updateElement('total-nodes', stats.total_nodes);
+        this.updateElement('online-nodes', stats.online_nodes);
+        this.updateElement('avg-cpu', stats.avg_cpu + '%');
+        this.updateElement('avg-ram', stats.avg_ram + '%');
+
+        // Update sidebar stats
+        this.updateElement('sidebar-nodes', stats.total_nodes);
+        this.updateElement('sidebar-total-vms', stats.total_vms);
+        this.updateElement('sidebar-running-vms', stats.running_vms);
+        this.updateElement('sidebar-online', stats.online_nodes);
+        this.updateElement('sidebar-total', stats.total_nodes);
+        this.updateElement('sidebar-cpu', stats.avg_cpu + '%');
+        this.updateElement('sidebar-ram', stats.avg_ram + '%');
+    }
+
     updateElement(id, value) {
         const element = document.getElementById(id);
         if (element && element.textContent !== String(value)) {
@@ -280,8 +408,7 @@ class RealtimeSync {
 
     async refreshClusterStats(clusterId) {
         try {
-            const response = await fetch(`/api/cluster/${clusterId}/stats/`);
-            const data = await response.json();
+            const {data} = await this.fetchJSON(`/api/cluster/${clusterId}/stats/`);
 
             // Update cluster page stats if elements exist
             console.log('Cluster stats updated:', data);
@@ -348,7 +475,8 @@ document.head.appendChild(style);
 // Export for use in HTML
 window.realtimeSync = realtimeSync;
 
-// Stop polling when user leaves the page
+// Stop polling and close the event stream when user leaves the page
 window.addEventListener('beforeunload', () => {
     realtimeSync.stopBackgroundPolling();
+    realtimeSync.disconnectLive();
 });